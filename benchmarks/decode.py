@@ -0,0 +1,98 @@
+"""Тест производительности разбора регистров: кодек группы против разбора по одному значению.
+
+Карта регистров счетчика электроэнергии на 12 каналов (по образцу WB-MAP12H):
+мощности s32, токи u32, коэффициенты мощности s16 и энергии u64 со множителями.
+
+Измеряется время разбора всей карты:
+- кодеком группы: один вызов struct на группу по байтам регистров;
+- по одному значению через AsyncModbusTcpClient.convert_from_registers с умножением на множитель.
+
+Запуск из корня репозитория (нужен установленный Home Assistant):
+    python benchmarks/decode.py --channels 12 --repeat 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pymodbus.client import AsyncModbusTcpClient
+
+from custom_components.wirenboard.codec import RegisterCodec
+
+DATATYPE = AsyncModbusTcpClient.DATATYPE
+
+# Величина канала: (тип данных, тип pymodbus, множитель)
+QUANTITIES = {
+    "active_power": ("s32", DATATYPE.INT32, 0.001),
+    "reactive_power": ("s32", DATATYPE.INT32, 0.001),
+    "apparent_power": ("s32", DATATYPE.INT32, 0.001),
+    "current": ("u32", DATATYPE.UINT32, 0.001),
+    "power_factor": ("s16", DATATYPE.INT16, 0.001),
+    "active_energy": ("u64", DATATYPE.UINT64, 0.00001),
+    "reactive_energy": ("u64", DATATYPE.UINT64, 0.00001),
+}
+
+
+def build_map(channels: int) -> list[tuple[RegisterCodec, object, float, array]]:
+    """Группа на каждую величину: значения всех каналов подряд"""
+    groups = []
+    for data_type, pymodbus_type, scale in QUANTITIES.values():
+        codec = RegisterCodec(data_type, channels, scale=scale)
+        registers = array("H", (random.randrange(0x10000) for _ in range(channels * codec.width)))
+        groups.append((codec, pymodbus_type, scale, registers))
+    return groups
+
+
+def decode_batched(groups) -> list:
+    return [codec.decode(registers) for codec, _, _, registers in groups]
+
+
+def decode_per_value(groups) -> list:
+    decoded = []
+    for codec, pymodbus_type, scale, registers in groups:
+        width = codec.width
+        values = []
+        for position in range(0, len(registers), width):
+            value = AsyncModbusTcpClient.convert_from_registers(list(registers[position:position + width]),
+                                                                pymodbus_type)
+            values.append(value * scale)
+        decoded.append(values)
+    return decoded
+
+
+def measure(function, groups, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(groups)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, nargs="+", default=[12, 48])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    for channels in args.channels:
+        groups = build_map(channels)
+        registers = sum(len(group[3]) for group in groups)
+        # Результаты обоих способов должны совпадать с точностью до округления множителя
+        for batched, per_value in zip(decode_batched(groups), decode_per_value(groups)):
+            assert all(abs(a - b) < 1e-6 for a, b in zip(batched, per_value)), (batched, per_value)
+        batched = measure(decode_batched, groups, args.repeat)
+        per_value = measure(decode_per_value, groups, args.repeat)
+        print(f"Каналов: {channels}, регистров: {registers}, значений: {channels * len(QUANTITIES)}")
+        print(f"  кодек группы:          {batched * 1e6:8.1f} мкс на карту")
+        print(f"  по одному значению:    {per_value * 1e6:8.1f} мкс на карту")
+        print(f"  ускорение:             {per_value / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Сквозной тест производительности опроса модулей WB-MR6 через симулятор шлюза.
+
+Симулятор работает в отдельном потоке со своим циклом событий, поэтому время процессора,
+измеренное в основном потоке, - это затраты только интеграции.
+
+Измеряется:
+- время цикла опроса всех групп всех устройств;
+- количество транзакций Modbus на цикл;
+- задержка от переключения реле до получения подтвержденного состояния при фоновом опросе;
+- время процессора на одно устройство за цикл.
+
+Запуск из корня репозитория (нужен установленный Home Assistant):
+    python benchmarks/poll_cycle.py --devices 1 10 100 --latency 0.002 --bus-time 0.001
+
+С ключом --capture обмен записывается в файл для benchmarks/replay.py.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from homeassistant.core import HomeAssistant
+from pymodbus.framer import FramerType
+
+from custom_components.wirenboard.bus import BusPoller
+from custom_components.wirenboard.device import RegisterType, WBSmart
+from custom_components.wirenboard.models import get_model
+from simulator import ModbusSimulator, SimulatedDevice
+
+
+class SimulatorThread:
+    """Симулятор шлюза в отдельном потоке"""
+
+    def __init__(self, simulator: ModbusSimulator):
+        self.simulator = simulator
+        self.port = None
+        self.__loop = asyncio.new_event_loop()
+        self.__started = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self) -> int:
+        self.__thread.start()
+        self.__started.wait()
+        return self.port
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.simulator.stop(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+
+    def __run(self):
+        asyncio.set_event_loop(self.__loop)
+        self.port = self.__loop.run_until_complete(self.simulator.start())
+        self.__started.set()
+        self.__loop.run_forever()
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def format_ms(values: list) -> str:
+    return (f"p50 {percentile(values, 50) * 1000:8.2f}  p95 {percentile(values, 95) * 1000:8.2f}  "
+            f"max {max(values, default=0) * 1000:8.2f} мс")
+
+
+async def measure_poll_cycles(devices: list, simulator: ModbusSimulator, cycles: int) -> dict:
+    """Полные циклы опроса: все группы всех устройств становятся к опросу одновременно"""
+    durations = []
+    transactions = simulator.transactions
+    cpu = time.thread_time()
+    for _ in range(cycles):
+        for device in devices:
+            for obj in device.objects:
+                device._scheduler.schedule(obj, 0)
+        started = time.perf_counter()
+        await asyncio.gather(*(device.update() for device in devices))
+        durations.append(time.perf_counter() - started)
+    return {
+        "durations": durations,
+        "transactions": (simulator.transactions - transactions) / cycles,
+        "cpu_per_device": (time.thread_time() - cpu) / cycles / len(devices),
+    }
+
+
+async def measure_toggles(devices: list, simulated: dict, toggles: int, seed: int) -> list:
+    """Задержка подтверждения переключения реле на фоне опроса по общему расписанию шины"""
+    rng = random.Random(seed)
+    poller = asyncio.create_task(BusPoller(devices).async_run())
+    latencies = []
+    try:
+        for _ in range(toggles):
+            device = rng.choice(devices)
+            relay = next(obj for obj in device.objects if obj.register_type == RegisterType.coil)
+            channel = rng.randrange(relay.count)
+            target = not relay.get_state(channel)
+            confirmed = asyncio.get_running_loop().create_future()
+
+            def on_update(objects, relay=relay, channel=channel, target=target,
+                          sim=simulated[device.device_id], confirmed=confirmed):
+                # Подтверждено, когда прочитано состояние, совпадающее с реальным состоянием устройства
+                if relay in objects and sim.coils[channel] == target and not confirmed.done():
+                    confirmed.set_result(time.perf_counter())
+
+            remove = device.add_listener(on_update)
+            started = time.perf_counter()
+            try:
+                await relay.set_value(channel, target)
+                latencies.append(await asyncio.wait_for(confirmed, 10) - started)
+            except TimeoutError:
+                pass
+            finally:
+                remove()
+            await asyncio.sleep(rng.uniform(0.01, 0.1))
+    finally:
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+    return latencies
+
+
+async def run(args, count: int) -> None:
+    simulator = ModbusSimulator(
+        framer=args.framer, latency=args.latency, jitter=args.jitter, bus_time=args.bus_time,
+        drop_rate=args.drop_rate, exception_rate=args.exception_rate, corrupt_rate=args.corrupt_rate,
+        disconnect_rate=args.disconnect_rate, seed=args.seed,
+    )
+    simulated = {}
+    for device_id in range(1, count + 1):
+        simulated[device_id] = simulator.add_device(SimulatedDevice(device_id, model=args.model.upper()))
+    server = SimulatorThread(simulator)
+    port = server.start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        framer = FramerType.RTU if args.framer == "rtu" else FramerType.SOCKET
+        model = get_model(args.model)
+        devices = [
+            WBSmart(hass, "127.0.0.1", port, device_id, model, read_gap=args.read_gap,
+                    pipeline_depth=args.pipeline_depth, framer=framer, write_window=args.write_window)
+            for device_id in simulated
+        ]
+        if args.capture:
+            devices[0].hub.start_capture(f"{args.capture}.{count}" if len(args.devices) > 1 else args.capture)
+        try:
+            # Первый цикл читает и информацию об устройствах, в измерения не входит
+            await asyncio.gather(*(device.update(True) for device in devices))
+            cycles = await measure_poll_cycles(devices, simulator, args.cycles)
+            toggles = await measure_toggles(devices, simulated, args.toggles, args.seed)
+        finally:
+            if args.capture:
+                await devices[0].hub.stop_capture()
+            for device in devices:
+                device.detach()
+            server.stop()
+
+    print(f"Устройств: {count}")
+    print(f"  цикл опроса:           {format_ms(cycles['durations'])}")
+    print(f"  транзакций за цикл:    {cycles['transactions']:.1f}")
+    print(f"  переключение реле:     {format_ms(toggles)} (подтверждено {len(toggles)}/{args.toggles})")
+    print(f"  CPU на устройство:     {cycles['cpu_per_device'] * 1000:.3f} мс за цикл")
+    print(f"  сбоев симулятора:      {simulator.faults}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--toggles", type=int, default=20)
+    parser.add_argument("--model", default="wbmr6", help="карта регистров и модель симулятора")
+    parser.add_argument("--framer", choices=("socket", "rtu"), default="socket")
+    parser.add_argument("--pipeline-depth", type=int, default=1)
+    parser.add_argument("--read-gap", type=int, default=8)
+    parser.add_argument("--write-window", type=int, default=10, help="окно объединения записей, мс")
+    parser.add_argument("--latency", type=float, default=0.002, help="сетевая задержка, с")
+    parser.add_argument("--jitter", type=float, default=0.0005, help="разброс сетевой задержки, с")
+    parser.add_argument("--bus-time", type=float, default=0.001, help="занятие шины одним запросом, с")
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--exception-rate", type=float, default=0.0)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--capture", help="файл записи обмена для benchmarks/replay.py")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL)
+    for count in args.devices:
+        asyncio.run(run(args, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Воспроизведение записи обмена со шлюзом: циклы опроса на ответах, записанных на объекте.
+
+Запись включается параметром "capture" записи конфигурации (файл wirenboard_<шлюз>.capture
+в каталоге конфигурации Home Assistant) или ключом --capture теста benchmarks/poll_cycle.py.
+Устройства опрашиваются через клиент воспроизведения: ответы и их задержки берутся из записи,
+поэтому время цикла, планирование и разбор регистров можно измерять без шлюза и повторяемо.
+
+Измеряется:
+- время цикла опроса всех групп всех устройств записи;
+- время процессора на одно устройство за цикл;
+- запросы, которых нет в записи.
+
+Запуск из корня репозитория (нужен установленный Home Assistant):
+    python benchmarks/replay.py wirenboard_192_168_1_10_502.capture --cycles 20 --time-scale 1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.wirenboard.capture import ModbusReplayClient, read_capture
+from custom_components.wirenboard.device import WBSmart
+from custom_components.wirenboard.hub import acquire_hub, release_hub
+from custom_components.wirenboard.identity import DeviceIdentity
+from custom_components.wirenboard.models import get_model
+
+REPLAY_HOST = "replay"
+REPLAY_PORT = 0
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def format_ms(values: list) -> str:
+    return (f"p50 {percentile(values, 50) * 1000:8.2f}  p95 {percentile(values, 95) * 1000:8.2f}  "
+            f"max {max(values, default=0) * 1000:8.2f} мс")
+
+
+def summarize(records: list) -> None:
+    outcomes = Counter(record.outcome.name for record in records)
+    functions = Counter(f"{record.function_code:#04x}" for record in records)
+    print(f"Транзакций в записи: {len(records)}")
+    print(f"  результаты:            {dict(outcomes)}")
+    print(f"  функции:               {dict(functions)}")
+    if records:
+        print(f"  продолжительность:     {records[-1].started - records[0].started:.1f} с")
+        print(f"  задержка ответа:       {format_ms([record.latency for record in records])}")
+
+
+async def run(args, records: list) -> None:
+    client = ModbusReplayClient(records, args.time_scale)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        model = get_model(args.model)
+        # Подключение с клиентом воспроизведения создается первым, устройства получают его из реестра
+        hub = acquire_hub(hass, REPLAY_HOST, REPLAY_PORT, client=client)
+        devices = [
+            WBSmart(hass, REPLAY_HOST, REPLAY_PORT, device_id, model, read_gap=args.read_gap,
+                    identity=DeviceIdentity(model.name, None, None, None))
+            for device_id in client.device_ids
+        ]
+        durations = []
+        try:
+            await asyncio.gather(*(device.update(True) for device in devices))
+            cpu = time.thread_time()
+            for _ in range(args.cycles):
+                for device in devices:
+                    for obj in device.objects:
+                        device._scheduler.schedule(obj, 0)
+                started = time.perf_counter()
+                await asyncio.gather(*(device.update() for device in devices))
+                durations.append(time.perf_counter() - started)
+            cpu = time.thread_time() - cpu
+        finally:
+            for device in devices:
+                device.detach()
+            release_hub(hub)
+
+    print(f"Устройств: {len(devices)} {client.device_ids}")
+    print(f"  цикл опроса:           {format_ms(durations)}")
+    print(f"  CPU на устройство:     {cpu / max(args.cycles, 1) / max(len(devices), 1) * 1000:.3f} мс за цикл")
+    print(f"  воспроизведено:        {client.replayed}, нет в записи: {client.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="файл записи обмена")
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--model", default="wbmr6c")
+    parser.add_argument("--read-gap", type=int, default=8)
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="множитель записанных задержек, 0 - без задержек")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL)
+    records = read_capture(args.path)
+    summarize(records)
+    asyncio.run(run(args, records))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""Симулятор шлюза Wiren Board с модулями WB-MR6 для тестов производительности из benchmarks/.
+
+Отвечает по Modbus TCP, RTU over TCP или через псевдотерминал как шина RS-485.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import pty
+import random
+import struct
+import time
+import tty
+
+from custom_components.wirenboard.protocol import (
+    EVENT_COIL,
+    EVENT_HOLDING,
+    EVENT_SYSTEM,
+    FAST_EVENTS_NONE,
+    FAST_EVENTS_REQUEST,
+    FAST_EVENTS_SETUP,
+    FAST_MODBUS,
+    FAST_MODBUS_BROADCAST,
+    FAST_SCAN_CONTINUE,
+    FAST_SCAN_START,
+    MBAP_HEADER,
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_COILS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_COIL,
+    WRITE_SINGLE_REGISTER,
+    FastModbusEvent,
+    check_rtu,
+    decode_events_setup_request,
+    encode_events,
+    encode_events_setup_response,
+    encode_mbap,
+    encode_rtu,
+    encode_scan_device,
+    encode_scan_end,
+    pack_bits,
+    unpack_bits,
+)
+
+from custom_components.wirenboard.timing import BusTiming
+
+_LOGGER = logging.getLogger(__name__)
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+SLAVE_DEVICE_BUSY = 6
+
+
+def _string_registers(value: str, count: int) -> list[int]:
+    return [ord(char) for char in value[:count]] + [0] * (count - len(value[:count]))
+
+
+class SimulatedDevice:
+    """Карта регистров модуля WB-MR6 для симулятора. model - строка модели в регистрах 200+:
+    WB-MR6C и другие модели с той же картой регистров задаются ею.
+
+    Без strict чтение незадокументированных holding регистров возвращает 0, а запись в них принимается,
+    как у большинства модулей Wiren Board. События Быстрого Modbus копятся в очереди,
+    пока их не заберет мастер.
+    """
+
+    CHANNELS = 6
+
+    def __init__(self, device_id: int, serial_number: int | None = None, model: str = "WBMR6",
+                 firmware: str = "1.17.0", bootloader: str = "1.2.0", strict: bool = False):
+        self.device_id = device_id
+        self.strict = strict
+        self.coils = [False] * self.CHANNELS
+        self.holding = {6: 1}
+        for channel in range(self.CHANNELS):
+            self.holding[9 + channel] = 0
+            self.holding[20 + channel] = 50
+            self.holding[32 + channel] = 0
+        # Вход 0
+        self.holding[16] = 2
+        self.holding[27] = 50
+        self.holding[39] = 0
+        # Счетчики коротких, длинных, двойных и "короткое, затем длинное" нажатий, вход 0 первым
+        for address in (464, 480, 496, 512):
+            for channel in range(self.CHANNELS + 1):
+                self.holding[address + channel] = 0
+        for channel in range(self.CHANNELS + 1):
+            # Время длинного нажатия и ожидания второго нажатия, мс
+            self.holding[1100 + channel] = 1000
+            self.holding[1140 + channel] = 300
+        serial_number = serial_number if serial_number is not None else 0x00A00000 + device_id
+        for address, values in (
+            (200, _string_registers(model, 20)),
+            (250, _string_registers(firmware, 16)),
+            (270, [serial_number >> 16 & 0xFFFF, serial_number & 0xFFFF]),
+            (330, _string_registers(bootloader, 7)),
+        ):
+            for offset, value in enumerate(values):
+                self.holding[address + offset] = value
+
+        self.events_enabled = set()
+        # Неподтвержденные события, отправленные мастеру, и очередь новых событий
+        self.sent_events: list[FastModbusEvent] = []
+        self.event_flag = 0
+        self.__queued: dict[tuple[int, int], FastModbusEvent] = {}
+        self.requests = 0
+        # Устройство не отвечает (обрыв линии, нет питания)
+        self.offline = False
+        # Дополнительная задержка ответа этого устройства, с
+        self.latency = 0.0
+        # Устройство отвечает на сканирование Быстрым Modbus (прошивки с поддержкой расширения)
+        self.fast_scan = True
+        self.serial_number = serial_number
+
+    @property
+    def has_events(self) -> bool:
+        return bool(self.sent_events or self.__queued)
+
+    def _queue_event(self, event_type: int, address: int, value: int):
+        if event_type != EVENT_SYSTEM and (event_type, address) not in self.events_enabled:
+            return
+        # Устройство хранит только последнее значение регистра
+        self.__queued[(event_type, address)] = FastModbusEvent(event_type, address, value)
+
+    def take_events(self, max_length: int) -> list[FastModbusEvent]:
+        events = []
+        length = 0
+        for key, event in list(self.__queued.items()):
+            size = 4 + (1 if event.event_type == EVENT_COIL else 2)
+            if length + size > max_length:
+                break
+            events.append(event)
+            length += size
+            del self.__queued[key]
+        return events
+
+    def set_coil(self, address: int, value: bool):
+        self.coils[address] = bool(value)
+        self._queue_event(EVENT_COIL, address, int(bool(value)))
+
+    def set_holding(self, address: int, value: int):
+        self.holding[address] = value & 0xFFFF
+        self._queue_event(EVENT_HOLDING, address, self.holding[address])
+
+    def press(self, channel: int, count: int = 1):
+        """Короткое нажатие кнопки на входе channel (0-6): увеличивает счетчики срабатываний и коротких нажатий"""
+        address = 39 if channel == 0 else 31 + channel
+        self.set_holding(address, (self.holding[address] + count) & 0xFFFF)
+        self.set_holding(464 + channel, (self.holding[464 + channel] + count) & 0xFFFF)
+
+    def reboot(self):
+        self.events_enabled.clear()
+        self.sent_events = []
+        self.__queued.clear()
+        self._queue_event(EVENT_SYSTEM, 0, 0)
+
+    def handle(self, pdu: bytes) -> bytes:
+        """Обрабатывает PDU запроса и возвращает PDU ответа"""
+        self.requests += 1
+        function_code = pdu[0]
+        if function_code == READ_COILS:
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            if address + count > self.CHANNELS:
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            data = pack_bits(self.coils[address:address + count])
+            return bytes((function_code, len(data))) + data
+        if function_code == READ_HOLDING_REGISTERS:
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            addresses = range(address, address + count)
+            if self.strict and any(a not in self.holding for a in addresses):
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            values = [self.holding.get(a, 0) for a in addresses]
+            return bytes((function_code, 2 * count)) + struct.pack(f">{count}H", *values)
+        if function_code == WRITE_SINGLE_COIL:
+            address, value = struct.unpack_from(">HH", pdu, 1)
+            if address >= self.CHANNELS:
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            self.set_coil(address, value == 0xFF00)
+            return pdu[:5]
+        if function_code == WRITE_SINGLE_REGISTER:
+            address, value = struct.unpack_from(">HH", pdu, 1)
+            if self.strict and address not in self.holding:
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            self.set_holding(address, value)
+            return pdu[:5]
+        if function_code == WRITE_MULTIPLE_COILS:
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            if address + count > self.CHANNELS:
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            for offset, value in enumerate(unpack_bits(pdu[6:6 + pdu[5]], count)):
+                self.set_coil(address + offset, value)
+            return pdu[:5]
+        if function_code == WRITE_MULTIPLE_REGISTERS:
+            address, count = struct.unpack_from(">HH", pdu, 1)
+            if self.strict and any(a not in self.holding for a in range(address, address + count)):
+                return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+            for offset, value in enumerate(struct.unpack_from(f">{count}H", pdu, 6)):
+                self.set_holding(address + offset, value)
+            return pdu[:5]
+        if function_code == FAST_MODBUS and pdu[1] == FAST_EVENTS_SETUP:
+            enabled = []
+            for event_type, address, count, priorities in decode_events_setup_request(pdu):
+                for offset in range(count):
+                    supported = self.__supports_event(event_type, address + offset)
+                    if supported and priorities[offset]:
+                        self.events_enabled.add((event_type, address + offset))
+                    else:
+                        self.events_enabled.discard((event_type, address + offset))
+                    enabled.append(supported and bool(priorities[offset]))
+            return encode_events_setup_response(enabled)
+        return self._exception(function_code, ILLEGAL_FUNCTION)
+
+    def __supports_event(self, event_type: int, address: int) -> bool:
+        if event_type == EVENT_COIL:
+            return address < self.CHANNELS
+        if event_type == EVENT_HOLDING:
+            return 32 <= address <= 39
+        return False
+
+    @staticmethod
+    def _exception(function_code: int, code: int) -> bytes:
+        return bytes((function_code | 0x80, code))
+
+
+class ModbusSimulator:
+    """Шлюз Modbus TCP или RTU over TCP с симулированными устройствами.
+
+    latency и jitter - сетевая задержка ответа, запросы в ней не мешают друг другу.
+    bus_time - время занятия шины RS-485 одним запросом, запросы ко всем устройствам
+    обслуживаются по очереди, как на настоящей шине.
+    Доли запросов *_rate завершаются сбоем: без ответа, с исключением "устройство занято",
+    с испорченным ответом или с разрывом соединения.
+    """
+
+    def __init__(self, framer: str = "socket", latency: float = 0.0, jitter: float = 0.0,
+                 bus_time: float = 0.0, drop_rate: float = 0.0, exception_rate: float = 0.0,
+                 corrupt_rate: float = 0.0, disconnect_rate: float = 0.0, seed: int | None = None,
+                 timing: BusTiming | None = None):
+        self.framer = framer
+        self.latency = latency
+        self.jitter = jitter
+        self.bus_time = bus_time
+        self.drop_rate = drop_rate
+        self.exception_rate = exception_rate
+        self.corrupt_rate = corrupt_rate
+        self.disconnect_rate = disconnect_rate
+        self.devices: dict[int, SimulatedDevice] = {}
+        self.transactions = 0
+        self.faults = 0
+        self.__random = random.Random(seed)
+        self.__bus = asyncio.Lock()
+        # Устройства, уже ответившие на текущее сканирование
+        self.__scanned = set()
+        self.__server: asyncio.AbstractServer | None = None
+        self.__clients = set()
+        self.port = None
+        # Время передачи кадров по шине на заданной скорости, добавляется к bus_time
+        self.timing = timing
+        # Наименьшая пауза между ответом и следующим запросом мастера (RTU), с
+        self.min_frame_gap: float | None = None
+        self.__pty: tuple[int, int] | None = None
+
+    def add_device(self, device: SimulatedDevice) -> SimulatedDevice:
+        self.devices[device.device_id] = device
+        return device
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self.__server = await asyncio.start_server(self.__handle_client, host, port)
+        self.port = self.__server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def start_pty(self) -> str:
+        """Обслуживает запросы RTU через псевдотерминал, как адаптер RS-485. Возвращает путь к порту для мастера"""
+        self.framer = "rtu"
+        master, slave = pty.openpty()
+        tty.setraw(slave)
+        self.__pty = (master, slave)
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(master, "rb", 0))
+        transport, protocol = await loop.connect_write_pipe(
+            asyncio.streams.FlowControlMixin, os.fdopen(os.dup(master), "wb", 0)
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        task = loop.create_task(self.__handle_client(reader, writer))
+        self.__clients.add(task)
+        return os.ttyname(slave)
+
+    async def stop(self):
+        if self.__pty is not None:
+            for task in list(self.__clients):
+                task.cancel()
+            await asyncio.gather(*self.__clients, return_exceptions=True)
+            os.close(self.__pty[1])
+            self.__pty = None
+        if self.__server is not None:
+            self.__server.close()
+            for task in list(self.__clients):
+                task.cancel()
+            await asyncio.gather(*self.__clients, return_exceptions=True)
+            await self.__server.wait_closed()
+            self.__server = None
+
+    def __fault(self, rate: float) -> bool:
+        if rate and self.__random.random() < rate:
+            self.faults += 1
+            return True
+        return False
+
+    async def _respond(self, device_id: int, pdu: bytes) -> tuple[int, bytes] | None:
+        """Возвращает (адрес отвечающего устройства, PDU ответа) или None, если ответа нет"""
+        self.transactions += 1
+        delay = self.latency + (self.__random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with self.__bus:
+            if self.bus_time:
+                await asyncio.sleep(self.bus_time)
+            if device_id == FAST_MODBUS_BROADCAST and pdu[0] == FAST_MODBUS and pdu[1] == FAST_EVENTS_REQUEST:
+                return self.__handle_events_request(pdu)
+            if device_id == FAST_MODBUS_BROADCAST and pdu[0] == FAST_MODBUS and pdu[1] in (FAST_SCAN_START,
+                                                                                         FAST_SCAN_CONTINUE):
+                return self.__handle_scan(pdu)
+            device = self.devices.get(device_id)
+            if device is None or device.offline or self.__fault(self.drop_rate):
+                return None
+            if device.latency:
+                await asyncio.sleep(device.latency)
+            if self.__fault(self.exception_rate):
+                response = SimulatedDevice._exception(pdu[0], SLAVE_DEVICE_BUSY)
+            else:
+                response = device.handle(pdu)
+            if self.timing is not None:
+                await asyncio.sleep(self.timing.transaction_time(len(pdu), len(response)))
+            return device_id, response
+
+    def __handle_scan(self, pdu: bytes) -> tuple[int, bytes] | None:
+        if pdu[1] == FAST_SCAN_START:
+            self.__scanned.clear()
+        # Арбитраж: из еще не ответивших устройств отвечает устройство с меньшим серийным номером
+        candidates = sorted((device.serial_number, device_id) for device_id, device in self.devices.items()
+                            if device.fast_scan and not device.offline and device_id not in self.__scanned)
+        if not candidates:
+            return FAST_MODBUS_BROADCAST, encode_scan_end()
+        serial_number, device_id = candidates[0]
+        self.__scanned.add(device_id)
+        return FAST_MODBUS_BROADCAST, encode_scan_device(serial_number, device_id)
+
+    def __handle_events_request(self, pdu: bytes) -> tuple[int, bytes]:
+        min_device_id, max_length, confirm_device_id, confirm_flag = pdu[2:6]
+        confirmed = self.devices.get(confirm_device_id)
+        if confirmed is not None and confirmed.sent_events and confirmed.event_flag == confirm_flag:
+            confirmed.sent_events = []
+
+        # Арбитраж: первым отвечает устройство с событиями и адресом не меньше min_device_id
+        candidates = sorted(device_id for device_id, device in self.devices.items() if device.has_events)
+        if not candidates:
+            return FAST_MODBUS_BROADCAST, bytes((FAST_MODBUS, FAST_EVENTS_NONE))
+        device_id = next((d for d in candidates if d >= min_device_id), candidates[0])
+        device = self.devices[device_id]
+        if not device.sent_events:
+            device.sent_events = device.take_events(max_length)
+            device.event_flag ^= 1
+        return device_id, encode_events(device.event_flag, device.sent_events)
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.__clients.add(task)
+        requests = set()
+        replied = None
+        try:
+            while True:
+                if self.framer == "rtu":
+                    # RTU: следующий запрос мастер отправляет только после ответа на предыдущий
+                    started, frame = await self.__read_rtu_request(reader)
+                    if replied is not None:
+                        gap = started - replied
+                        if self.min_frame_gap is None or gap < self.min_frame_gap:
+                            self.min_frame_gap = gap
+                    if not check_rtu(frame):
+                        continue
+                    await self.__reply(writer, None, frame[0], frame[1:-2])
+                    replied = time.monotonic()
+                else:
+                    # Modbus TCP: запросы обслуживаются параллельно, ответы различаются по transaction id
+                    header = await reader.readexactly(MBAP_HEADER.size)
+                    tid, _, length, device_id = MBAP_HEADER.unpack(header)
+                    pdu = await reader.readexactly(length - 1)
+                    request = asyncio.create_task(self.__reply(writer, tid, device_id, pdu))
+                    requests.add(request)
+                    request.add_done_callback(requests.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Отключение клиента или остановка симулятора
+            pass
+        finally:
+            for request in list(requests):
+                request.cancel()
+            self.__clients.discard(task)
+            writer.close()
+
+    async def __reply(self, writer: asyncio.StreamWriter, tid: int | None, device_id: int, pdu: bytes):
+        response = await self._respond(device_id, pdu)
+        if response is None or writer.is_closing():
+            return
+        if self.__fault(self.disconnect_rate):
+            writer.close()
+            return
+        if tid is None:
+            frame = encode_rtu(*response)
+        else:
+            frame = encode_mbap(tid, *response)
+        if self.__fault(self.corrupt_rate):
+            frame = frame[:-1] + bytes(((frame[-1] + 1) & 0xFF,))
+        writer.write(frame)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    async def __read_rtu_request(reader: asyncio.StreamReader) -> tuple[float, bytes]:
+        """Читает кадр запроса. Возвращает время прихода начала кадра и кадр"""
+        head = await reader.readexactly(2)
+        return time.monotonic(), head + await ModbusSimulator.__read_rtu_tail(reader, head)
+
+    @staticmethod
+    async def __read_rtu_tail(reader: asyncio.StreamReader, head: bytes) -> bytes:
+        function_code = head[1]
+        if function_code in (WRITE_MULTIPLE_COILS, WRITE_MULTIPLE_REGISTERS):
+            header = await reader.readexactly(5)
+            return header + await reader.readexactly(header[4] + 2)
+        if function_code == FAST_MODBUS:
+            subcommand = await reader.readexactly(1)
+            if subcommand[0] == FAST_EVENTS_REQUEST:
+                return subcommand + await reader.readexactly(4 + 2)
+            if subcommand[0] == FAST_EVENTS_SETUP:
+                size = await reader.readexactly(1)
+                return subcommand + size + await reader.readexactly(size[0] + 2)
+            return subcommand + await reader.readexactly(2)
+        return await reader.readexactly(6)
@@ -1,13 +1,53 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
 import async_timeout
+from pymodbus.framer import FramerType
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN
-from .device import WBMr
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_IDS,
+    CONF_SERIAL_PORT,
+    CONF_BAUDRATE,
+    DEFAULT_BAUDRATE,
+    CONF_BYTESIZE,
+    DEFAULT_BYTESIZE,
+    CONF_PARITY,
+    DEFAULT_PARITY,
+    CONF_STOPBITS,
+    DEFAULT_STOPBITS,
+    CONF_IDENTITIES,
+    DEVICE_RETRY_INTERVAL,
+    CONF_UPDATE_INFO,
+    CONF_READ_GAP,
+    CONF_PIPELINE_DEPTH,
+    DEFAULT_PIPELINE_DEPTH,
+    CONF_FRAMER,
+    DEFAULT_FRAMER,
+    FRAMER_RTU,
+    CONF_FAST_MODBUS,
+    DEFAULT_FAST_MODBUS,
+    CONF_WRITE_WINDOW,
+    DEFAULT_WRITE_WINDOW,
+    CONF_CAPTURE,
+    DEFAULT_CAPTURE,
+)
+from .config_cache import DATA_CONFIG_CACHE, ConfigCache
+from .device import WBSmart
+from .hub import acquire_hub, release_hub
+from .identity import MODEL_REGISTERS, DeviceIdentity, async_read_firmware, async_read_identity
+from .models import async_get_model, async_probe_features, find_model
+from .request_queue import PRIORITY_BACKGROUND
+from .services import async_setup_services
+from .snapshot import SnapshotStore
+from .timing import SerialSettings, default_read_gap
 from .coordinator import WBCoordinator
 
 PLATFORMS = [
@@ -16,46 +56,243 @@ PLATFORMS = [
     "sensor",
     "switch",
     "number",
+    "event",
 ]
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Службы модуля и сохраненные регистры настроек устройств - общие для всех записей конфигурации"""
+    config_cache = ConfigCache(hass)
+    await config_cache.async_load()
+    hass.data[DATA_CONFIG_CACHE] = config_cache
+    async_setup_services(hass)
+    return True
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     name = entry.data["name"]
-    host_ip = entry.data["host_ip"]
-    host_port = entry.data["host_port"]
-    device_id = entry.data["device_id"]
+    # Запись шины содержит список адресов, запись одного устройства - один адрес
+    device_ids = entry_device_ids(entry)
 
     hass.data.setdefault(DOMAIN, {})
-    wb_device = WBMr(hass, host_ip, host_port, device_id)
+    pipeline_depth = entry.options.get(CONF_PIPELINE_DEPTH, DEFAULT_PIPELINE_DEPTH)
+    framer = FramerType.RTU if entry.options.get(CONF_FRAMER, DEFAULT_FRAMER) == FRAMER_RTU else FramerType.SOCKET
+    fast_modbus = entry.options.get(CONF_FAST_MODBUS, DEFAULT_FAST_MODBUS)
+    serial = entry_serial_settings(entry)
+    read_gap = entry.options.get(CONF_READ_GAP, default_read_gap(serial))
+    if serial is None:
+        host_ip = entry.data["host_ip"]
+        host_port = entry.data["host_port"]
+    else:
+        # Шина на последовательном порту: подключение определяется портом и скоростью
+        host_ip, host_port, framer = serial.port, serial.baudrate, FramerType.RTU
+    # Подключение удерживается на время определения моделей, чтобы устройства получили его готовым
+    hub = acquire_hub(hass, host_ip, host_port, framer, pipeline_depth, serial)
+    try:
+        identities = await async_identify_devices(hass, entry, hub, device_ids)
+        if not identities:
+            raise ConfigEntryNotReady(f"Timeout while connecting {host_ip}")
+        wb_devices = []
+        for device_id in device_ids:
+            identity = identities.get(device_id)
+            if identity is None:
+                continue
+            if identity.model_map is None:
+                _LOGGER.warning(f"Устройство {device_id} модели {identity.model} не поддерживается и не подключено")
+                continue
+            model = await async_get_model(hass, identity.model_map)
+            wb_devices.append(WBSmart(hass, host_ip, host_port, device_id, model,
+                                      read_gap=read_gap,
+                                      pipeline_depth=pipeline_depth,
+                                      framer=framer,
+                                      fast_modbus=fast_modbus,
+                                      write_window=entry.options.get(CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW),
+                                      identity=identity,
+                                      serial=serial,
+                                      config_cache=hass.data.get(DATA_CONFIG_CACHE)))
+        if entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE) and wb_devices:
+            # Запись ведется, пока подключение к шлюзу используется хотя бы одной записью конфигурации
+            hub.start_capture(capture_path(hass, host_ip, host_port))
+    finally:
+        release_hub(hub)
 
-    wb_coordinator = WBCoordinator(hass, entry, wb_device)
+    wb_coordinator = WBCoordinator(hass, entry, wb_devices)
 
     hass.data[DOMAIN][entry.entry_id] = wb_coordinator
 
-    _LOGGER.info(f"Создано устройство {wb_device.name}")
+    _LOGGER.info(f"{name}: созданы устройства {[wb_device.name for wb_device in wb_devices]}")
 
-    # Извлекает исходные данные, чтобы они у нас были при подписке на объекты
-    # Если обновление завершится неудачно, async_config_entry_first_refresh поднимет ConfigEntryNotReady
-    # и программа установки повторит попытку позже
-    try:
-        async with async_timeout.timeout(20):
-            await wb_coordinator.async_config_entry_first_refresh()
-    except ValueError as ex:
-        raise ConfigEntryNotReady(f"Timeout while connecting {host_ip}") from ex
+    # Если значения регистров сохранены при прошлой работе, сущности создаются сразу из снимка,
+    # а первое чтение выполняется в фоне
+    restored = await wb_coordinator.async_restore_snapshot()
+    if not restored:
+        # Извлекает исходные данные, чтобы они у нас были при подписке на объекты
+        # Если обновление завершится неудачно, async_config_entry_first_refresh поднимет ConfigEntryNotReady
+        # и программа установки повторит попытку позже
+        try:
+            async with async_timeout.timeout(20):
+                await wb_coordinator.async_config_entry_first_refresh()
+        except (ValueError, TimeoutError) as ex:
+            hass.data[DOMAIN].pop(entry.entry_id)
+            wb_coordinator.detach()
+            raise ConfigEntryNotReady(f"Timeout while connecting {host_ip}") from ex
+        except ConfigEntryNotReady:
+            hass.data[DOMAIN].pop(entry.entry_id)
+            wb_coordinator.detach()
+            raise
     hass.async_create_task(
         hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     )
+    wb_coordinator.async_start_polling(setup=restored)
+    entry.async_create_background_task(
+        hass, async_check_firmware(hass, entry, wb_devices), f"Wirenboard firmware check {name}"
+    )
+    missing = [device_id for device_id in device_ids if device_id not in identities]
+    if missing:
+        entry.async_create_background_task(
+            hass, async_wait_devices(hass, entry, wb_devices[0].hub, missing), f"Wirenboard wait devices {name}"
+        )
+    # Изменение параметров применяется перезагрузкой записи
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
+
+def entry_device_ids(entry: ConfigEntry) -> list[int]:
+    """Адреса устройств записи: список для записи шины, один адрес для записи устройства"""
+    device_ids = entry.data.get(CONF_DEVICE_IDS)
+    if device_ids:
+        return list(device_ids)
+    return [entry.data["device_id"]]
+
+
+def capture_path(hass: HomeAssistant, host, port) -> str:
+    """Файл записи обмена со шлюзом в каталоге конфигурации Home Assistant"""
+    name = re.sub(r"[^0-9A-Za-z]+", "_", f"{host}_{port}").strip("_")
+    return hass.config.path(f"{DOMAIN}_{name}.capture")
+
+
+def entry_serial_settings(entry: ConfigEntry) -> SerialSettings | None:
+    """Параметры последовательного порта записи шины RS-485 на хосте. None - подключение через шлюз"""
+    if CONF_SERIAL_PORT not in entry.data:
+        return None
+    return SerialSettings(
+        entry.data[CONF_SERIAL_PORT],
+        entry.data.get(CONF_BAUDRATE, DEFAULT_BAUDRATE),
+        entry.data.get(CONF_BYTESIZE, DEFAULT_BYTESIZE),
+        entry.data.get(CONF_PARITY, DEFAULT_PARITY),
+        entry.data.get(CONF_STOPBITS, DEFAULT_STOPBITS),
+    )
+
+
+async def async_identify_devices(hass: HomeAssistant, entry: ConfigEntry, hub, device_ids: list[int]
+                                 ) -> dict[int, DeviceIdentity]:
+    """Идентификация устройств записи: из записи конфигурации, а если ее нет - чтением с устройств.
+    Устройства, которые не удалось определить, в результат не входят"""
+    cached = entry.data.get(CONF_IDENTITIES, {})
+    update_info = entry.options.get(CONF_UPDATE_INFO)
+    identities = {}
+    unknown = []
+    for device_id in device_ids:
+        data = cached.get(str(device_id))
+        if data is None or update_info:
+            unknown.append(device_id)
+        else:
+            identities[device_id] = DeviceIdentity.from_dict(data)
+    if not unknown:
+        return identities
+
+    # Устройства опрашиваются одновременно, неотвечающее устройство не задерживает остальные
+    results = await asyncio.gather(*(async_identify_device(hass, hub, device_id) for device_id in unknown),
+                                   return_exceptions=True)
+    for device_id, result in zip(unknown, results):
+        if isinstance(result, DeviceIdentity):
+            identities[device_id] = result
+        else:
+            _LOGGER.warning(f"Не удалось определить устройство {device_id} на шлюзе {hub.host}: {result!r}")
+
+    # Слушатель изменений записи еще не подписан, поэтому сохранение не вызывает перезагрузку
+    options = {key: value for key, value in entry.options.items() if key != CONF_UPDATE_INFO}
+    hass.config_entries.async_update_entry(
+        entry,
+        data={**entry.data, CONF_IDENTITIES: {
+            **cached, **{str(device_id): identity.as_dict() for device_id, identity in identities.items()}
+        }},
+        options=options,
+    )
+    return identities
+
+
+async def async_identify_device(hass: HomeAssistant, hub, device_id: int) -> DeviceIdentity:
+    """Определяет модель и поддерживаемые регистры устройства"""
+    async with async_timeout.timeout(20):
+        await hub.connect()
+        identity = await async_read_identity(hub, device_id)
+        if identity.model is None:
+            raise ValueError(f"Устройство {device_id} не ответило на чтение модели")
+        model_map = find_model(identity.model)
+        if model_map is None:
+            # Карта другой модели может записать в устройство не те регистры: устройство не подключается.
+            # Идентификация сохраняется, модель определяется заново параметром update_info
+            _LOGGER.warning(f"Нет карты регистров для модели {identity.model} устройства {device_id}")
+            return identity
+        identity.model_map = model_map
+        identity.features = await async_probe_features(hub, device_id, await async_get_model(hass, model_map))
+
+    _LOGGER.info(f"Устройство {device_id} определено как {identity.model}, карта регистров {model_map}")
+    return identity
+
+
+async def async_check_firmware(hass: HomeAssistant, entry: ConfigEntry, devices: list[WBSmart]) -> None:
+    """Сверяет прошивки устройств с сохраненными. После обновления прошивки модель определяется заново"""
+    changed = []
+    for device in devices:
+        identity = device.identity
+        if identity is None:
+            continue
+        firmware = await async_read_firmware(device.hub, device.device_id, PRIORITY_BACKGROUND)
+        if firmware is None or firmware == identity.firmware:
+            continue
+        _LOGGER.info(f"Прошивка устройства {device.name} изменилась: {identity.firmware} -> {firmware}. "
+                     f"Определяем модель и регистры заново")
+        changed.append(str(device.device_id))
+    if not changed:
+        return
+    identities = {key: value for key, value in entry.data.get(CONF_IDENTITIES, {}).items() if key not in changed}
+    # Изменение записи перезагружает ее через слушатель изменений
+    hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_IDENTITIES: identities})
+
+
+async def async_wait_devices(hass: HomeAssistant, entry: ConfigEntry, hub, device_ids: list[int]) -> None:
+    """Ждет ответа устройств шины, не определенных при загрузке, и перезагружает запись, чтобы добавить их"""
+    while True:
+        await asyncio.sleep(DEVICE_RETRY_INTERVAL)
+        for device_id in device_ids:
+            if await hub.async_read_holding_register_string(*MODEL_REGISTERS, device_id, PRIORITY_BACKGROUND):
+                _LOGGER.info(f"Устройство {device_id} на шлюзе {hub.host} ответило, добавляем его")
+                hass.config_entries.async_schedule_reload(entry.entry_id)
+                return
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload config entry when options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Удаляет сохраненный снимок регистров вместе с записью"""
+    await SnapshotStore(hass, entry.entry_id, dict).async_remove()
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        # TODO Реализовать отключение соединения по MODBUS
-        #hass.data[DOMAIN][entry.entry_id]._hub.disconnect()
-        hass.data[DOMAIN].pop(entry.entry_id)
+        # Подключение к шлюзу закрывается, когда от него отсоединится последнее устройство
+        wb_coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        wb_coordinator.detach()
 
     return unload_ok
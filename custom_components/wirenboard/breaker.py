@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from enum import Enum
+
+from .const import (
+    BREAKER_BASE_DELAY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_JITTER,
+    BREAKER_MAX_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BreakerState(Enum):
+    closed = 1
+    open = 2
+    half_open = 3
+
+
+class CircuitBreaker:
+    """Автомат отключения обмена с неотвечающим устройством или шлюзом.
+
+    closed - обмен идет как обычно. После threshold неудач подряд автомат размыкается (open):
+    обращения отклоняются сразу, не занимая шину и очередь шлюза. Через задержку автомат
+    пропускает одну пробу (half_open): успех замыкает его, неудача снова размыкает
+    с удвоенной задержкой, не больше max_delay. Задержка случайно отклоняется на jitter,
+    чтобы устройства, пропавшие вместе (например, при потере питания шины), не проверялись одновременно.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_FAILURE_THRESHOLD, base_delay: float = BREAKER_BASE_DELAY,
+                 max_delay: float = BREAKER_MAX_DELAY, jitter: float = BREAKER_JITTER):
+        self.__name = name
+        self.__threshold = threshold
+        self.__base_delay = base_delay
+        self.__max_delay = max_delay
+        self.__jitter = jitter
+        self.__state = BreakerState.closed
+        # Неудачи подряд в замкнутом состоянии
+        self.__failures = 0
+        # Размыкания подряд без успешной пробы: показатель задержки
+        self.__opened = 0
+        self.__retry_at = 0.0
+        self.__trips = 0
+
+    @property
+    def state(self) -> BreakerState:
+        return self.__state
+
+    @property
+    def is_closed(self) -> bool:
+        return self.__state == BreakerState.closed
+
+    @property
+    def failures(self) -> int:
+        return self.__failures
+
+    @property
+    def trips(self) -> int:
+        """Сколько раз автомат размыкался из замкнутого состояния"""
+        return self.__trips
+
+    @property
+    def retry_at(self) -> float | None:
+        """Время следующей пробы по time.monotonic(). None - автомат замкнут"""
+        return None if self.__state == BreakerState.closed else self.__retry_at
+
+    def allow(self, now: float | None = None) -> bool:
+        """Можно ли обращаться. Первое обращение после задержки становится пробой,
+        остальные отклоняются до ее результата"""
+        if self.__state == BreakerState.closed:
+            return True
+        if self.__state == BreakerState.half_open:
+            return False
+        if (time.monotonic() if now is None else now) < self.__retry_at:
+            return False
+        self.__state = BreakerState.half_open
+        _LOGGER.debug(f"{self.__name}: проверка связи")
+        return True
+
+    def record_success(self):
+        if self.__state != BreakerState.closed:
+            _LOGGER.info(f"{self.__name}: связь восстановлена")
+        self.__state = BreakerState.closed
+        self.__failures = 0
+        self.__opened = 0
+
+    def record_failure(self, now: float | None = None):
+        self.__failures += 1
+        if self.__state == BreakerState.closed and self.__failures < self.__threshold:
+            return
+        if self.__state == BreakerState.closed:
+            self.__trips += 1
+        self.__opened += 1
+        delay = min(self.__base_delay * 2 ** (self.__opened - 1), self.__max_delay)
+        delay *= 1 + random.uniform(-self.__jitter, self.__jitter)
+        self.__retry_at = (time.monotonic() if now is None else now) + delay
+        if self.__state == BreakerState.closed:
+            _LOGGER.warning(f"{self.__name} не отвечает: обмен приостановлен, проверка через {delay:.1f} с")
+        else:
+            _LOGGER.debug(f"{self.__name} не отвечает: следующая проверка через {delay:.1f} с")
+        self.__state = BreakerState.open
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.__state.name,
+            "failures": self.__failures,
+            "trips": self.__trips,
+            "retry_in": max(self.__retry_at - time.monotonic(), 0.0) if self.retry_at is not None else None,
+        }
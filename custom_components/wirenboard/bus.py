@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from .const import BUS_LOAD_LIMIT, POLL_RETRY_INTERVAL
+from .timing import BusTiming
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BusPoller:
+    """Единое расписание опроса устройств одной шины.
+
+    Цикл опроса устройства запускается, когда наступает срок его ближайшей группы.
+    Устройства, срок которых наступил, запускаются в порядке сроков, а их запросы
+    чередуются в очереди подключения к шлюзу по приоритету и порядку поступления:
+    у устройства в полете не больше одного запроса опроса, поэтому устройство с
+    большим числом групп не занимает шину целиком.
+
+    Медленное или неотвечающее устройство не задерживает остальные: его цикл
+    выполняется в отдельной задаче, а следующий цикл этого устройства не
+    начинается, пока не закончится предыдущий.
+    """
+
+    def __init__(self, devices: list, timing: BusTiming | None = None):
+        self.__devices = list(devices)
+        # Время передачи кадров по шине. Известно для шины на последовательном порту
+        self.__timing = timing
+        self.__load = None
+        self.__budget_changed = True
+        # Устройство -> задача текущего цикла опроса
+        self.__running: dict = {}
+        self.__wakeup = asyncio.Event()
+        for device in self.__devices:
+            device.set_schedule_listener(self.wakeup)
+
+    @property
+    def devices(self) -> list:
+        return self.__devices
+
+    @property
+    def running(self) -> int:
+        """Количество устройств, цикл опроса которых выполняется"""
+        return len(self.__running)
+
+    @property
+    def load(self) -> float | None:
+        """Доля времени шины, которую занимает опрос с заданными интервалами групп"""
+        return self.__load
+
+    def wakeup(self):
+        """Пересчитывает ближайший срок опроса, например после изменения расписания устройства"""
+        self.__budget_changed = True
+        self.__wakeup.set()
+
+    def __budget(self):
+        """Растягивает интервалы опроса всех устройств, если с заданными интервалами опрос не помещается на шину"""
+        self.__budget_changed = False
+        if self.__timing is None:
+            return
+        self.__load = sum(device.bus_load(self.__timing) for device in self.__devices)
+        scale = max(self.__load / BUS_LOAD_LIMIT, 1.0)
+        if scale > 1.0 and scale != self.__devices[0].interval_scale:
+            _LOGGER.warning(f"Опрос с заданными интервалами занимает {self.__load:.0%} времени шины "
+                            f"{self.__timing.baudrate} бод. Интервалы опроса увеличены в {scale:.2f} раза")
+        for device in self.__devices:
+            device.interval_scale = scale
+
+    async def async_run(self):
+        """Опрашивает устройства по расписанию до отмены задачи"""
+        try:
+            while True:
+                self.__wakeup.clear()
+                if self.__budget_changed:
+                    self.__budget()
+                now = time.monotonic()
+                next_due = None
+                due = []
+                for device in self.__devices:
+                    if device in self.__running:
+                        continue
+                    device_due = device.next_due
+                    if device_due is None:
+                        continue
+                    if device_due <= now:
+                        due.append((device_due, device.device_id, device))
+                    elif next_due is None or device_due < next_due:
+                        next_due = device_due
+                for _, _, device in sorted(due, key=lambda item: item[:2]):
+                    self.__start(device)
+
+                # Все группы прочитаны однократно - проверяем расписание с интервалом повтора
+                delay = POLL_RETRY_INTERVAL if next_due is None else next_due - now
+                try:
+                    await asyncio.wait_for(self.__wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+        finally:
+            for task in self.__running.values():
+                task.cancel()
+            await asyncio.gather(*self.__running.values(), return_exceptions=True)
+            for device in self.__devices:
+                device.set_schedule_listener(None)
+
+    def __start(self, device):
+        task = asyncio.get_running_loop().create_task(self.__poll(device))
+        self.__running[device] = task
+
+    async def __poll(self, device):
+        try:
+            await device.update()
+        except Exception as e:
+            _LOGGER.error(f"Неожиданная ошибка опроса {device.name}: {e}")
+        finally:
+            self.__running.pop(device, None)
+            # Устройство освободилось: его следующий срок мог уже наступить
+            self.__wakeup.set()
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import struct
+import time
+from collections import deque
+from enum import Enum
+
+from pymodbus.exceptions import ModbusIOException
+
+from .const import CAPTURE_BUFFER_RECORDS, CAPTURE_MAX_BYTES
+from .protocol import (
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_COILS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+    ModbusResponse,
+    pack_bits,
+    unpack_bits,
+)
+
+# Заголовок файла записи: сигнатура, версия формата, время создания файла по часам
+# и time.monotonic() в тот же момент, чтобы перевести время записей в дату
+CAPTURE_MAGIC = b"WBCAP"
+CAPTURE_VERSION = 1
+_HEADER = struct.Struct("<5sBdd")
+# Запись транзакции: начало по time.monotonic(), задержка, адрес устройства, код функции,
+# результат, адрес первого регистра, количество регистров, длина данных. Далее данные:
+# значения ответа чтения, значения запроса записи или код исключения
+_RECORD = struct.Struct("<dfBBBHHH")
+
+
+class CaptureOutcome(Enum):
+    ok = 0
+    # Устройство ответило исключением Modbus
+    exception = 1
+    # Ответа нет
+    timeout = 2
+    # Ошибка клиента или подключения
+    error = 3
+    # Запрос прерван, например, по сроку чтения цикла опроса
+    cancelled = 4
+
+
+class CaptureRecord:
+    """Транзакция из файла записи обмена"""
+
+    __slots__ = ("started", "latency", "device_id", "function_code", "outcome", "address", "count", "values")
+
+    def __init__(self, started: float, latency: float, device_id: int, function_code: int, outcome: CaptureOutcome,
+                 address: int, count: int, values: list | int | None):
+        self.started = started
+        self.latency = latency
+        self.device_id = device_id
+        self.function_code = function_code
+        self.outcome = outcome
+        self.address = address
+        self.count = count
+        # Значения ответа чтения или запроса записи. Для исключения - его код
+        self.values = values
+
+    @property
+    def key(self) -> tuple:
+        """По ключу воспроизведение сопоставляет запрос с записанными транзакциями"""
+        return self.device_id, self.function_code, self.address, self.count
+
+
+def _encode(function_code: int, args: tuple, kwargs: dict, result) -> tuple[int, int, bytes]:
+    """Адрес, количество регистров и данные транзакции клиента.
+    Аргументы - как у методов клиентов: адрес первым, затем значения записи или count"""
+    if function_code in (READ_HOLDING_REGISTERS, READ_COILS):
+        count = kwargs.get("count", 1)
+        if result is None:
+            return args[0], count, b""
+        if function_code == READ_COILS:
+            return args[0], count, pack_bits(result.bits[:count])
+        return args[0], count, struct.pack(f">{len(result.registers)}H", *result.registers)
+    if function_code == WRITE_SINGLE_REGISTER:
+        return args[0], 1, struct.pack(">H", args[1])
+    if function_code == WRITE_MULTIPLE_REGISTERS:
+        return args[0], len(args[1]), struct.pack(f">{len(args[1])}H", *args[1])
+    if function_code == WRITE_MULTIPLE_COILS:
+        return args[0], len(args[1]), pack_bits(args[1])
+    # События Быстрого Modbus записываются без данных: воспроизведение их не поддерживает
+    return 0, 0, b""
+
+
+def _decode(function_code: int, outcome: CaptureOutcome, count: int, data: bytes):
+    if outcome == CaptureOutcome.exception:
+        return data[0] if data else 0
+    if not data:
+        return None
+    if function_code in (READ_COILS, WRITE_MULTIPLE_COILS):
+        return unpack_bits(data, count)
+    return list(struct.unpack(f">{len(data) // 2}H", data))
+
+
+class CaptureWriter:
+    """Запись обмена со шлюзом в двоичный файл.
+
+    Транзакция упаковывается в кольцевой буфер в памяти; при переполнении буфера
+    теряются самые старые записи. Буфер сбрасывается в файл вне цикла событий методом flush.
+    Файл дописывается в конец; когда его размер достигает половины max_bytes, он переименовывается
+    в path.1 (прежний path.1 удаляется), поэтому на диске хранится последний обмен объемом
+    не больше max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = CAPTURE_MAX_BYTES, buffer_records: int = CAPTURE_BUFFER_RECORDS):
+        self.__path = path
+        self.__max_bytes = max_bytes
+        self.__buffer = deque(maxlen=buffer_records)
+        self.__dropped = 0
+        self.__records = 0
+        self.__file = None
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @property
+    def records(self) -> int:
+        return self.__records
+
+    @property
+    def dropped(self) -> int:
+        """Записи, потерянные при переполнении буфера"""
+        return self.__dropped
+
+    def record(self, started: float, latency: float, device_id: int, function_code: int, outcome: CaptureOutcome,
+               args: tuple, kwargs: dict, result=None):
+        """Добавляет транзакцию в буфер. Вызывается в цикле событий, к диску не обращается"""
+        try:
+            address, count, data = _encode(function_code, args, kwargs, result if outcome == CaptureOutcome.ok
+                                           else None)
+        except (IndexError, struct.error, TypeError):
+            address, count, data = 0, 0, b""
+        if outcome == CaptureOutcome.exception:
+            data = bytes((getattr(result, "exception_code", 0) & 0xFF,))
+        if len(self.__buffer) == self.__buffer.maxlen:
+            self.__dropped += 1
+        self.__buffer.append(_RECORD.pack(started, latency, device_id & 0xFF, function_code, outcome.value,
+                                          address & 0xFFFF, count & 0xFFFF, len(data)) + data)
+        self.__records += 1
+
+    def as_dict(self) -> dict:
+        return {"path": self.__path, "records": self.__records, "dropped": self.__dropped}
+
+    def flush(self):
+        """Дописывает накопленные записи в файл. Выполняется в потоке исполнителя"""
+        if not self.__buffer:
+            return
+        chunks = []
+        while self.__buffer:
+            try:
+                chunks.append(self.__buffer.popleft())
+            except IndexError:
+                break
+        data = b"".join(chunks)
+        if self.__file is None:
+            self.__open()
+        elif self.__file.tell() + len(data) > self.__max_bytes // 2:
+            self.__file.close()
+            self.__open()
+        self.__file.write(data)
+        self.__file.flush()
+
+    def __open(self):
+        # Время записей отсчитывается по time.monotonic() своего запуска: каждый запуск начинает новый файл
+        if os.path.exists(self.__path):
+            os.replace(self.__path, f"{self.__path}.1")
+        self.__file = open(self.__path, "wb")
+        self.__file.write(_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, time.time(), time.monotonic()))
+
+    def close(self):
+        self.flush()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+def read_capture_file(path: str) -> list[CaptureRecord]:
+    """Транзакции одного файла записи в порядке записи"""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, _, _ = _HEADER.unpack_from(data, 0)
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION:
+        raise ValueError(f"{path} не является записью обмена версии {CAPTURE_VERSION}")
+    records = []
+    position = _HEADER.size
+    while position + _RECORD.size <= len(data):
+        started, latency, device_id, function_code, outcome, address, count, length = \
+            _RECORD.unpack_from(data, position)
+        position += _RECORD.size
+        if position + length > len(data):
+            # Последняя запись не дописана (например, при отключении питания)
+            break
+        outcome = CaptureOutcome(outcome)
+        records.append(CaptureRecord(started, latency, device_id, function_code, outcome, address, count,
+                                     _decode(function_code, outcome, count, data[position:position + length])))
+        position += length
+    return records
+
+
+def read_capture(path: str) -> list[CaptureRecord]:
+    """Все сохраненные транзакции записи: сначала из path.1, затем из path"""
+    records = []
+    for file_path in (f"{path}.1", path):
+        if os.path.exists(file_path):
+            records.extend(read_capture_file(file_path))
+    return records
+
+
+class ModbusReplayClient:
+    """Клиент, отвечающий на запросы записанными ответами вместо обмена со шлюзом.
+
+    Запрос сопоставляется с записанными транзакциями по адресу устройства, коду функции,
+    адресу и количеству регистров. Ответы одного ключа выдаются в порядке записи, по кругу,
+    с записанной задержкой, умноженной на time_scale (0 - без задержки). Транзакции без ответа
+    воспроизводятся тайм-аутом. Запрос, которого в записи нет, завершается тайм-аутом сразу.
+    Повторяет используемую часть интерфейса клиентов pymodbus.
+    """
+
+    def __init__(self, records: list[CaptureRecord], time_scale: float = 1.0):
+        self.__time_scale = time_scale
+        self.__transactions: dict[tuple, list[CaptureRecord]] = {}
+        for record in records:
+            self.__transactions.setdefault(record.key, []).append(record)
+        self.__positions = dict.fromkeys(self.__transactions, 0)
+        self.__connected = False
+        self.replayed = 0
+        self.misses = 0
+
+    @property
+    def device_ids(self) -> list[int]:
+        """Адреса устройств, опрос которых есть в записи"""
+        return sorted({key[0] for key in self.__transactions if key[1] in (READ_COILS, READ_HOLDING_REGISTERS)})
+
+    @property
+    def connected(self) -> bool:
+        return self.__connected
+
+    async def connect(self) -> bool:
+        self.__connected = True
+        return True
+
+    def close(self):
+        self.__connected = False
+
+    async def read_coils(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__replay(device_id, READ_COILS, address, count)
+
+    async def read_holding_registers(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__replay(device_id, READ_HOLDING_REGISTERS, address, count)
+
+    async def write_register(self, address: int, value: int, device_id: int = 1):
+        return await self.__replay(device_id, WRITE_SINGLE_REGISTER, address, 1)
+
+    async def write_registers(self, address: int, values: list, device_id: int = 1):
+        return await self.__replay(device_id, WRITE_MULTIPLE_REGISTERS, address, len(values))
+
+    async def write_coils(self, address: int, values: list, device_id: int = 1):
+        return await self.__replay(device_id, WRITE_MULTIPLE_COILS, address, len(values))
+
+    async def __replay(self, device_id: int, function_code: int, address: int, count: int):
+        key = (device_id, function_code, address, count)
+        transactions = self.__transactions.get(key)
+        if not transactions:
+            self.misses += 1
+            raise ModbusIOException(f"Запроса {key} нет в записи обмена")
+        position = self.__positions[key]
+        self.__positions[key] = (position + 1) % len(transactions)
+        record = transactions[position]
+        self.replayed += 1
+        if self.__time_scale:
+            await asyncio.sleep(record.latency * self.__time_scale)
+        if record.outcome == CaptureOutcome.exception:
+            return ModbusResponse(function_code | 0x80, device_id, exception_code=record.values)
+        if record.outcome != CaptureOutcome.ok:
+            raise ModbusIOException(f"Запрос {key} записан без ответа ({record.outcome.name})")
+        if function_code == READ_COILS:
+            return ModbusResponse(function_code, device_id, bits=record.values)
+        if function_code == READ_HOLDING_REGISTERS:
+            return ModbusResponse(function_code, device_id, registers=record.values)
+        return ModbusResponse(function_code, device_id)
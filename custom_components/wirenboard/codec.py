@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+import struct
+import sys
+from array import array
+from itertools import repeat
+from operator import mul
+
+# Тип данных -> (формат struct одного значения, количество регистров)
+DATA_TYPES = {
+    "u16": ("H", 1),
+    "s16": ("h", 1),
+    "u32": ("I", 2),
+    "s32": ("i", 2),
+    "u64": ("Q", 4),
+    "float32": ("f", 2),
+    "bitfield": ("H", 1),
+    "string": (None, None),
+    # coil регистры
+    "bool": (None, 1),
+}
+
+WORD_ORDERS = ("big", "little")
+
+# Регистры Modbus передаются старшим байтом вперед, массив uint16 хранит их в порядке хоста
+_SWAP_BYTES = sys.byteorder == "little"
+
+
+def decode_string(registers) -> str:
+    """Строка регистров Wiren Board: символ в каждом регистре, завершается нулями"""
+    return "".join(map(chr, registers)).rstrip("\0")
+
+
+def _big_endian(registers) -> bytes:
+    raw = array("H", registers)
+    if _SWAP_BYTES:
+        raw.byteswap()
+    return raw.tobytes()
+
+
+class RegisterCodec:
+    """Преобразование регистров группы в значения сущностей и обратно.
+
+    Значения группы занимают по width регистров подряд. Группа целиком разбирается
+    одним вызовом struct, подготовленного для количества значений группы, по байтам регистров.
+    word_order - порядок регистров многорегистрового значения: big - старший регистр первым.
+    scale - множитель значения; при scale != 1 значения округляются до его разрядов.
+    """
+
+    __slots__ = ("__data_type", "__width", "__reverse", "__scale", "__digits",
+                 "__fmt", "__structs", "__value_struct", "__words", "__shift", "__mask")
+
+    def __init__(self, data_type: str = "u16", count: int = 1, word_order: str = "big", scale: float = 1,
+                 length: int | None = None, bit_offset: int = 0, bit_count: int = 1):
+        if data_type not in DATA_TYPES:
+            raise ValueError(f"Неизвестный тип данных: {data_type}")
+        if word_order not in WORD_ORDERS:
+            raise ValueError(f"Неизвестный порядок регистров: {word_order}")
+        fmt, width = DATA_TYPES[data_type]
+        if data_type == "string":
+            width = length or 1
+        self.__data_type = data_type
+        self.__width = width
+        # Значения с младшим регистром первым разбираются в обратном порядке регистров
+        self.__reverse = word_order == "little" and width > 1 and fmt is not None
+        self.__scale = scale
+        self.__digits = max(0, -math.floor(math.log10(abs(scale)))) if scale not in (0, 1) else 0
+        self.__fmt = fmt
+        # Количество значений -> struct разбора всех значений группы
+        self.__structs = {}
+        if fmt:
+            self.__struct(count)
+        self.__value_struct = struct.Struct(f">{fmt}") if fmt else None
+        self.__words = struct.Struct(f">{width}H")
+        self.__shift = bit_offset
+        self.__mask = (1 << bit_count) - 1
+
+    def __struct(self, count: int) -> struct.Struct:
+        compiled = self.__structs.get(count)
+        if compiled is None:
+            compiled = self.__structs[count] = struct.Struct(f">{count}{self.__fmt}")
+        return compiled
+
+    @property
+    def data_type(self) -> str:
+        return self.__data_type
+
+    @property
+    def width(self) -> int:
+        """Количество регистров одного значения"""
+        return self.__width
+
+    @property
+    def is_integer(self) -> bool:
+        return self.__data_type not in ("float32", "string") and self.__scale == 1
+
+    def decode(self, registers) -> tuple:
+        """Разбирает регистры всей группы (count * width) в кортеж значений"""
+        if self.__data_type == "string":
+            width = self.__width
+            return tuple(decode_string(registers[position:position + width])
+                         for position in range(0, len(registers), width))
+        if self.__data_type == "u16":
+            values = tuple(registers)
+        elif self.__data_type == "bool":
+            return tuple(map(bool, registers))
+        else:
+            if self.__reverse:
+                registers = registers[::-1]
+            values = self.__struct(len(registers) // self.__width).unpack(_big_endian(registers))
+            if self.__reverse:
+                values = values[::-1]
+            if self.__data_type == "bitfield":
+                shift, mask = self.__shift, self.__mask
+                values = tuple((value >> shift) & mask for value in values)
+        if self.__scale != 1:
+            # map вместо генератора: умножение и округление без интерпретатора на каждое значение
+            values = tuple(map(round, map(mul, values, repeat(self.__scale)), repeat(self.__digits)))
+        return values
+
+    def encode(self, value, current: int = 0) -> list[int]:
+        """Регистры одного значения для записи. current - текущее значение регистра битового поля:
+        остальные биты регистра сохраняются"""
+        if self.__data_type == "bool":
+            return [int(bool(value))]
+        if self.__data_type == "string":
+            codes = [ord(char) for char in str(value)[:self.__width]]
+            return codes + [0] * (self.__width - len(codes))
+        if self.__scale != 1:
+            value = value / self.__scale
+        if self.__data_type != "float32":
+            value = int(round(value))
+        if self.__data_type == "bitfield":
+            value = (current & ~(self.__mask << self.__shift) | (value & self.__mask) << self.__shift) & 0xFFFF
+        registers = list(self.__words.unpack(self.__value_struct.pack(value)))
+        if self.__reverse:
+            registers.reverse()
+        return registers
+
+
+def compile_codec(data: dict, count: int, coil: bool = False) -> RegisterCodec:
+    """Кодек группы из описания в карте регистров модели"""
+    return RegisterCodec(
+        "bool" if coil else data.get("data_type", "u16"),
+        count,
+        data.get("word_order", "big"),
+        data.get("scale", 1),
+        data.get("length"),
+        data.get("bit_offset", 0),
+        data.get("bit_count", 1),
+    )
+
+
+# Разовые чтения вне групп: серийный номер и т.п.
+UINT32 = RegisterCodec("u32")
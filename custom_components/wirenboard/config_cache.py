@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import CONFIG_CACHE_SAVE_DELAY, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+CONFIG_CACHE_STORAGE_VERSION = 1
+# Ключ hass.data: кэш общий для всех записей конфигурации
+DATA_CONFIG_CACHE = f"{DOMAIN}_config_cache"
+
+
+class ConfigCache:
+    """Регистры групп настроек устройств в хранилище Home Assistant.
+
+    Записи хранятся по серийному номеру устройства и действительны только для той прошивки
+    и карты регистров, с которыми прочитаны: после обновления прошивки группы читаются заново,
+    и прежняя запись устройства заменяется.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self.__store = Store(hass, CONFIG_CACHE_STORAGE_VERSION, f"{DOMAIN}.config_cache")
+        # Серийный номер -> {"firmware", "model", "groups": {name_id: {"addresses", "values"}}}
+        self.__devices = {}
+        self.__scheduled = False
+
+    async def async_load(self):
+        try:
+            data = await self.__store.async_load()
+        except Exception as e:
+            _LOGGER.warning(f"Не удалось прочитать сохраненные регистры настроек: {e}")
+            return
+        if data is not None:
+            self.__devices = data.get("devices", {})
+
+    def get(self, key: tuple[str, str], model: str, obj) -> list | None:
+        """Сохраненные регистры группы или None, если их нет или они прочитаны с другой прошивкой"""
+        serial_number, firmware = key
+        device = self.__devices.get(serial_number)
+        if device is None or device.get("firmware") != firmware or device.get("model") != model:
+            return None
+        group = device["groups"].get(obj.name_id)
+        if group is None or tuple(group.get("addresses", ())) != obj.addresses:
+            return None
+        return group["values"]
+
+    def put(self, key: tuple[str, str], model: str, obj):
+        """Сохраняет регистры группы, прочитанные с устройства"""
+        values = list(obj.registers)
+        if None in values:
+            return
+        serial_number, firmware = key
+        device = self.__devices.get(serial_number)
+        if device is None or device.get("firmware") != firmware or device.get("model") != model:
+            device = self.__devices[serial_number] = {"firmware": firmware, "model": model, "groups": {}}
+        group = {"addresses": list(obj.addresses), "values": values}
+        if device["groups"].get(obj.name_id) == group:
+            return
+        device["groups"][obj.name_id] = group
+        self.__schedule_save()
+
+    def invalidate(self, key: tuple[str, str], obj):
+        """Удаляет регистры группы: значение на устройстве меняется нашей записью"""
+        device = self.__devices.get(key[0])
+        if device is not None and device["groups"].pop(obj.name_id, None) is not None:
+            self.__schedule_save()
+
+    def __schedule_save(self):
+        if self.__scheduled:
+            return
+        self.__scheduled = True
+        self.__store.async_delay_save(self.__data, CONFIG_CACHE_SAVE_DELAY)
+
+    def __data(self) -> dict:
+        self.__scheduled = False
+        return {"devices": self.__devices}
@@ -10,9 +10,46 @@ import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow, ConfigFlowResult
 from homeassistant.core import callback
 from homeassistant import config_entries
+from homeassistant.helpers import config_validation as cv
 # from homeassistant.components.modbus import modbus
 
-from .const import DOMAIN
+from .const import (
+    DOMAIN,
+    CONF_DEVICE_IDS,
+    CONF_SERIAL_PORT,
+    DEFAULT_SERIAL_PORT,
+    CONF_BAUDRATE,
+    DEFAULT_BAUDRATE,
+    BAUDRATES,
+    CONF_BYTESIZE,
+    DEFAULT_BYTESIZE,
+    BYTESIZES,
+    CONF_PARITY,
+    DEFAULT_PARITY,
+    PARITIES,
+    CONF_STOPBITS,
+    DEFAULT_STOPBITS,
+    MIN_DEVICE_ID,
+    MAX_DEVICE_ID,
+    CONF_UPDATE_INFO,
+    CONF_READ_GAP,
+    CONF_PIPELINE_DEPTH,
+    DEFAULT_PIPELINE_DEPTH,
+    CONF_FRAMER,
+    DEFAULT_FRAMER,
+    FRAMER_SOCKET,
+    FRAMER_RTU,
+    CONF_FAST_MODBUS,
+    DEFAULT_FAST_MODBUS,
+    CONF_WRITE_WINDOW,
+    DEFAULT_WRITE_WINDOW,
+    CONF_CAPTURE,
+    DEFAULT_CAPTURE,
+)
+from . import entry_serial_settings
+from .discovery import DiscoveredDevice, async_probe_device, async_scan_bus
+from .rtu import ModbusSerialClient
+from .timing import SerialSettings, default_read_gap
 
 STEP_TCP_DATA_SCHEMA = vol.Schema(
     {
@@ -20,14 +57,93 @@ STEP_TCP_DATA_SCHEMA = vol.Schema(
         vol.Required("host_ip", default="192.168.0.7"): str,
         vol.Required("host_port", default=502): int,
         vol.Required("device_id", default=116): int,
+        vol.Required(CONF_FRAMER, default=DEFAULT_FRAMER): vol.In([FRAMER_SOCKET, FRAMER_RTU]),
+    }
+)
+
+STEP_SERIAL_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required("name", default="WB_RS485"): str,
+        vol.Required(CONF_SERIAL_PORT, default=DEFAULT_SERIAL_PORT): str,
+        vol.Required(CONF_BAUDRATE, default=DEFAULT_BAUDRATE): vol.In(BAUDRATES),
+        vol.Required(CONF_BYTESIZE, default=DEFAULT_BYTESIZE): vol.In(BYTESIZES),
+        vol.Required(CONF_PARITY, default=DEFAULT_PARITY): vol.In(PARITIES),
+        vol.Required(CONF_STOPBITS, default=DEFAULT_STOPBITS): vol.In([1, 2]),
+        vol.Required(CONF_DEVICE_IDS): str,
     }
 )
 
-async def async_validate_device(port, address: str | None, device_id:int) -> None:
-    # Простая валидация - считаем что устройство доступно
-    # Детальная проверка будет происходить при инициализации интеграции
-    # TODO Реализовать проверку заполнения свойств
-    pass
+STEP_DISCOVERY_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required("host_ip", default="192.168.0.7"): str,
+        vol.Required("host_port", default=502): int,
+        vol.Required(CONF_FRAMER, default=DEFAULT_FRAMER): vol.In([FRAMER_SOCKET, FRAMER_RTU]),
+    }
+)
+
+STEP_BUS_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required("name", default="WB_Bus"): str,
+        vol.Required("host_ip", default="192.168.0.7"): str,
+        vol.Required("host_port", default=502): int,
+        vol.Required(CONF_DEVICE_IDS): str,
+    }
+)
+
+
+def parse_device_ids(text: str) -> list[int]:
+    """Разбирает список адресов устройств шины: "1, 2, 10-12" -> [1, 2, 10, 11, 12]"""
+    device_ids = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = (int(value) for value in part.split("-", 1))
+                values = range(first, last + 1)
+            else:
+                values = [int(part)]
+        except ValueError:
+            raise ValueError(f"Неверный адрес устройства: {part}")
+        for device_id in values:
+            if not MIN_DEVICE_ID <= device_id <= MAX_DEVICE_ID:
+                raise ValueError(f"Адрес устройства {device_id} вне диапазона {MIN_DEVICE_ID}-{MAX_DEVICE_ID}")
+            if device_id not in device_ids:
+                device_ids.append(device_id)
+    if not device_ids:
+        raise ValueError("Не указаны адреса устройств")
+    return device_ids
+
+
+def format_device_ids(device_ids: list[int]) -> str:
+    return ", ".join(str(device_id) for device_id in device_ids)
+
+
+async def async_validate_device(port, address: str | None, device_id:int, framer: str = DEFAULT_FRAMER) -> None:
+    # Проверяем, что устройство отвечает. Модель и регистры определяются при загрузке записи
+    if not await async_probe_device(address, port, framer, device_id):
+        raise ValueError(f"Устройство {device_id} на шлюзе {address}:{port} не отвечает")
+
+
+async def async_validate_serial(settings: SerialSettings) -> None:
+    # Проверяем, что порт открывается с заданными параметрами. Устройства проверяются при загрузке записи
+    client = ModbusSerialClient(settings)
+    try:
+        await client.connect()
+    except (OSError, ValueError, asyncio.TimeoutError) as e:
+        raise ValueError(f"Не удалось открыть порт {settings.port}: {e}") from e
+    finally:
+        client.close()
+
+
+def _device_label(device: DiscoveredDevice) -> str:
+    label = f"{device.device_id}: {device.model or '?'}"
+    if device.serial_number is not None:
+        label += f" (S/N {device.serial_number})"
+    if device.model_map is None:
+        label += " - модель не поддерживается"
+    return label
 
 
 class WBSmartConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -37,7 +153,53 @@ class WBSmartConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     async def async_step_user(self, user_input: Optional[dict(str, Any)] = None):
         """Invoke when a user initiates a flow via the user interface."""
-        return await self.async_step_tcp(user_input)
+        # Одно устройство или шина: одно подключение к шлюзу и несколько устройств
+        return self.async_show_menu(step_id="user", menu_options=["discovery", "tcp", "bus", "serial"])
+
+    async def async_step_discovery(self, user_input: Optional[dict(str, Any)] = None):
+        """Scan a gateway for devices and add the found ones as a bus entry."""
+        errors: dict(str, str) = {}
+
+        if user_input is not None:
+            try:
+                self.__found = await async_scan_bus(
+                    user_input["host_ip"], user_input["host_port"], user_input[CONF_FRAMER]
+                )
+            except ValueError as error:
+                errors["base"] = str(error)
+            else:
+                if self.__found:
+                    self.__gateway = user_input
+                    return await self.async_step_select()
+                errors["base"] = "Устройства не найдены"
+        return self.async_show_form(
+            step_id="discovery", data_schema=STEP_DISCOVERY_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_select(self, user_input: Optional[dict(str, Any)] = None):
+        """Choose which of the found devices to add."""
+        devices = {str(device.device_id): _device_label(device) for device in self.__found}
+        if user_input is not None and user_input[CONF_DEVICE_IDS]:
+            self.data = {
+                "name": user_input["name"],
+                "host_ip": self.__gateway["host_ip"],
+                "host_port": self.__gateway["host_port"],
+                CONF_DEVICE_IDS: sorted(int(device_id) for device_id in user_input[CONF_DEVICE_IDS]),
+            }
+            return self.async_create_entry(
+                title=user_input["name"], data=self.data, options={CONF_FRAMER: self.__gateway[CONF_FRAMER]}
+            )
+        # По умолчанию выбраны устройства, для моделей которых есть карта регистров
+        schema = vol.Schema(
+            {
+                vol.Required("name", default="WB_Bus"): str,
+                vol.Required(
+                    CONF_DEVICE_IDS,
+                    default=[str(device.device_id) for device in self.__found if device.model_map is not None],
+                ): cv.multi_select(devices),
+            }
+        )
+        return self.async_show_form(step_id="select", data_schema=schema)
 
     async def async_step_tcp(self, user_input: Optional[dict(str, Any)] = None):
         """Configure ModBus TCP entry."""
@@ -49,19 +211,61 @@ class WBSmartConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     user_input["host_port"],
                     user_input["host_ip"],
                     user_input["device_id"],
+                    user_input[CONF_FRAMER],
                 )
             except ValueError as error:
                 errors["base"] = str(error)
             if not errors:
                 # Input is valid, set data.
-                self.data = user_input
+                # Тип обмена со шлюзом - параметр записи, его можно изменить в настройках
+                self.data = {key: value for key, value in user_input.items() if key != CONF_FRAMER}
 
-                await asyncio.sleep(1)
-                return self.async_create_entry(title=user_input["name"], data=self.data)
+                return self.async_create_entry(
+                    title=user_input["name"], data=self.data, options={CONF_FRAMER: user_input[CONF_FRAMER]}
+                )
         return self.async_show_form(
             step_id="tcp", data_schema=STEP_TCP_DATA_SCHEMA, errors=errors
         )
 
+    async def async_step_bus(self, user_input: Optional[dict(str, Any)] = None):
+        """Configure a bus entry: one gateway connection and several devices."""
+        errors: dict(str, str) = {}
+
+        if user_input is not None:
+            try:
+                device_ids = parse_device_ids(user_input[CONF_DEVICE_IDS])
+            except ValueError as error:
+                errors[CONF_DEVICE_IDS] = str(error)
+            if not errors:
+                self.data = {**user_input, CONF_DEVICE_IDS: device_ids}
+                return self.async_create_entry(title=user_input["name"], data=self.data)
+        return self.async_show_form(
+            step_id="bus", data_schema=STEP_BUS_DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_serial(self, user_input: Optional[dict(str, Any)] = None):
+        """Configure a bus on a local RS-485 adapter (Modbus RTU without a gateway)."""
+        errors: dict(str, str) = {}
+
+        if user_input is not None:
+            try:
+                device_ids = parse_device_ids(user_input[CONF_DEVICE_IDS])
+            except ValueError as error:
+                errors[CONF_DEVICE_IDS] = str(error)
+            try:
+                await async_validate_serial(SerialSettings(
+                    user_input[CONF_SERIAL_PORT], user_input[CONF_BAUDRATE], user_input[CONF_BYTESIZE],
+                    user_input[CONF_PARITY], user_input[CONF_STOPBITS],
+                ))
+            except ValueError as error:
+                errors["base"] = str(error)
+            if not errors:
+                self.data = {**user_input, CONF_DEVICE_IDS: device_ids}
+                return self.async_create_entry(title=user_input["name"], data=self.data)
+        return self.async_show_form(
+            step_id="serial", data_schema=STEP_SERIAL_DATA_SCHEMA, errors=errors
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(
@@ -76,18 +280,81 @@ class OptionsFlowHandler(OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         """Manage the options."""
+        errors: dict[str, str] = {}
+        bus = CONF_DEVICE_IDS in self.config_entry.data
+        # Промежуток по умолчанию вычисляется при загрузке записи (для шины RS-485 - по скорости),
+        # поэтому равное ему значение не сохраняется и продолжает следовать за параметрами шины
+        auto_read_gap = default_read_gap(entry_serial_settings(self.config_entry))
         if user_input is not None:
-            return self.async_create_entry(data=user_input)
+            if user_input.get(CONF_READ_GAP) == auto_read_gap:
+                user_input.pop(CONF_READ_GAP)
+            if bus:
+                # Список устройств шины хранится в данных записи, а не в параметрах
+                try:
+                    device_ids = parse_device_ids(user_input.pop(CONF_DEVICE_IDS))
+                except ValueError as error:
+                    errors[CONF_DEVICE_IDS] = str(error)
+                else:
+                    # Данные и параметры меняются одним обновлением: запись перезагружается один раз,
+                    # а сохранение тех же параметров при завершении мастера ее уже не меняет
+                    self.hass.config_entries.async_update_entry(
+                        self.config_entry,
+                        data={**self.config_entry.data, CONF_DEVICE_IDS: device_ids},
+                        options=user_input,
+                    )
+            if not errors:
+                return self.async_create_entry(data=user_input)
+
+        if bus:
+            device_field = {
+                vol.Required(
+                    CONF_DEVICE_IDS, default=format_device_ids(self.config_entry.data[CONF_DEVICE_IDS])
+                ): str,
+            }
+        else:
+            device_field = {vol.Required("device_id", default=self.config_entry.data["device_id"]): int}
+
+        # Адрес шлюза есть только у записей, подключенных через шлюз
+        if "host_ip" in self.config_entry.data:
+            gateway_fields = {
+                vol.Required("host_ip", default=self.config_entry.data["host_ip"]): str,
+                vol.Required("host_port", default=self.config_entry.data["host_port"]): int,
+            }
+        else:
+            gateway_fields = {}
 
         # Схема создается непосредственно в функции,
         # чтобы подставить значения из конфигурации
         option_schema = vol.Schema(
             {
                 vol.Required("name", default=self.config_entry.data["name"]): str,
-                vol.Required("host_ip", default=self.config_entry.data["host_ip"]): str,
-                vol.Required("host_port", default=self.config_entry.data["host_port"]): int,
-                vol.Required("device_id", default=self.config_entry.data["device_id"]): int,
-                vol.Optional("update_info"): bool,
+                **gateway_fields,
+                **device_field,
+                vol.Optional(CONF_UPDATE_INFO): bool,
+                vol.Optional(
+                    CONF_READ_GAP,
+                    default=self.config_entry.options.get(CONF_READ_GAP, auto_read_gap),
+                ): vol.All(int, vol.Range(min=0, max=64)),
+                vol.Optional(
+                    CONF_PIPELINE_DEPTH,
+                    default=self.config_entry.options.get(CONF_PIPELINE_DEPTH, DEFAULT_PIPELINE_DEPTH),
+                ): vol.All(int, vol.Range(min=1, max=16)),
+                vol.Optional(
+                    CONF_FRAMER,
+                    default=self.config_entry.options.get(CONF_FRAMER, DEFAULT_FRAMER),
+                ): vol.In([FRAMER_SOCKET, FRAMER_RTU]),
+                vol.Optional(
+                    CONF_FAST_MODBUS,
+                    default=self.config_entry.options.get(CONF_FAST_MODBUS, DEFAULT_FAST_MODBUS),
+                ): bool,
+                vol.Optional(
+                    CONF_WRITE_WINDOW,
+                    default=self.config_entry.options.get(CONF_WRITE_WINDOW, DEFAULT_WRITE_WINDOW),
+                ): vol.All(int, vol.Range(min=0, max=100)),
+                vol.Optional(
+                    CONF_CAPTURE,
+                    default=self.config_entry.options.get(CONF_CAPTURE, DEFAULT_CAPTURE),
+                ): bool,
             }
         )
 
@@ -96,4 +363,5 @@ class OptionsFlowHandler(OptionsFlow):
             data_schema=self.add_suggested_values_to_schema(
                 option_schema, self.config_entry.options
             ),
+            errors=errors,
         )
@@ -1,20 +1,130 @@
 DOMAIN = "wirenboard"
-INPUT_MODE_VALUES = {
-    0: "Кнопка без фиксации",
-    1: "Переключатель с фиксацией",
-    2: "Отключить все выходы",
-    3: "Управление отключено, вход измеряет частоту",
-    4: "Управлять по mapping-матрице",
-    6: "Управлять по mapping-матрице для кнопок",
-}
-INPUT_MODE_VALUES_0 = {
-    2: "Отключить все выходы",
-    3: "Управление отключено, вход измеряет частоту",
-    4: "Управлять по mapping-матрице",
-    6: "Управлять по mapping-матрице для кнопок",
-}
-STATUS_OUTPUTS_WHEN_POWER_APPLIED = {
-    0: "Перевести в безопасное состояние",
-    1: "Восстановить последнее состояние",
-    2: "Установить состояние выхода согласно состоянию входа",
-}
\ No newline at end of file
+
+# Запись шины: одно подключение к шлюзу и список адресов устройств на ней
+CONF_DEVICE_IDS = "device_ids"
+# Допустимые адреса устройств Modbus
+MIN_DEVICE_ID = 1
+MAX_DEVICE_ID = 247
+# Проверка устройств шины, не ответивших при загрузке записи, с
+DEVICE_RETRY_INTERVAL = 60
+
+# Поиск устройств на шине: ожидание ответа на один запрос, с, и количество запросов в полете (Modbus TCP).
+# За шлюзом Modbus TCP шина RS-485 обрабатывает запросы по одному: параллельные запросы ждут в очереди
+# шлюза и не укладываются в тайм-аут, поэтому адреса опрашиваются последовательно
+SCAN_TIMEOUT = 0.2
+SCAN_PIPELINE_DEPTH = 1
+# RTU over TCP: запросы идут по одному, ответ на чтение одного регистра приходит за десятки мс
+SCAN_RTU_TIMEOUT = 0.1
+# Проверка одного устройства при добавлении: ожидание ответа на чтение модели, с
+PROBE_TIMEOUT = 1
+
+# Шина RS-485 на последовательном порту хоста Home Assistant (Modbus RTU без шлюза)
+CONF_SERIAL_PORT = "serial_port"
+CONF_BAUDRATE = "baudrate"
+CONF_BYTESIZE = "bytesize"
+CONF_PARITY = "parity"
+CONF_STOPBITS = "stopbits"
+# Заводские настройки порта модулей Wiren Board: 9600 8N2
+DEFAULT_SERIAL_PORT = "/dev/ttyUSB0"
+DEFAULT_BAUDRATE = 9600
+DEFAULT_BYTESIZE = 8
+DEFAULT_PARITY = "N"
+DEFAULT_STOPBITS = 2
+BAUDRATES = [1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200]
+PARITIES = ["N", "E", "O"]
+BYTESIZES = [7, 8]
+# Оценка времени от конца запроса до начала ответа устройства, с
+SERIAL_TURNAROUND = 0.002
+# Ожидание ответа по последовательному порту сверх времени передачи кадров, с
+SERIAL_TIMEOUT = 0.5
+# Допустимая загрузка шины опросом. При большей загрузке интервалы опроса увеличиваются
+BUS_LOAD_LIMIT = 0.7
+
+# Сохраненные модель, прошивка, серийный номер и поддерживаемые регистры устройств: адрес -> идентификация
+CONF_IDENTITIES = "identities"
+# Параметр настроек: заново определить модель и регистры устройства при следующей загрузке
+CONF_UPDATE_INFO = "update_info"
+
+# Ограничения PDU Modbus на количество читаемых за один запрос значений
+MAX_READ_REGISTERS = 125
+MAX_READ_COILS = 2000
+# Наибольшее количество планов чтения, хранимых для разных наборов групп
+READ_PLAN_CACHE_SIZE = 256
+
+# Сколько лишних регистров допустимо прочитать, чтобы объединить группы в один запрос
+CONF_READ_GAP = "read_gap"
+DEFAULT_READ_GAP = 8
+
+# Количество запросов Modbus TCP, одновременно находящихся в полете. 1 - последовательный обмен
+CONF_PIPELINE_DEPTH = "pipeline_depth"
+DEFAULT_PIPELINE_DEPTH = 1
+
+# Повтор опроса группы после неудачного чтения, с
+POLL_RETRY_INTERVAL = 1
+# Группы, срок опроса которых наступает в пределах окна, читаются в одном цикле, с
+POLL_COALESCE_WINDOW = 0.02
+# Срок чтения одного диапазона регистров после ожидания в очереди шлюза, с.
+# Неответившая группа не задерживает остальные группы цикла дольше этого срока
+POLL_READ_DEADLINE = 5
+# Цикл опроса прекращается после стольких чтений подряд без ответа: устройство или шина недоступны
+POLL_MAX_TRANSPORT_FAILURES = 2
+
+# Автомат отключения обмена с неотвечающим устройством: циклов опроса с неудачей подряд до размыкания,
+# задержка первой пробы и наибольшая задержка, с, доля случайного отклонения задержки
+BREAKER_FAILURE_THRESHOLD = 2
+BREAKER_BASE_DELAY = 10
+BREAKER_MAX_DELAY = 300
+BREAKER_JITTER = 0.2
+# Автомат подключения к шлюзу размыкается после первой неудачной попытки подключения
+GATEWAY_BREAKER_THRESHOLD = 1
+GATEWAY_BREAKER_BASE_DELAY = 2
+
+# Быстрый Modbus Wiren Board: события вместо опроса. Требует шлюз в режиме RTU over TCP
+CONF_FAST_MODBUS = "fast_modbus"
+DEFAULT_FAST_MODBUS = False
+CONF_FRAMER = "framer"
+FRAMER_SOCKET = "socket"
+FRAMER_RTU = "rtu"
+DEFAULT_FRAMER = FRAMER_SOCKET
+# Пауза между запросами событий, когда событий нет, с
+FAST_MODBUS_EVENT_INTERVAL = 0.05
+# Максимальная длина данных событий в одном ответе, байт
+FAST_MODBUS_MAX_EVENTS_LENGTH = 100
+# Количество неудачных запросов событий подряд, после которого шлюз переходит на опрос
+FAST_MODBUS_MAX_FAILURES = 5
+# Контрольный опрос групп, состояние которых приходит событиями, с
+FAST_MODBUS_RESYNC_INTERVAL = 60
+
+# Ограничения PDU Modbus на количество записываемых за один запрос значений
+MAX_WRITE_REGISTERS = 123
+MAX_WRITE_COILS = 1968
+
+# Окно объединения записей соседних регистров в один запрос, мс. 0 - писать сразу
+CONF_WRITE_WINDOW = "write_window"
+DEFAULT_WRITE_WINDOW = 10
+
+# Снимок значений регистров для мгновенного запуска: задержка сохранения на диск, с
+SNAPSHOT_SAVE_DELAY = 60
+# Чтение групп настроек, восстановленных из снимка, откладывается после запуска, с
+SNAPSHOT_CONFIG_DELAY = 10
+
+# Регистры групп настроек (интервал 0), сохраняемые по серийному номеру и прошивке устройства.
+# Задержка сохранения на диск, с
+CONFIG_CACHE_SAVE_DELAY = 10
+# Сохраненные группы перечитываются в фоновой очереди после запуска и переподключения устройства
+# с задержкой, с, и далее с интервалом, с
+CONFIG_REVALIDATE_DELAY = 30
+CONFIG_REVALIDATE_INTERVAL = 6 * 3600
+
+# Запись обмена со шлюзом для воспроизведения вне объекта
+CONF_CAPTURE = "capture"
+DEFAULT_CAPTURE = False
+# Наибольший объем записи на диске, байт: текущий файл и предыдущий по половине
+CAPTURE_MAX_BYTES = 16 * 1024 * 1024
+# Транзакций в буфере между сбросами на диск; при переполнении теряются самые старые
+CAPTURE_BUFFER_RECORDS = 20000
+# Интервал сброса буфера записи на диск, с
+CAPTURE_FLUSH_INTERVAL = 5
+# Проверок heartbeat политики публикации за его интервал: публикация без изменений
+# опаздывает не больше чем на 1/HEARTBEAT_CHECKS интервала
+HEARTBEAT_CHECKS = 4
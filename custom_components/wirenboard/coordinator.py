@@ -1,45 +1,113 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
 import logging
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
     UpdateFailed,
 )
+from .bus import BusPoller
 from .device import WBSmart
+from .snapshot import SnapshotStore
 
 
 _LOGGER = logging.getLogger(__name__)
 
 class WBCoordinator(DataUpdateCoordinator):
-    def __init__(self, hass, config_entry, device):
+    def __init__(self, hass, config_entry, devices: list[WBSmart]):
 
+        # Периодического обновления нет: устройства опрашиваются по общему расписанию шины
+        # и сообщают координатору о каждой прочитанной группе
         super().__init__(
             hass,
             _LOGGER,
             name="Wirenboard coordinator",
             config_entry=config_entry,
-            update_interval=timedelta(seconds=1),
+            update_interval=None,
             always_update=True
         )
-        self.__device = device
-        self.__devices = []
+        self.__devices = list(devices)
+        self.__remove_listeners = [device.add_listener(self._handle_device_update) for device in self.__devices]
+        # Для шины на последовательном порту интервалы опроса согласуются с пропускной способностью шины
+        self.__poller = BusPoller(self.__devices, self.__devices[0].hub.bus_timing)
+        # Последние значения регистров сохраняются для мгновенного запуска
+        self.__snapshot = SnapshotStore(hass, config_entry.entry_id, self.__snapshot_data)
 
     @property
-    def devices(self):
+    def devices(self) -> list[WBSmart]:
         return self.__devices
 
-    def add_device(self, device:WBSmart):
-        self.__devices.append(device)
+    @property
+    def device(self) -> WBSmart:
+        """Первое устройство записи. У записи одного устройства - единственное"""
+        return self.__devices[0]
+
+    @property
+    def poller(self) -> BusPoller:
+        return self.__poller
 
     @property
-    def device(self):
-        return self.__device
+    def snapshot(self) -> SnapshotStore:
+        return self.__snapshot
+
+    def __snapshot_data(self) -> dict:
+        return {"devices": {str(device.device_id): device.snapshot() for device in self.__devices}}
+
+    async def async_restore_snapshot(self) -> bool:
+        """Восстанавливает значения регистров, сохраненные при прошлой работе.
+        Возвращает True, если восстановлено хотя бы одно устройство"""
+        snapshot = await self.__snapshot.async_load()
+        snapshots = snapshot.get("devices", {}) if snapshot is not None else {}
+        restored = False
+        for device in self.__devices:
+            device_snapshot = snapshots.get(str(device.device_id))
+            if device_snapshot is not None and device.restore(device_snapshot):
+                restored = True
+            # Группы настроек из сохраненных регистров прошивки устройства заменяют снимок и не читаются при запуске
+            device.restore_config()
+        return restored
+
+    def _handle_device_update(self, objects: tuple):
+        # Данные координатора - группы, обновленные последним чтением
+        self.async_set_updated_data(objects)
+        self.__snapshot.async_schedule_save()
+
+    def detach(self):
+        """Отсоединяет устройства записи от подключения к шлюзу"""
+        for device in self.__devices:
+            device.detach()
+
+    def async_start_polling(self, setup: bool = False):
+        """Запускает опрос устройств по расписанию шины. Задача останавливается при выгрузке записи.
+        setup - первое чтение еще не выполнено и выполняется в той же задаче"""
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self.__async_poll(setup),
+            f"Wirenboard poll {', '.join(device.name for device in self.__devices)}",
+        )
+        for remove_listener in self.__remove_listeners:
+            self.config_entry.async_on_unload(remove_listener)
+
+    async def __async_poll(self, setup: bool):
+        if setup:
+            await self._async_setup()
+            for device in self.__devices:
+                if not device.is_connected:
+                    # Устройство не ответило: сущности со значениями из снимка становятся недоступны
+                    self._handle_device_update(tuple(device.objects))
+        await self.__poller.async_run()
 
     async def _async_setup(self):
-        # await self.__device.update_info()
-        await self.__device.update(True)
+        # Устройства читаются одновременно: запросы чередуются в очереди шлюза,
+        # и неотвечающее устройство не задерживает первое чтение остальных
+        await asyncio.gather(*(self.__async_setup_device(device) for device in self.__devices))
+
+    @staticmethod
+    async def __async_setup_device(device: WBSmart):
+        await device.update(True)
+        await device.async_setup_events()
 
     async def _async_update_data(self):
-        await self.__device.update()
+        await asyncio.gather(*(device.update() for device in self.__devices))
+        return tuple(obj for device in self.__devices for obj in device.objects)
@@ -4,6 +4,7 @@ from enum import Enum
 import asyncio
 import time
 import logging
+from typing import NamedTuple
 import async_timeout
 from asyncio.exceptions import InvalidStateError
 # from bitstring import BitArray
@@ -11,13 +12,38 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
 from pymodbus import ModbusException
 from pymodbus.exceptions import ModbusIOException
-
-from .hub import async_modbus_hub
+from pymodbus.framer import FramerType
+
+from .hub import async_modbus_hub, acquire_hub, release_hub
+from .planner import ReadBlock, WriteRun, coalesce_writes, merge_ranges
+from .scheduler import PollScheduler
+from .protocol import (EVENT_COIL, EVENT_HOLDING, EVENT_SYSTEM, READ_COILS, READ_HOLDING_REGISTERS,
+                       ModbusDeviceError)
+from .request_queue import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_POLL
+from .metrics import PollStats, TransactionStats
+from .identity import DeviceIdentity, async_read_identity
+from .breaker import CircuitBreaker
+from .publish import CounterRate, counter_delta
+from .image import CoilImage, RegisterImage
+from .config_cache import ConfigCache
+from .timing import BusTiming, SerialSettings
 # from .registers import WBMRRegisters
 from .const import (
-INPUT_MODE_VALUES,
-INPUT_MODE_VALUES_0,
-STATUS_OUTPUTS_WHEN_POWER_APPLIED
+DEFAULT_READ_GAP,
+DEFAULT_PIPELINE_DEPTH,
+POLL_RETRY_INTERVAL,
+POLL_COALESCE_WINDOW,
+POLL_READ_DEADLINE,
+POLL_MAX_TRANSPORT_FAILURES,
+FAST_MODBUS_RESYNC_INTERVAL,
+SNAPSHOT_CONFIG_DELAY,
+CONFIG_REVALIDATE_DELAY,
+CONFIG_REVALIDATE_INTERVAL,
+MAX_WRITE_COILS,
+MAX_WRITE_REGISTERS,
+MAX_READ_COILS,
+MAX_READ_REGISTERS,
+DEFAULT_WRITE_WINDOW,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -35,45 +61,79 @@ class RegisterType(Enum):
     holding = 2
     sensor = 3
 
+# Типы событий Быстрого Modbus для типов регистров
+EVENT_TYPES = {
+    RegisterType.coil: EVENT_COIL,
+    RegisterType.holding: EVENT_HOLDING,
+}
+
+class WriteResult(NamedTuple):
+    """Итог записи нескольких регистров"""
+
+    # Адреса, которые не записаны: устройство отклонило запрос или не ответило
+    unwritten: list
+    # Записанные адреса, значение которых чтение не подтвердило
+    unconfirmed: list
+
+
+class ReadOutcome(Enum):
+    ok = 1
+    # Устройство ответило исключением Modbus (например, недопустимый адрес): связь есть, группа недоступна
+    exception = 2
+    # Ответа нет: устройство или шина недоступны
+    timeout = 3
+
+
 class GroupAddresses:
     def __init__(self, start_address: int, count: int):
         self.start_address = start_address
         self.count = count
 
 class DeviceObjectGroup:
-    def __init__(self, **kwargs):
-        self.__device = kwargs["device"]
-        self.__name = kwargs["name"]
-        self.__name_id = kwargs.get("name_id", "")
-        self.__platform = kwargs["platform"]
-        self.__update_interval = kwargs.get("update_interval", 0)
-        self.__register_type = kwargs["register_type"]
-        self.__entity_category = kwargs.get("entity_category", None)
-
-        start_address = kwargs["start_address"]
-        count = kwargs["count"]
-
-        self.__start_id = kwargs.get("start_id", 0)
-        self.__group_addresses = []
-        self.__addresses = []
-        self._register_statuses = [None] * count
+    """Состояние группы регистров устройства. Неизменяемое описание группы общее для устройств модели.
+
+    Значения регистров хранятся в образе регистров устройства: группа - участок образа
+    от spec.offset длиной spec.register_count. Значения сущностей разбираются кодеком
+    группы из всего участка сразу при первом обращении после чтения.
+    """
+
+    __slots__ = ("__device", "__spec", "__image", "__values", "__last_date", "__restored", "__unavailable",
+                 "__rates", "__counters", "__presses")
+
+    def __init__(self, device, spec, image: RegisterImage):
+        self.__device = device
+        self.__spec = spec
+        self.__image = image
+        # Разобранные значения сущностей. None - образ изменился после разбора
+        self.__values = None
         self.__last_date = 0
+        # Значения восстановлены из снимка и еще не прочитаны с устройства
+        self.__restored = False
+        # Номера значений, на чтение которых устройство ответило исключением. None - таких нет
+        self.__unavailable = None
+        # Скорости счетчиков группы по значениям. None - группа не считает скорость
+        self.__rates = [CounterRate(spec.rate_window, 16 * spec.codec.width) for _ in spec.addresses] \
+            if spec.rate_window else None
+        # Группа счетчиков нажатий: последние прочитанные значения и нажатия, еще не переданные сущностям событий
+        self.__counters = [None] * len(spec.addresses) if spec.event else None
+        self.__presses = [0] * len(spec.addresses) if spec.event else None
 
-        self.add_addresses(0, start_address, count)
+    @property
+    def spec(self):
+        return self.__spec
 
-        if 'address0' in kwargs:
-            self.add_addresses(0, kwargs["address0"], 1)
-            self._register_statuses.append(None)
-        # else:
-        #     _LOGGER.debug(f"device.py; {self.name}. address0 НЕ НАЙДЕН!")
+    @property
+    def index(self) -> int:
+        """Номер группы в карте регистров модели"""
+        return self.__spec.index
 
     @property
     def count(self):
-        return len(self.__addresses)
+        return len(self.__spec.addresses)
 
     @property
     def entity_category(self):
-        return self.__entity_category
+        return self.__spec.entity_category
 
     def get_channel(self, index: int) -> int | None:
         if self.count == 1:
@@ -87,147 +147,314 @@ class DeviceObjectGroup:
 
     @property
     def name(self):
-        return self.__name
+        return self.__spec.name
 
     @property
     def name_id(self):
-        return self.__name_id
+        return self.__spec.name_id
 
     @property
     def platform(self):
-        return self.__platform
+        return self.__spec.platform
 
     @property
     def register_type(self):
-        return self.__register_type
+        return self.__spec.register_type
 
     @property
     def start_id(self):
-        return self.__start_id
+        return self.__spec.start_id
 
     @property
     def update_interval(self):
-        return self.__update_interval
+        return self.__spec.update_interval
 
     @property
     def group_addresses(self):
-        return self.__group_addresses
+        return self.__spec.group_addresses
 
     @property
     def addresses(self):
-        return self.__addresses
+        return self.__spec.addresses
 
     def address(self, index):
-        return self.__addresses[index]
+        return self.__spec.addresses[index]
+
+    @property
+    def scale(self):
+        return self.__spec.scale
+
+    @property
+    def unit(self):
+        return self.__spec.unit
 
     @property
     def last_date(self):
+        """Время последнего ответа устройства на чтение группы"""
         return self.__last_date
 
-    def add_addresses(self, index:int, start_address:int, count:int):
-        self.__group_addresses.insert(index, GroupAddresses(start_address, count))
-        start_pos = index
-        for i in range(count):
-            self.__addresses.insert(start_pos + i, start_address + i)
+    @property
+    def unavailable(self) -> tuple:
+        """Номера значений, на чтение которых устройство ответило исключением"""
+        return tuple(sorted(self.__unavailable)) if self.__unavailable else ()
+
+    def is_available(self, index: int) -> bool:
+        return not self.__unavailable or index not in self.__unavailable
+
+    def __indices(self, position: int, count: int) -> range:
+        width = self.__spec.codec.width
+        return range(position // width, (position + count - 1) // width + 1)
+
+    def set_unavailable(self, group_addr):
+        """Отмечает недоступными значения диапазона group_addr: устройство ответило на чтение исключением"""
+        position = self.__position(group_addr.start_address)
+        if position is not None:
+            if self.__unavailable is None:
+                self.__unavailable = set()
+            self.__unavailable.update(self.__indices(position, group_addr.count))
+        # Устройство ответило: группа опрашивается дальше со своим интервалом, без повтора
+        self.__last_date = time.monotonic()
+
+    @property
+    def data_type(self) -> str:
+        return self.__spec.codec.data_type
+
+    @property
+    def is_integer(self) -> bool:
+        """Целые ли значения сущностей (целый тип без множителя)"""
+        return self.__spec.codec.is_integer
+
+    @property
+    def statuses(self) -> tuple:
+        if self.__values is None:
+            self.__decode()
+        return self.__values
+
+    @property
+    def registers(self) -> tuple:
+        """Значения регистров группы без разбора. Непрочитанные - None"""
+        return self.__image.values(self.__spec.offset, self.__spec.register_count)
+
+    def __decode(self):
+        spec = self.__spec
+        values = spec.codec.decode(self.__image.raw(spec.offset, spec.register_count))
+        if not self.__image.is_valid(spec.offset, spec.register_count):
+            width = spec.codec.width
+            values = tuple(value if self.__image.is_valid(spec.offset + index * width, width) else None
+                           for index, value in enumerate(values))
+        self.__values = values
+
+    @property
+    def is_restored(self) -> bool:
+        return self.__restored
+
+    def restore(self, registers: list):
+        """Восстанавливает значения регистров из снимка до первого чтения с устройства"""
+        self.__image.write(self.__spec.offset, registers[:self.__spec.register_count])
+        self.__values = None
+        self.__restored = True
 
     def get_state(self, index:int):
-        return self._register_statuses[index]
+        return self.statuses[index]
+
+    def __count(self):
+        statuses = self.statuses
+        if self.__rates is not None:
+            now = time.monotonic()
+            for rate, value in zip(self.__rates, statuses):
+                rate.update(value, now)
+        if self.__counters is not None:
+            bits = 16 * self.__spec.codec.width
+            for index, value in enumerate(statuses):
+                if value is None:
+                    continue
+                self.__presses[index] += counter_delta(self.__counters[index], value, bits)
+                self.__counters[index] = value
+
+    def take_presses(self, index: int) -> int:
+        """Нажатия значения index с прошлого вызова"""
+        if self.__presses is None:
+            return 0
+        presses, self.__presses[index] = self.__presses[index], 0
+        return presses
 
-    def _set_status(self, index, value):
-        self._register_statuses[index] = value
+    @property
+    def has_rate(self) -> bool:
+        return self.__rates is not None
 
-    def update_statuses(self, list_value, group_addr):
-        if isinstance(list_value, list):
-            if len(list_value) == len(self._register_statuses):
-                self._register_statuses = list_value
-            elif len(list_value) < len(self._register_statuses):
-                index = None
-                try:
-                    index = self.addresses.index(group_addr.start_address)
-                except ValueError:
-                    _LOGGER.warning(f"Не найден адрес '{group_addr.start_address}' в списке адресов '{self.addresses}"
-                                    f"' объекта '{self.name}'")
-                if not index is None:
-                    self._register_statuses = self._register_statuses[:index] + list_value + self._register_statuses[index+group_addr.count:]
+    def get_rate(self, index: int) -> float | None:
+        """Скорость счетчика значения, событий в минуту"""
+        if self.__rates is None:
+            return None
+        return self.__rates[index].rate(time.monotonic())
+
+    def __slot(self, index: int) -> int:
+        return self.__spec.offset + index * self.__spec.codec.width
+
+    def _encode(self, index: int, value) -> list[int]:
+        """Регистры значения сущности для записи"""
+        return self.__spec.codec.encode(value, self.__image.raw(self.__slot(index), 1)[0])
+
+    def _set_status(self, index, value) -> tuple:
+        """Записывает значение в образ до ответа устройства. Возвращает прежние регистры значения"""
+        slot = self.__slot(index)
+        previous = self.__image.values(slot, self.__spec.codec.width)
+        registers = [None] * self.__spec.codec.width if value is None else self._encode(index, value)
+        self._restore_status(index, registers)
+        return previous
+
+    def _restore_status(self, index, registers):
+        slot = self.__slot(index)
+        for position, register in enumerate(registers):
+            self.__image.set(slot + position, register)
+        self.__values = None
+
+    def is_dirty(self, index: int) -> bool:
+        return self.__image.is_dirty(self.__slot(index), self.__spec.codec.width)
+
+    def clear_dirty(self, index: int) -> bool:
+        """Снимает отметку об изменении значения. Возвращает, была ли отметка"""
+        return self.__image.clear_dirty(self.__slot(index), self.__spec.codec.width)
+
+    def __position(self, address: int) -> int | None:
+        # Диапазонов в группе не больше двух (регистр входа 0 и остальные), поиск по ним дешевле index()
+        position = 0
+        for group_addr in self.__spec.group_addresses:
+            if group_addr.start_address <= address < group_addr.start_address + group_addr.count:
+                return position + address - group_addr.start_address
+            position += group_addr.count
+        return None
+
+    def update_statuses(self, values, group_addr):
+        """Записывает в образ прочитанные значения диапазона group_addr группы"""
+        position = self.__position(group_addr.start_address)
+        if position is None:
+            _LOGGER.warning(f"Не найден адрес '{group_addr.start_address}' в списке адресов '{self.addresses}"
+                            f"' объекта '{self.name}'")
+        else:
+            # Лишние значения (например, дополнение coil до байта) за пределы группы не пишутся
+            changed = self.__image.write(self.__spec.offset + position, values[:self.__spec.register_count - position])
+            if changed:
+                self.__values = None
+            if (self.__rates is not None or self.__counters is not None) and (changed or self.__restored):
+                # Значения из снимка в счет не входят: отсчет начинается с первого чтения
+                self.__count()
+            if self.__restored:
+                self.__restored = False
+                # Все значения группы становятся прочитанными: снимаем отметку restored с сущностей
+                self.__image.mark_dirty(self.__spec.offset, self.__spec.register_count)
+            if self.__unavailable:
+                count = min(len(values), self.__spec.register_count - position)
+                self.__unavailable.difference_update(self.__indices(position, count))
         self.__last_date = time.monotonic()
 
-    async def set_value(self, index:int, value):
-        self._register_statuses[index] = value
-        await self.__device.set_register_value(
-            self.__register_type,
-            self.__addresses[index],
-            value)
+    def encode_values(self, values: list) -> dict:
+        """Регистры {адрес: значение} для записи значений сущностей группы по порядку индексов"""
+        if len(values) != self.count:
+            raise ValueError(f"Группе '{self.name}' нужно {self.count} значений, передано {len(values)}")
+        registers = {}
+        for index, value in enumerate(values):
+            if self.register_type == RegisterType.coil:
+                registers[self.address(index)] = bool(value)
+                continue
+            for position, register in enumerate(self._encode(index, value)):
+                registers[self.address(index) + position] = register
+        return registers
+
+    async def set_value(self, index:int, value) -> bool:
+        registers = self._encode(index, value)
+        if not self.__device.breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.__device.name} не отвечает, запись '{self.name}' отклонена")
+            return False
+        previous = self._set_status(index, value)
+        if self.register_type == RegisterType.coil:
+            result = await self.__device.set_register_value(self.register_type, self.address(index), value)
+        elif len(registers) == 1:
+            result = await self.__device.set_register_value(self.register_type, self.address(index), registers[0])
+        else:
+            result = await self.__device.set_registers(self.register_type, self.address(index), registers)
+        if not result:
+            # Устройство запись не приняло: возвращаем прежнее значение
+            self._restore_status(index, previous)
+        return result
 
 class SelectDeviceObjectGroup(DeviceObjectGroup):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-
-        self.__select_values = kwargs["select_values"]
-        self.__select_values0 = kwargs.get("select_values0", self.__select_values)
+    __slots__ = ()
 
     def get_state(self, index: int):
-        # key = super().get_state(index)
-        key = self._register_statuses[index]
+        key = super().get_state(index)
 
         if key is None:
             return None
 
         if index == 0:
-            return self.__select_values0[key]
+            return self.spec.options0.get(key)
         else:
-            return self.__select_values[key]
+            return self.spec.options.get(key)
 
     def get_attr_options(self, index:int):
         if index:
-            return list(self.__select_values.values())
+            return list(self.spec.options.values())
         else:
-            return list(self.__select_values0.values())
+            return list(self.spec.options0.values())
 
 
-    async def set_value(self, index:int, value):
+    async def set_value(self, index:int, value) -> bool:
         if index:
-            dict_values = self.__select_values
+            dict_values = self.spec.options
         else:
-            dict_values = self.__select_values0
+            dict_values = self.spec.options0
 
         # Возвращает первый найденный ключ
         option_key = next((k for k, v in dict_values.items() if v == value), None)
-        self._set_status(index, option_key)
+        if not self.device.breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.device.name} не отвечает, запись '{self.name}' отклонена")
+            return False
+        previous = self._set_status(index, option_key)
 
-        await self.device.set_register_value(self.register_type,self.address(index),option_key)
+        result = await self.device.set_register_value(self.register_type,self.address(index),option_key)
+        if not result:
+            self._restore_status(index, previous)
+        return result
 
 class InputDeviceObjectGroup(DeviceObjectGroup):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.__min_val = kwargs["min_val"]
-        self.__max_val = kwargs["max_val"]
-        self.__mode = kwargs["mode"]
-        self.__step = kwargs["step"]
-        self.__scale = kwargs["scale"]
+    __slots__ = ()
 
     @property
     def min_val(self):
-        return self.__min_val
+        return self.spec.min_val
 
     @property
     def max_val(self):
-        return self.__max_val
+        return self.spec.max_val
 
     @property
     def mode(self):
-        return self.__mode
+        return self.spec.mode
 
     @property
     def step(self):
-        return self.__step
+        return self.spec.step
 
-    @property
-    def scale(self):
-        return self.__scale
+
+# Класс состояния группы для платформы сущностей
+GROUP_CLASSES = {
+    Platform.select: SelectDeviceObjectGroup,
+    Platform.number: InputDeviceObjectGroup,
+}
+
+# Класс образа регистров для типа регистров
+IMAGE_CLASSES = {
+    RegisterType.coil: CoilImage,
+}
 
 
 class WBSmart:
-    def __init__(self, hass: HomeAssistant, host_ip: str, host_port: int, device_id: int) ->None:
+    def __init__(self, hass: HomeAssistant, host_ip: str, host_port: int, device_id: int, model,
+                 read_gap: int = DEFAULT_READ_GAP, pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+                 framer: FramerType = FramerType.SOCKET, fast_modbus: bool = False,
+                 write_window: int = DEFAULT_WRITE_WINDOW, identity: DeviceIdentity | None = None,
+                 serial: SerialSettings | None = None, config_cache: ConfigCache | None = None) ->None:
         self.__name = ""
         self.__model = ""
         self.__firmware = ""
@@ -235,14 +462,55 @@ class WBSmart:
         self.__bootloader = ""
         self.__device_id = device_id
         self.__hass = hass
-        self.objects = []
+        self.__listeners = []
+        self.__fast_modbus = fast_modbus
+        # Записи, ожидающие объединения с записями соседних регистров
+        self.__write_window = write_window / 1000
+        self.__pending_writes = []
+        self.__flush_task: asyncio.Task | None = None
+        # Счетчики публикаций состояний сущностей и пропущенных публикаций без изменений
+        self.__state_writes = 0
+        self.__suppressed_writes = 0
+        # (тип события, адрес) -> (группа, GroupAddresses регистра) для регистров, приходящих событиями
+        self.__event_map = {}
+        self.__poll_stats = PollStats()
+        # Расписание шины, которое нужно разбудить при изменении расписания устройства
+        self.__schedule_listener = None
 
         # Флаг для отслеживания состояния подключения
-        # TODO Добавить код увеличения попыток
-        self.__connection_attempts = 0
         self.__is_connected = False
-
-        self._hub = async_modbus_hub(hass=hass, host=host_ip, port=host_port)
+        # Неотвечающее устройство не опрашивается до пробы с нарастающей задержкой
+        self.__breaker = CircuitBreaker(f"Устройство {device_id} шлюза {host_ip}:{host_port}")
+
+        # Подключение общее для всех устройств одного шлюза
+        self._hub: async_modbus_hub = acquire_hub(hass, host_ip, host_port, framer, pipeline_depth, serial)
+        self._hub.metrics.register_device(device_id)
+        self.__attached = True
+
+        # Карта регистров модели. Общая для всех устройств модели вместе с планами чтения.
+        # Регистры, на которые устройство не отвечает, исключены из карты
+        self.__identity = identity
+        if identity is not None:
+            model = model.variant(identity.unsupported)
+        self.__device_model = model
+        # Планировщик объединяет группы, которые нужно прочитать в одном цикле, в минимум запросов
+        self._planner = model.planner(read_gap)
+        # Очередь групп по времени следующего опроса
+        self._scheduler = PollScheduler(POLL_RETRY_INTERVAL)
+        # Образ регистров устройства: по одному компактному массиву на тип регистров
+        self.__images = {register_type: IMAGE_CLASSES.get(register_type, RegisterImage)(size)
+                         for register_type, size in model.image_sizes.items()}
+        self.objects = [GROUP_CLASSES.get(spec.platform, DeviceObjectGroup)(self, spec, self.__images[spec.register_type])
+                        for spec in model.groups]
+        # Группы настроек читаются один раз, а затем перечитываются только в фоновой очереди:
+        # после переподключения устройства и с интервалом CONFIG_REVALIDATE_INTERVAL
+        self.__config_cache = config_cache
+        self.__config_groups = [obj for obj in self.objects
+                                if not obj.update_interval and obj.entity_category == EntityCategory.CONFIG]
+        self.__was_connected = False
+        # Время следующей проверки групп настроек. None - проверка не запланирована или уже выполняется
+        self.__revalidate_at = time.monotonic() + CONFIG_REVALIDATE_INTERVAL if self.__config_groups else None
+        self.__revalidate_task: asyncio.Task | None = None
 
         # asyncio.create_task(self.update_info())
         # try:
@@ -255,17 +523,150 @@ class WBSmart:
         #     asyncio.run(self.update_info())
 
         self.__name = f"{self.__model}_{self.__device_id}"
+        if identity is not None:
+            self.__apply_identity(identity)
 
-    # TODO реализовать вывод информации об устройстве "https://selectel.ru/blog/ha-karadio/" def device_info
     # @classmethod
     # async def create(cls, param):
     #     # Асинхронная инициализация
     #     await update_info()
     #     return cls(data)
 
-    def __del__(self):
-        self._hub.disconnect()
-        _LOGGER.warning(f"Устройство {self.name} удалено. Отключено по Modbus")
+    def detach(self):
+        """Отсоединяет устройство от общего подключения к шлюзу"""
+        if not self.__attached:
+            return
+        self.__attached = False
+        if self.__revalidate_task is not None:
+            self.__revalidate_task.cancel()
+        if self.__event_map:
+            self._hub.unsubscribe_events(self.device_id)
+        release_hub(self._hub)
+        _LOGGER.info(f"Устройство {self.name} отсоединено от шлюза {self._hub.host}:{self._hub.port}")
+
+    @property
+    def objects(self) -> list:
+        return self.__objects
+
+    @objects.setter
+    def objects(self, objects: list):
+        self.__objects = objects
+        self._scheduler = PollScheduler(POLL_RETRY_INTERVAL)
+        for obj in objects:
+            self._scheduler.schedule(obj, 0)
+
+    def snapshot(self) -> dict:
+        """Значения регистров всех групп для сохранения между перезапусками"""
+        return {
+            "model": self.__device_model.name,
+            "groups": [{"addresses": list(obj.addresses), "values": list(obj.registers)} for obj in self.objects],
+        }
+
+    def restore(self, snapshot: dict) -> bool:
+        """Восстанавливает значения из снимка. Группы, карта которых изменилась, пропускаются.
+        Чтение восстановленных групп настроек откладывается, чтобы первыми читались оперативные группы"""
+        if snapshot.get("model") != self.__device_model.name:
+            return False
+        groups = snapshot.get("groups", [])
+        restored = False
+        config_due = time.monotonic() + SNAPSHOT_CONFIG_DELAY
+        for obj, group in zip(self.objects, groups):
+            if tuple(group.get("addresses", ())) != obj.addresses or None in group.get("values", (None,)):
+                continue
+            obj.restore(group["values"])
+            restored = True
+            if obj.entity_category == EntityCategory.CONFIG:
+                self._scheduler.schedule(obj, config_due)
+        _LOGGER.debug(f"Значения регистров устройства {self.name} восстановлены из снимка: {restored}")
+        return restored
+
+    def restore_config(self) -> bool:
+        """Восстанавливает группы настроек из сохраненных регистров прошивки устройства.
+        Восстановленные группы не читаются при опросе: их проверяет фоновое чтение после запуска"""
+        key = self.__config_key
+        if key is None:
+            return False
+        restored = []
+        for obj in self.__config_groups:
+            values = self.__config_cache.get(key, self.__device_model.name, obj)
+            if values is None:
+                continue
+            obj.restore(values)
+            self._scheduler.unschedule(obj)
+            restored.append(obj)
+        if restored:
+            self.__revalidate_at = time.monotonic() + CONFIG_REVALIDATE_DELAY
+            _LOGGER.debug(f"Группы настроек {[obj.name for obj in restored]} устройства {self.name} "
+                          f"восстановлены из сохраненных регистров")
+        return bool(restored)
+
+    @property
+    def __config_key(self) -> tuple[str, str] | None:
+        """Ключ сохраненных регистров настроек: серийный номер и прошивка устройства"""
+        identity = self.__identity
+        if self.__config_cache is None or identity is None \
+                or identity.serial_number is None or identity.firmware is None:
+            return None
+        return str(identity.serial_number), str(identity.firmware)
+
+    def __cache_config(self, objects):
+        """Сохраняет группы настроек, прочитанные с устройства"""
+        key = self.__config_key
+        if key is None:
+            return
+        for obj in objects:
+            if obj in self.__config_groups and obj.name_id:
+                self.__config_cache.put(key, self.__device_model.name, obj)
+
+    def __invalidate_config(self, register_type: RegisterType, address: int, count: int):
+        """Сбрасывает сохраненные группы настроек, в регистры которых идет запись.
+        Подтверждающее чтение после записи сохраняет их заново"""
+        key = self.__config_key
+        if key is None:
+            return
+        for obj in self.__config_groups:
+            if obj.register_type == register_type and any(
+                    group_addr.start_address < address + count and address < group_addr.start_address + group_addr.count
+                    for group_addr in obj.group_addresses):
+                self.__config_cache.invalidate(key, obj)
+
+    def __start_revalidation(self, now: float):
+        if self.__revalidate_at is None or now < self.__revalidate_at or not self.__attached:
+            return
+        self.__revalidate_at = None
+        self.__revalidate_task = self.__hass.async_create_background_task(
+            self.async_revalidate_config(), f"Wirenboard config revalidation {self.name}"
+        )
+
+    async def async_revalidate_config(self):
+        """Перечитывает группы настроек в фоновой очереди шлюза: опрос и команды идут первыми"""
+        retry = False
+        try:
+            for block in self._planner.plan([obj.spec for obj in self.__config_groups]):
+                if not self.__breaker.is_closed:
+                    retry = True
+                    return
+                if await self._read_block(block, PRIORITY_BACKGROUND) == ReadOutcome.timeout:
+                    retry = True
+                    return
+            _LOGGER.debug(f"Группы настроек устройства {self.name} перечитаны")
+        finally:
+            self.__revalidate_task = None
+            self.__revalidate_at = time.monotonic() + (CONFIG_REVALIDATE_DELAY if retry
+                                                       else CONFIG_REVALIDATE_INTERVAL)
+
+    def add_listener(self, update_callback):
+        """Подписывает на обновления групп. Обработчик получает кортеж обновленных групп"""
+        self.__listeners.append(update_callback)
+
+        def remove_listener():
+            self.__listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _notify(self, objects: tuple):
+        for update_callback in list(self.__listeners):
+            update_callback(objects)
 
     @property
     def model(self) -> str:
@@ -298,39 +699,96 @@ class WBSmart:
 
     @property
     def connection_attempts(self):
-        """Возвращает состояние подключения к устройству"""
-        return self.__connection_attempts
+        """Циклы опроса с неудачей подряд"""
+        return self.__breaker.failures
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
 
     def connected(self):
         """Возвращает состояние подключения к устройству"""
-        self.__is_connected = True
+        if not self.__is_connected:
+            self.__is_connected = True
+            if self.__was_connected and self.__revalidate_at is not None:
+                # Пока устройство не отвечало, его могли перезагрузить или перенастроить
+                self.__revalidate_at = min(self.__revalidate_at, time.monotonic() + CONFIG_REVALIDATE_DELAY)
+            self.__was_connected = True
+            self._notify(tuple(self.objects))
 
     def disconnected(self):
         """Возвращает состояние подключения к устройству"""
-        self.__is_connected = False
+        if self.__is_connected:
+            self.__is_connected = False
+            self._notify(tuple(self.objects))
 
-    def inc_connection_attempts(self):
-        self.__connection_attempts += 1
+    @property
+    def state_writes(self) -> int:
+        """Количество публикаций состояний сущностей устройства"""
+        return self.__state_writes
 
-    def reset_connection_attempts(self):
-        self.__connection_attempts = 0
+    @property
+    def suppressed_writes(self) -> int:
+        """Количество публикаций, пропущенных из-за отсутствия изменений"""
+        return self.__suppressed_writes
+
+    @property
+    def identity(self) -> DeviceIdentity | None:
+        return self.__identity
+
+    def __apply_identity(self, identity: DeviceIdentity):
+        self.__identity = identity
+        self.__model = identity.model
+        self.__bootloader = identity.bootloader
+        self.__firmware = identity.firmware
+        self.__serial_number = identity.serial_number
+        self.__name = f"{self.__model}_{self.__device_id}"
+
+    @property
+    def device_model(self):
+        """Скомпилированная карта регистров модели"""
+        return self.__device_model
+
+    @property
+    def hub(self) -> async_modbus_hub:
+        """Общее подключение к шлюзу"""
+        return self._hub
+
+    @property
+    def poll_stats(self) -> PollStats:
+        """Длительность циклов опроса и опоздание их начала"""
+        return self.__poll_stats
+
+    @property
+    def transaction_stats(self) -> dict[int, TransactionStats]:
+        """Статистика запросов к устройству по кодам функций Modbus"""
+        return self._hub.metrics.device(self.device_id)
+
+    @property
+    def request_totals(self) -> TransactionStats:
+        """Статистика запросов к устройству по всем функциям"""
+        return self._hub.metrics.device_total(self.device_id)
+
+    @property
+    def reconnects(self) -> int:
+        """Количество переподключений к шлюзу устройства"""
+        return self._hub.metrics.reconnects
+
+    def count_state_write(self, suppressed: bool = False):
+        if suppressed:
+            self.__suppressed_writes += 1
+        else:
+            self.__state_writes += 1
 
     async def async_check_and_reconnect(self):
-        """Проверяет подключение и пытается переподключиться при необходимости"""
+        """Проверяет подключение к шлюзу и пытается переподключиться при необходимости.
+        Отвечает ли само устройство, показывает чтение"""
         try:
-            # Простая проверка - если клиент подключен, считаем что подключение есть
-            if hasattr(self._hub, '_client') and self._hub._client.connected:
-                self.connected()
+            if self._hub.connected:
                 return True
 
-            # Если не подключен, пытаемся подключиться
             _LOGGER.debug(f"Попытка подключения к устройству {self.__name}")
             await self._hub.connect()
-
-            # Добавляем небольшую задержку после подключения для стабилизации
-            await asyncio.sleep(0.2)
-
-            self.connected()
             _LOGGER.debug(f"Успешно подключились к устройству {self.__name}")
             return True
         except Exception as e:
@@ -338,14 +796,96 @@ class WBSmart:
             self.disconnected()
             return False
 
+    async def async_setup_events(self):
+        """Включает события Быстрого Modbus для опрашиваемых групп.
+
+        Группы, все регистры которых приходят событиями, опрашиваются только для контроля,
+        остальные - как обычно. Если устройство или шлюз события не поддерживают, ничего не меняется.
+        """
+        if not self.__fast_modbus:
+            return
+        if not self._hub.supports_events:
+            _LOGGER.warning(f"Быстрый Modbus для {self.name} требует шлюз в режиме RTU over TCP. Используется опрос")
+            return
+
+        ranges = [(obj, group_addr) for obj in self.objects
+                  if obj.update_interval and obj.register_type in EVENT_TYPES
+                  for group_addr in obj.group_addresses]
+        if not ranges:
+            return
+        enabled = await self._hub.async_setup_events(
+            self.device_id,
+            [(EVENT_TYPES[obj.register_type], group_addr.start_address, group_addr.count)
+             for obj, group_addr in ranges],
+        )
+        if enabled is None:
+            _LOGGER.info(f"Устройство {self.name} не поддерживает события Быстрого Modbus. Используется опрос")
+            return
+
+        self.__event_map = {}
+        position = 0
+        partial = set()
+        for obj, group_addr in ranges:
+            for address in range(group_addr.start_address, group_addr.start_address + group_addr.count):
+                if enabled[position]:
+                    self.__event_map[(EVENT_TYPES[obj.register_type], address)] = (obj, GroupAddresses(address, 1))
+                else:
+                    partial.add(obj)
+                position += 1
+
+        for obj in {obj for obj, _ in self.__event_map.values()} - partial:
+            self._scheduler.set_interval(obj, FAST_MODBUS_RESYNC_INTERVAL)
+            due_time = self._scheduler.due_time(obj)
+            if due_time is not None:
+                self._scheduler.schedule(obj, due_time + FAST_MODBUS_RESYNC_INTERVAL)
+        self._hub.subscribe_events(self.device_id, self._handle_events)
+        if self.__schedule_listener is not None:
+            self.__schedule_listener()
+        _LOGGER.info(f"Устройство {self.name}: включены события для {len(self.__event_map)} регистров")
+
+    def _handle_events(self, events):
+        if events is None:
+            # События на шине больше не поступают, возвращаемся к опросу
+            now = time.monotonic()
+            for obj, _ in self.__event_map.values():
+                self._scheduler.set_interval(obj, None)
+                self._scheduler.schedule(obj, now)
+            self.__event_map = {}
+            if self.__schedule_listener is not None:
+                self.__schedule_listener()
+            return
+
+        updated = []
+        for event in events:
+            if event.event_type == EVENT_SYSTEM:
+                # Устройство перезагрузилось: события нужно включить заново
+                _LOGGER.info(f"Устройство {self.name} перезагрузилось, включаем события заново")
+                self.__hass.async_create_task(self.async_setup_events())
+                continue
+            entry = self.__event_map.get((event.event_type, event.address))
+            if entry is None:
+                continue
+            obj, group_addr = entry
+            value = bool(event.value) if obj.register_type == RegisterType.coil else event.value
+            obj.update_statuses([value], group_addr)
+            if obj not in updated:
+                updated.append(obj)
+        if updated:
+            self.connected()
+            self._notify(tuple(updated))
+
     async def write_coil_registers(self, address:int, values):
         try:
             async with async_timeout.timeout(5):
                 _LOGGER.debug(f"Запись в coil регистры {address} устройства {self.device_id} значения {values}")
+                self.__invalidate_config(RegisterType.coil, address, len(values))
                 await self._hub.async_write_coils(address, values, self.device_id)
         except TimeoutError:
             _LOGGER.warning("Pulling timed out")
             return False
+        except ModbusDeviceError as error:
+            _LOGGER.warning(f"Устройство {self.name} отклонило запись адреса {address}: {error}")
+            return False
         except ModbusException as value_error:
             _LOGGER.warning(f"Error write config register, modbus Exception {value_error.string}")
             return False
@@ -358,10 +898,14 @@ class WBSmart:
         try:
             async with async_timeout.timeout(5):
                 _LOGGER.debug(f"Запись в holding регистр {address} устройства {self.device_id} значения {value}")
+                self.__invalidate_config(RegisterType.holding, address, 1)
                 await self._hub.async_write_holding_register(address, value, self.device_id)
         except TimeoutError:
             _LOGGER.warning("Pulling timed out")
             return False
+        except ModbusDeviceError as error:
+            _LOGGER.warning(f"Устройство {self.name} отклонило запись адреса {address}: {error}")
+            return False
         except ModbusException as value_error:
             _LOGGER.warning(f"Error write holding register, modbus Exception {value_error.string}")
             return False
@@ -370,81 +914,138 @@ class WBSmart:
             return False
         return True
 
+    @property
+    def next_due(self) -> float | None:
+        """Время ближайшего опроса группы устройства или None, если опрашивать нечего.
+        Пока автомат разомкнут - время пробы"""
+        if not self.__breaker.is_closed:
+            return self.__breaker.retry_at
+        next_due = self._scheduler.next_due()
+        if self.__revalidate_at is not None and (next_due is None or self.__revalidate_at < next_due):
+            return self.__revalidate_at
+        return next_due
+
+    def bus_load(self, timing: BusTiming) -> float:
+        """Доля времени шины, которую занимает опрос устройства с заданными интервалами групп"""
+        intervals = {}
+        for obj in self.objects:
+            interval = self._scheduler.interval(obj)
+            if interval:
+                intervals.setdefault(interval, []).append(obj.spec)
+        load = 0.0
+        for interval, specs in intervals.items():
+            # Группы с одинаковым интервалом читаются вместе: стоимость - по плану их совместного чтения
+            busy = sum(timing.read_time(READ_COILS if block.register_type == RegisterType.coil
+                                        else READ_HOLDING_REGISTERS, block.count)
+                       for block in self._planner.plan(specs))
+            load += busy / interval
+        return load
+
+    @property
+    def interval_scale(self) -> float:
+        return self._scheduler.interval_scale
+
+    @interval_scale.setter
+    def interval_scale(self, value: float):
+        self._scheduler.interval_scale = value
+
+    def set_schedule_listener(self, listener):
+        """Подписывает расписание шины на изменения расписания устройства вне цикла опроса"""
+        self.__schedule_listener = listener
+
     async def update(self, setup=False):
+        """Читает группы регистров, время опроса которых наступило"""
+        cycle_start = time.monotonic()
+        if not self.__breaker.allow(cycle_start):
+            # Устройство не отвечает: до пробы не занимаем шину, сущности остаются недоступны
+            return
+        if not self.__breaker.is_closed and not await self.__probe():
+            return
+        due = self._scheduler.pop_due(cycle_start + POLL_COALESCE_WINDOW)
+        try:
+            await self.__update(due, setup)
+        finally:
+            now = time.monotonic()
+            for obj, due_time in due:
+                self._scheduler.reschedule(obj, due_time, now, obj.last_date >= cycle_start)
+            if due or setup:
+                if self.__is_connected:
+                    self.__breaker.record_success()
+                else:
+                    self.__breaker.record_failure(now)
+            if self.__is_connected:
+                self.__start_revalidation(now)
+            if due:
+                # Первый опрос групп назначен на момент 0, опоздание для него не считается
+                scheduled = min(due_time for _, due_time in due)
+                self.__poll_stats.add(now - cycle_start, max(cycle_start - scheduled, 0.0) if scheduled else None)
+
+    async def __probe(self) -> bool:
+        """Проба автомата: одно чтение одного регистра вместо цикла опроса"""
+        spec = self.__device_model.groups[0]
+        try:
+            _, outcome = await self.__read(spec.register_type, spec.group_addresses[0].start_address, 1)
+        except asyncio.CancelledError:
+            # Прерванная проба не должна оставить автомат в ожидании ее результата
+            self.__breaker.record_failure()
+            raise
+        # Ответ исключением тоже означает, что устройство на связи
+        if outcome == ReadOutcome.timeout:
+            self.__breaker.record_failure()
+            return False
+        self.__breaker.record_success()
+        return True
+
+    async def __update(self, due: list, setup: bool):
         try:
             # Проверяем подключение
             connecting_status = await self.async_check_and_reconnect()
-            # TODO Все warning в методе вернуть на debug
-            # _LOGGER.debug(f"Metod update. connecting_status = {connecting_status}")
             if not connecting_status:
                 _LOGGER.error(f"Не удалось подключиться к устройству {self.name}, пропускаем обновление")
                 self.disconnected()
                 return
 
-            async with async_timeout.timeout(15):
-                if setup:
-                    self.__model = await self._hub.async_read_holding_register_string(200, 20, self.device_id)
-                    self.__bootloader = await self._hub.async_read_holding_register_string(330, 7, self.device_id)
-                    self.__firmware = await self._hub.async_read_holding_register_string(250, 16, self.device_id)
-                    self.__serial_number = await self._hub.async_read_holding_register_uint32(270, 2, self.device_id)
-                    self.__name = f"{self.__model}_{self.__device_id}"
-                    _LOGGER.info(f"model={self.__model}; bootloader={self.__bootloader}; firmware={self.__firmware}; "
-                                 f"S/N={self.__serial_number}")
-
-                for obj in self.objects:
-                    passed = time.monotonic() - obj.last_date
-                    _LOGGER.debug(f"self.name={self.name}; obj.update_interval={obj.update_interval}; obj.last_date={obj.last_date}; passed={passed}")
-                    if obj.register_type == RegisterType.holding:
-                        _LOGGER.debug(f"obj.update_interval={obj.update_interval}; obj.last_date={obj.last_date}; passed={passed}")
-
-                    if obj.update_interval == 0 and obj.last_date or obj.update_interval >= passed:
-                        continue
-
-                    match obj.register_type:
-                        case RegisterType.coil:
-                            for group_addr in obj.group_addresses:
-                                _LOGGER.debug(f"Читаем с устройства {self.device_id} coil адреса {group_addr.start_address} регистров {group_addr.count}")
-                                result = await self._hub.async_read_coils(group_addr.start_address, group_addr.count, self.device_id)
-                                _LOGGER.debug(f"Из coil регистров получили ответ {result}")
-                                # Проверяем, что данные получены корректно
-                                if result is None:
-                                    _LOGGER.error(f"Не удалось получить состояния {obj.name}")
-                                    _LOGGER.warning(f"Читали с устройства {self.device_id} coil адреса {group_addr.start_address} регистров {group_addr.count}")
-                                    self.disconnected()
-                                    return
-                                obj.update_statuses(result, group_addr)
-                        case RegisterType.holding:
-                            _LOGGER.debug(f"case RegisterType.holding 4")
-                            for group_addr in obj.group_addresses:
-                                _LOGGER.debug(f"Читаем с устройства {self.device_id} holding адреса {group_addr.start_address} регистров {group_addr.count}")
-                                result = await self._hub.async_read_holding_register(group_addr.start_address, group_addr.count, self.device_id)
-                                _LOGGER.debug(f"Из holding регистров получили ответ {result}")
-                                # Проверяем, что данные получены корректно
-                                if result is None:
-                                    _LOGGER.error(f"Не удалось получить состояния {obj.name}")
-                                    _LOGGER.warning(f"Читали с устройства {self.device_id} holding адреса {group_addr.start_address} регистров {group_addr.count}")
-                                    self.disconnected()
-                                    return
-                                obj.update_statuses(result, group_addr)
-
-                # Если данные получены успешно, считаем что подключение активно
+            if self.__identity is None:
+                # Идентификация из записи конфигурации не требует чтения
+                async with async_timeout.timeout(15):
+                    identity = await async_read_identity(self._hub, self.device_id)
+                if identity.model is None:
+                    # Устройство не ответило: идентификация повторится в следующем цикле
+                    self.disconnected()
+                    return
+                self.__apply_identity(identity)
+
+            due_objects = [obj for obj, _ in due]
+            _LOGGER.debug(f"self.name={self.name}; опрашиваем {[obj.name for obj in due_objects]}")
+
+            # Каждый диапазон читается со своим сроком: неудача одного не отменяет остальные.
+            # Устройство считается недоступным, только если не ответило ни на одно чтение цикла
+            answered = False
+            failures = 0
+            for block in self._planner.plan([obj.spec for obj in due_objects]):
+                if await self._read_block(block) == ReadOutcome.timeout:
+                    failures += 1
+                    if failures >= POLL_MAX_TRANSPORT_FAILURES:
+                        # Чтения подряд без ответа: остальные диапазоны цикла не ждем
+                        break
+                else:
+                    answered = True
+                    failures = 0
+
+            if answered or not due_objects:
                 self.connected()
+            else:
+                self.disconnected()
         except TimeoutError:
             _LOGGER.warning(f"Polling timed out for {self.name} - устройство не отвечает")
-            # Сбрасываем счетчик попыток, чтобы попробовать переподключиться в следующий раз
-            self.reset_connection_attempts()
             self.disconnected()
             return
         except ModbusIOException as value_error:
             _LOGGER.warning(f"ModbusIOException for {self.name}: {value_error.string}")
-            # Сбрасываем счетчик попыток, чтобы попробовать переподключиться в следующий раз
-            self.reset_connection_attempts()
             self.disconnected()
             return
         except ModbusException as value_error:
             _LOGGER.warning(f"ModbusException for {self.name}: {value_error.string}")
-            # Сбрасываем счетчик попыток, чтобы попробовать переподключиться в следующий раз
-            self.reset_connection_attempts()
             self.disconnected()
             return
         except InvalidStateError as ex:
@@ -456,8 +1057,208 @@ class WBSmart:
             self.disconnected()
             return
 
+    async def _read_registers(self, register_type: RegisterType, address: int, count: int,
+                              priority: int = PRIORITY_POLL, exceptions: bool = False,
+                              timeout: float | None = None):
+        match register_type:
+            case RegisterType.coil:
+                _LOGGER.debug(f"Читаем с устройства {self.device_id} coil адреса {address} регистров {count}")
+                return await self._hub.async_read_coils(address, count, self.device_id, priority,
+                                                        exceptions, timeout)
+            case RegisterType.holding:
+                _LOGGER.debug(f"Читаем с устройства {self.device_id} holding адреса {address} регистров {count}")
+                return await self._hub.async_read_holding_register(address, count, self.device_id, priority,
+                                                                   exceptions, timeout)
+        return None
+
+    async def __read(self, register_type: RegisterType, address: int, count: int,
+                     priority: int = PRIORITY_POLL) -> tuple:
+        """Чтение опроса со сроком POLL_READ_DEADLINE. Возвращает (значения, ReadOutcome)"""
+        try:
+            result = await self._read_registers(register_type, address, count, priority, exceptions=True,
+                                                timeout=POLL_READ_DEADLINE)
+        except ModbusDeviceError as error:
+            _LOGGER.warning(f"Устройство {self.name} ответило исключением {error.exception_code} на чтение "
+                            f"{register_type.name} адреса {address} регистров {count}")
+            return None, ReadOutcome.exception
+        if result is None or len(result) < count:
+            return None, ReadOutcome.timeout
+        return result, ReadOutcome.ok
+
+    def _apply_registers(self, register_type: RegisterType, address: int, values: list) -> tuple:
+        """Раскладывает значения диапазона регистров по группам. Возвращает обновленные группы"""
+        updated = []
+        end_address = address + len(values)
+        for obj in self.objects:
+            if obj.register_type != register_type:
+                continue
+            for group_addr in obj.group_addresses:
+                start = max(address, group_addr.start_address)
+                end = min(end_address, group_addr.start_address + group_addr.count)
+                if start < end:
+                    obj.update_statuses(values[start - address:end - address], GroupAddresses(start, end - start))
+                    if obj not in updated:
+                        updated.append(obj)
+        self.__cache_config(updated)
+        return tuple(updated)
+
+    async def _read_back(self, register_type: RegisterType, address: int, count: int):
+        """Подтверждает запись чтением записанных регистров вне очереди опроса"""
+        result = await self._read_registers(register_type, address, count, PRIORITY_INTERACTIVE)
+        if result is None or len(result) < count:
+            return
+        updated = self._apply_registers(register_type, address, result[:count])
+        if updated:
+            self._notify(updated)
+
+    async def async_read_ranges(self, register_type: RegisterType, ranges: list[tuple[int, int]]) -> dict | None:
+        """Читает диапазоны (адрес, количество) наименьшим числом запросов вне очереди опроса.
+        Прочитанные значения групп сразу публикуются. Возвращает значения по адресам
+        или None, если устройство не ответило. Ответ исключением поднимает ModbusDeviceError"""
+        if not self.__breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.name} не отвечает, чтение регистров отклонено")
+            return None
+        limit = MAX_READ_COILS if register_type == RegisterType.coil else MAX_READ_REGISTERS
+        values = {}
+        for address, count in merge_ranges(ranges, self._planner.max_gap, limit):
+            result = await self._read_registers(register_type, address, count, PRIORITY_INTERACTIVE, exceptions=True)
+            if result is None or len(result) < count:
+                return None
+            result = result[:count]
+            updated = self._apply_registers(register_type, address, result)
+            if updated:
+                self._notify(updated)
+            values.update(zip(range(address, address + count), result))
+        return {address: values[address]
+                for address in sorted({address for start, count in ranges for address in range(start, start + count)})}
+
+    async def async_write_many(self, register_type: RegisterType, registers: dict,
+                               verify: bool = True) -> WriteResult | None:
+        """Записывает регистры {адрес: значение} наименьшим числом запросов: соседние адреса - одним запросом,
+        без окна объединения записей. verify - подтверждает запись чтением записанных диапазонов.
+        После первой неудачной записи остальные не выполняются. None - устройство не отвечает, запись не начата"""
+        if not self.__breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.name} не отвечает, запись регистров {sorted(registers)} отклонена")
+            return None
+        limits = {RegisterType.coil: MAX_WRITE_COILS, RegisterType.holding: MAX_WRITE_REGISTERS}
+        runs = coalesce_writes([(register_type, address, value, None) for address, value in registers.items()], limits)
+        written = []
+        unwritten = []
+        for run in runs:
+            if unwritten or not await self.__write_run(run):
+                unwritten.extend(range(run.start_address, run.end_address))
+            else:
+                written.append(run)
+        if not verify or not written:
+            return WriteResult(unwritten, [])
+        addresses = [address for run in written for address in range(run.start_address, run.end_address)]
+        try:
+            values = await self.async_read_ranges(register_type, [(run.start_address, len(run.values))
+                                                                  for run in written])
+        except ModbusDeviceError:
+            values = None
+        if values is None:
+            return WriteResult(unwritten, addresses)
+        if register_type == RegisterType.coil:
+            return WriteResult(unwritten, [address for address in addresses
+                                           if bool(values[address]) != bool(registers[address])])
+        return WriteResult(unwritten, [address for address in addresses if values[address] != registers[address]])
+
+    async def _read_block(self, block: ReadBlock, priority: int = PRIORITY_POLL) -> ReadOutcome:
+        """Читает диапазон регистров одним запросом и раскладывает ответ по группам"""
+        # План общий для устройств модели и содержит описания групп, а не группы устройства
+        result, outcome = await self.__read(block.register_type, block.start_address, block.count, priority)
+        _LOGGER.debug(f"Из {block.register_type.name} регистров {block.start_address}-{block.end_address - 1} "
+                      f"получили ответ {result}")
+        if outcome == ReadOutcome.ok:
+            # Ответ преобразуется в массив образа один раз, части групп - срезы массива
+            result = self.__images[block.register_type].pack(result[:block.count])
+            for spec, group_addr, values in block.split(result):
+                self.objects[spec.index].update_statuses(values, group_addr)
+            updated = tuple(dict.fromkeys(self.objects[spec.index] for spec, _ in block.segments))
+            self.__cache_config(updated)
+            self._notify(updated)
+            return outcome
+
+        if outcome == ReadOutcome.timeout:
+            _LOGGER.warning(f"Нет ответа на чтение {list(dict.fromkeys(spec.name for spec, _ in block.segments))}: "
+                            f"устройство {self.device_id} {block.register_type.name} "
+                            f"адреса {block.start_address} регистров {block.count}")
+            return outcome
+
+        if not block.has_gaps:
+            self.__set_unavailable(block.segments)
+            return outcome
+
+        # Устройство могло отказать из-за регистров в промежутках между группами.
+        # Читаем группы по отдельности и, если все ответили, больше не объединяем их через промежутки
+        outcomes = []
+        for spec, group_addr in block.segments:
+            result, outcome = await self.__read(block.register_type, group_addr.start_address, group_addr.count,
+                                                priority)
+            outcomes.append(outcome)
+            if outcome == ReadOutcome.ok:
+                obj = self.objects[spec.index]
+                obj.update_statuses(result, group_addr)
+                self.__cache_config((obj,))
+                self._notify((obj,))
+            elif outcome == ReadOutcome.exception:
+                self.__set_unavailable(((spec, group_addr),))
+        if all(outcome == ReadOutcome.ok for outcome in outcomes):
+            _LOGGER.warning(f"Устройство {self.name} не поддерживает чтение адресов {block.start_address}-"
+                            f"{block.end_address - 1} одним запросом. Объединение через промежутки отключено")
+            self._planner = self.__device_model.planner(0)
+        # Устройство на связи, если ответило хотя бы на одно чтение
+        for outcome in (ReadOutcome.ok, ReadOutcome.exception):
+            if outcome in outcomes:
+                return outcome
+        return ReadOutcome.timeout
+
+    def __set_unavailable(self, segments):
+        """Значения участков недоступны: устройство отвечает на их чтение исключением"""
+        _LOGGER.error(f"Не удалось получить состояния {list(dict.fromkeys(spec.name for spec, _ in segments))}")
+        objects = []
+        for spec, group_addr in segments:
+            obj = self.objects[spec.index]
+            obj.set_unavailable(group_addr)
+            objects.append(obj)
+        self._notify(tuple(dict.fromkeys(objects)))
+
+    async def async_write_holding_registers(self, address:int, values: list):
+        try:
+            async with async_timeout.timeout(5):
+                _LOGGER.debug(f"Запись в holding регистры {address} устройства {self.device_id} значений {values}")
+                self.__invalidate_config(RegisterType.holding, address, len(values))
+                await self._hub.async_write_holding_registers(address, values, self.device_id)
+        except TimeoutError:
+            _LOGGER.warning("Pulling timed out")
+            return False
+        except ModbusDeviceError as error:
+            _LOGGER.warning(f"Устройство {self.name} отклонило запись адреса {address}: {error}")
+            return False
+        except ModbusException as value_error:
+            _LOGGER.warning(f"Error write holding registers, modbus Exception {value_error.string}")
+            return False
+        except InvalidStateError as ex:
+            _LOGGER.error(f"InvalidStateError Exceptions")
+            return False
+        return True
+
     async def set_register_value(self, register_type:RegisterType, addr: int, value):
         _LOGGER.debug(f"set_register_value на входе register_type={register_type}; addr={addr}; value={value}")
+        if not self.__breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.name} не отвечает, запись в регистр {addr} отклонена")
+            return False
+        if self.__write_window and register_type in (RegisterType.coil, RegisterType.holding):
+            # Записи, пришедшие в течение окна (например, от сцены), уходят общими запросами
+            future = asyncio.get_running_loop().create_future()
+            self.__pending_writes.append((register_type, addr, value, future))
+            if self.__flush_task is None:
+                self.__flush_task = self.__hass.async_create_task(self.__flush_writes())
+            result = await future
+            _LOGGER.debug(f"set_register_value вернуло {result}")
+            return result
+
         match register_type:
             case RegisterType.coil:
                 result = await self.write_coil_registers(addr, [value])
@@ -467,152 +1268,85 @@ class WBSmart:
                 result = False
 
         _LOGGER.debug(f"set_register_value вернуло {result}")
+        if result:
+            await self._read_back(register_type, addr, 1)
+        return result
+
+    async def set_registers(self, register_type: RegisterType, address: int, registers: list):
+        """Записывает значение из нескольких регистров. Регистры значения уходят одним запросом"""
+        if register_type != RegisterType.holding:
+            return False
+        if not self.__breaker.is_closed:
+            _LOGGER.warning(f"Устройство {self.name} не отвечает, запись в регистры {address} отклонена")
+            return False
+        if self.__write_window:
+            # Соседние регистры одного окна объединяются в одну запись
+            results = await asyncio.gather(*(self.set_register_value(register_type, address + position, register)
+                                             for position, register in enumerate(registers)))
+            return all(results)
+        result = await self.async_write_holding_registers(address, registers)
+        if result:
+            await self._read_back(register_type, address, len(registers))
         return result
 
+    async def __flush_writes(self):
+        writes = []
+        try:
+            await asyncio.sleep(self.__write_window)
+            writes, self.__pending_writes = self.__pending_writes, []
+            self.__flush_task = None
+            limits = {RegisterType.coil: MAX_WRITE_COILS, RegisterType.holding: MAX_WRITE_REGISTERS}
+            for run in coalesce_writes(writes, limits):
+                try:
+                    result = await self.__write_run(run)
+                except Exception as e:
+                    for future in run.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for future in run.futures:
+                    if not future.done():
+                        future.set_result(result)
+                if result:
+                    try:
+                        await self._read_back(run.register_type, run.start_address, len(run.values))
+                    except Exception as e:
+                        # Запись уже выполнена, ошибка подтверждения не должна остановить остальные записи
+                        _LOGGER.warning(f"Не удалось подтвердить запись регистров {run.start_address} "
+                                        f"устройства {self.name}: {e}")
+        finally:
+            if self.__flush_task is asyncio.current_task():
+                # Задача отменена до начала записи: записи окна не выполнены
+                writes, self.__pending_writes = self.__pending_writes, []
+                self.__flush_task = None
+            for _, _, _, future in writes:
+                if not future.done():
+                    future.set_result(False)
+
+    async def __write_run(self, run: WriteRun) -> bool:
+        if run.register_type == RegisterType.coil:
+            return await self.write_coil_registers(run.start_address, run.values)
+        if len(run.values) == 1:
+            return await self.async_write_holding_register(run.start_address, run.values[0])
+        return await self.async_write_holding_registers(run.start_address, run.values)
+
     @property
     def switches(self):
-        _LOGGER.debug("device.py switches шаг 1")
-        switches = []
-        for obj in self.objects:
-            _LOGGER.debug(f"device.py switches шаг 2 obj={obj}")
-            if obj.platform == Platform.switch:
-                switches.append(obj)
-                _LOGGER.debug(f"device.py switches шаг 3")
-        return switches
+        return self.filtre_objects(Platform.switch)
 
     @property
     def selects(self):
-        _LOGGER.debug("device.py selects шаг 1")
-        selects = []
-        for obj in self.objects:
-            _LOGGER.debug(f"device.py selects шаг 2 obj={obj}")
-            if obj.platform == Platform.select:
-                selects.append(obj)
-                _LOGGER.debug(f"device.py switches шаг 3")
-        return selects
+        return self.filtre_objects(Platform.select)
+
+    def find_group(self, name_id: str):
+        """Группа по name_id из карты регистров или None"""
+        return next((obj for obj in self.objects if obj.name_id == name_id), None)
 
     @property
     def sensors(self):
-        _LOGGER.debug("device.py selects шаг 1")
-        selects = []
-        for obj in self.objects:
-            _LOGGER.debug(f"device.py selects шаг 2 obj={obj}")
-            if obj.platform == Platform.sensor:
-                selects.append(obj)
-                _LOGGER.debug(f"device.py switches шаг 3")
-        return selects
+        return self.filtre_objects(Platform.sensor)
 
     def filtre_objects(self, platform:Platform | None = None):
-        _LOGGER.debug("device.py filtre_objects шаг 1")
-        selects = []
         if platform is None:
             return self.objects.copy()
-        else:
-            for obj in self.objects:
-                _LOGGER.debug(f"device.py filtre_objects шаг 2 obj={obj}")
-                if obj.platform == platform:
-                    selects.append(obj)
-                    _LOGGER.debug(f"device.py filtre_objects шаг 3")
-            return selects
-
-class WBMr(WBSmart):
-    def __init__(self, hass: HomeAssistant, host_ip: str, host_port: int, device_id: int) -> None:
-
-        super().__init__(hass, host_ip, host_port, device_id)
-        # Инициализируем атрибуты, которые используются в update()
-        self.objects = [
-            DeviceObjectGroup(device=self,
-                                name="Реле",
-                                # name_id="switch",
-                                start_id=1,
-                                platform=Platform.switch,
-                                register_type=RegisterType.coil,
-                                start_address=0,
-                                count=6,
-                                update_interval=1),
-            SelectDeviceObjectGroup(device=self,
-                                    name="Режим работы входа",
-                                    name_id="input_mode",
-                                    platform=Platform.select,
-                                    register_type=RegisterType.holding,
-                                    start_address=9,
-                                    count=6,
-                                    select_values=INPUT_MODE_VALUES,
-                                    select_values0=INPUT_MODE_VALUES_0,
-                                    address0=16,
-                                    entity_category=EntityCategory.CONFIG),
-            SelectDeviceObjectGroup(device=self,
-                                    name="Состояния выходов при подаче питания",
-                                    name_id="status_outputs_when_power_applied",
-                                    platform=Platform.select,
-                                    register_type=RegisterType.holding,
-                                    start_address=6,
-                                    count=1,
-                                    # update_interval=5,
-                                    select_values=STATUS_OUTPUTS_WHEN_POWER_APPLIED,
-                                    entity_category=EntityCategory.CONFIG),
-            DeviceObjectGroup(device=self,
-                              name="Счетчик срабатываний входа",
-                              name_id="trigger_counter",
-                              platform=Platform.sensor,
-                              register_type=RegisterType.holding,
-                              entity_category=EntityCategory.DIAGNOSTIC,
-                              start_address=32,
-                              count=6,
-                              address0=39,
-                              update_interval=1),
-            InputDeviceObjectGroup(device=self,
-                              name="Время подавления дребезга",
-                              name_id="debounce_time",
-                              platform=Platform.number,
-                              register_type=RegisterType.holding,
-                              entity_category=EntityCategory.CONFIG,
-                              start_address=20,
-                              count=6,
-                              # update_interval=1,
-                              address0=27,
-                              min_val=0,
-                              max_val=2000,
-                              mode="box", #box or slider
-                              step=1,
-                              scale=1,
-
-        ),
-        ]
-
-        # _LOGGER.debug(f"device.py WBMr __init__ self.objects={self.objects}")
-
-        # Счетчик срабатываний входа
-
-        # Счётчик коротких нажатий
-
-        # Счётчик длинных нажатий
-
-        # Счётчик двойных нажатий
-
-        # Счётчик короткого, а затем длинного нажатий
-
-        # Регистры mapping-матрицы
-
-        # Регистры mapping-матрицы для коротких нажатий
-
-        # Регистры mapping-матрицы для длинных нажатий
-
-        # Регистры mapping-матрицы для двойных нажатий
-
-        # Регистры mapping-матрицы для сначала короткого, потом длинного нажатий
-
-        # Регистры mapping-матрицы для размыкания кнопки
-
-        # Регистры mapping-матрицы для замыкания кнопки
-
-        # Время подавления дребезга [мс]
-
-        # Время длинного нажатия [мс]
-
-        # Время ожидания второго нажатия [мс]
-
-        # Задержка включения (x0.1, с)
-
-        # Задержка повторного включения (x0.1, с)
-
+        return [obj for obj in self.objects if obj.platform == platform]
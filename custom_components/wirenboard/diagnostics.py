@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import WBCoordinator
+from .device import WBSmart
+from .request_queue import PRIORITIES
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Диагностика обмена с устройствами для загрузки из интерфейса Home Assistant"""
+    coordinator: WBCoordinator = hass.data[DOMAIN][entry.entry_id]
+    hub = coordinator.device.hub
+    queue = hub.request_queue
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "devices": [_device_diagnostics(device) for device in coordinator.devices],
+        "bus": {
+            "devices": len(coordinator.devices),
+            "polling": coordinator.poller.running,
+            "load": coordinator.poller.load,
+            "interval_scale": coordinator.device.interval_scale,
+        },
+        "gateway": {
+            "host": hub.host,
+            "frame_gap": hub.bus_timing.frame_gap if hub.bus_timing is not None else None,
+            "port": hub.port,
+            "pipeline_depth": hub.pipeline_depth,
+            "users": hub.users,
+            "reconnects": hub.metrics.reconnects,
+            "breaker": hub.breaker.as_dict(),
+            "capture": hub.capture.as_dict() if hub.capture is not None else None,
+            "active": queue.active,
+            "waiting": queue.waiting,
+            "lanes": {
+                priority: {
+                    "grants": queue.stats(priority).grants,
+                    "average_wait": queue.stats(priority).average_wait,
+                    "max_wait": queue.stats(priority).max_wait,
+                }
+                for priority in PRIORITIES
+            },
+        },
+    }
+
+
+def _device_diagnostics(device: WBSmart) -> dict:
+    return {
+        "device": {
+            "name": device.name,
+            "model": device.model,
+            "firmware": device.firmware,
+            "serial_number": device.serial_number,
+            "device_id": device.device_id,
+            "connected": device.is_connected,
+            "state_writes": device.state_writes,
+            "suppressed_writes": device.suppressed_writes,
+        },
+        "identity": device.identity.as_dict() if device.identity is not None else None,
+        "model_map": device.device_model.name,
+        "breaker": device.breaker.as_dict(),
+        # Значения групп, на чтение которых устройство отвечает исключением
+        "unavailable": {obj.name: list(obj.unavailable) for obj in device.objects if obj.unavailable},
+        "poll": device.poll_stats.as_dict(),
+        "requests": device.hub.metrics.as_dict(device.device_id),
+    }
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+from pymodbus.exceptions import ModbusException
+
+from .codec import UINT32, decode_string
+from .const import (
+    FRAMER_RTU,
+    MAX_DEVICE_ID,
+    MIN_DEVICE_ID,
+    PROBE_TIMEOUT,
+    SCAN_PIPELINE_DEPTH,
+    SCAN_RTU_TIMEOUT,
+    SCAN_TIMEOUT,
+)
+from .identity import MODEL_REGISTERS, SERIAL_REGISTERS
+from .models import find_model
+from .pipeline import ModbusPipelineClient
+from .rtu import ModbusRtuClient
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DiscoveredDevice(NamedTuple):
+    device_id: int
+    model: str | None
+    serial_number: int | None
+    # Имя карты регистров в models/, подобранной по модели. None - модель не поддерживается
+    model_map: str | None
+
+
+async def async_scan_bus(host: str, port: int, framer: str, device_ids: list[int] | None = None,
+                         timeout: float | None = None, depth: int = SCAN_PIPELINE_DEPTH) -> list[DiscoveredDevice]:
+    """Ищет устройства на шине шлюза и читает их модель и серийный номер.
+
+    RTU over TCP: сначала сканирование Быстрым Modbus - за один обмен на устройство,
+    независимо от количества свободных адресов. Если ни одно устройство не поддерживает
+    сканирование, адреса опрашиваются по очереди с коротким тайм-аутом.
+    Modbus TCP: адреса опрашиваются по одному, если не задана глубина конвейера depth.
+
+    Ошибка подключения к шлюзу поднимает ValueError.
+    """
+    device_ids = list(device_ids or range(MIN_DEVICE_ID, MAX_DEVICE_ID + 1))
+    if timeout is None:
+        timeout = SCAN_RTU_TIMEOUT if framer == FRAMER_RTU else SCAN_TIMEOUT
+    client = _scan_client(host, port, framer, timeout, depth)
+    started = time.monotonic()
+    try:
+        await client.connect()
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ValueError(f"Не удалось подключиться к шлюзу {host}:{port}: {e}") from e
+    try:
+        serial_numbers = {}
+        if framer == FRAMER_RTU:
+            serial_numbers = {device_id: serial_number for serial_number, device_id in await client.scan()
+                              if device_id in device_ids}
+        if serial_numbers:
+            found = sorted(serial_numbers)
+        else:
+            probes = await asyncio.gather(*(_async_probe(client, device_id) for device_id in device_ids))
+            found = [device_id for device_id, responded in zip(device_ids, probes) if responded]
+        devices = [await _async_describe(client, device_id, serial_numbers.get(device_id)) for device_id in found]
+    finally:
+        client.close()
+    _LOGGER.info(f"Поиск устройств на шлюзе {host}:{port} занял {time.monotonic() - started:.1f} с, "
+                 f"найдено: {[(device.device_id, device.model) for device in devices]}")
+    return devices
+
+
+async def async_probe_device(host: str, port: int, framer: str, device_id: int,
+                             timeout: float = PROBE_TIMEOUT) -> bool:
+    """Проверяет одно устройство одним чтением регистра модели, без сканирования шины.
+
+    Ошибка подключения к шлюзу поднимает ValueError.
+    """
+    client = _scan_client(host, port, framer, timeout, 1)
+    try:
+        await client.connect()
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ValueError(f"Не удалось подключиться к шлюзу {host}:{port}: {e}") from e
+    try:
+        return await _async_probe(client, device_id)
+    finally:
+        client.close()
+
+
+def _scan_client(host: str, port: int, framer: str, timeout: float, depth: int):
+    if framer == FRAMER_RTU:
+        return ModbusRtuClient(host=host, port=port, timeout=timeout, retries=0)
+    return ModbusPipelineClient(host=host, port=port, depth=depth, timeout=timeout, retries=0, adaptive=False)
+
+
+async def _async_read(client, address: int, count: int, device_id: int, attempts: int = 1) -> list[int] | None:
+    for _ in range(attempts):
+        try:
+            result = await client.read_holding_registers(address, count=count, device_id=device_id)
+        except (ModbusException, asyncio.TimeoutError, ConnectionError):
+            continue
+        if result.isError() or len(result.registers) < count:
+            return None
+        return result.registers
+    return None
+
+
+async def _async_probe(client, device_id: int) -> bool:
+    # Первого регистра модели достаточно, чтобы узнать, есть ли устройство, и не занимать шину
+    return await _async_read(client, MODEL_REGISTERS[0], 1, device_id) is not None
+
+
+async def _async_describe(client, device_id: int, serial_number: int | None) -> DiscoveredDevice:
+    # Устройство уже ответило: потерянный ответ повторяем
+    registers = await _async_read(client, *MODEL_REGISTERS, device_id, attempts=2)
+    model = None
+    if registers:
+        model = decode_string(registers).lower() or None
+    if serial_number is None:
+        registers = await _async_read(client, *SERIAL_REGISTERS, device_id, attempts=2)
+        if registers:
+            serial_number = UINT32.decode(registers)[0]
+    return DiscoveredDevice(device_id, model, serial_number, find_model(model))
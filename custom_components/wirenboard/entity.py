@@ -1,10 +1,13 @@
 from __future__ import annotations
 import logging
+import time
+from datetime import timedelta
 
 from homeassistant.helpers.entity import DeviceInfo
-from .const import DOMAIN
+from .const import DOMAIN, HEARTBEAT_CHECKS
 from homeassistant.core import (HomeAssistant, callback)
 from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_track_time_interval
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +30,9 @@ class WbEntity(Entity):
 
         if self.__object.entity_category is not None:
             self._attr_entity_category = self.__object.entity_category
+        # Последнее опубликованное значение и время публикации для политики публикации группы
+        self.__published = None
+        self.__published_at = 0.0
 
 
     @property
@@ -37,26 +43,85 @@ class WbEntity(Entity):
     def id(self):
         return self.__id
 
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        # Значение из снимка прошлой работы, с устройства еще не прочитано
+        if self.__object.is_restored:
+            return {"restored": True}
+        return None
+
+    def _state_value(self):
+        """Значение, которое политика публикации сравнивает с опубликованным"""
+        return self.__object.get_state(self.__id)
+
+    def _is_changed(self) -> bool:
+        return self.__object.is_dirty(self.__id)
+
+    def _clear_changed(self):
+        self.__object.clear_dirty(self.__id)
+
+    def __should_publish(self) -> bool:
+        policy = self.__object.spec.publish
+        if policy is None:
+            return self._is_changed()
+        return policy.should_publish(self.__published, self._state_value(), time.monotonic() - self.__published_at,
+                                     self._is_changed())
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        policy = self.__object.spec.publish
+        if policy is not None and policy.heartbeat:
+            # Чтения группы не гарантируют heartbeat: опрос может быть приостановлен или группа не опрашивается
+            self.async_on_remove(async_track_time_interval(
+                self.hass, self.__async_heartbeat, timedelta(seconds=policy.heartbeat / HEARTBEAT_CHECKS)))
+
+    @callback
+    def __async_heartbeat(self, now) -> None:
+        if time.monotonic() - self.__published_at < self.__object.spec.publish.heartbeat:
+            return
+        self._attr_available = self.__device.is_connected and self.__object.is_available(self.__id)
+        self.async_write_ha_state()
+
     @callback
     def _handle_coordinator_update(self) -> None:
-        self._attr_available = self.__device.is_connected
+        # Публикуем состояние, только если изменились доступность или значение регистра сущности
+        # с учетом политики публикации группы
+        available = self.__device.is_connected and self.__object.is_available(self.__id)
+        if available == self._attr_available and not self.__should_publish():
+            self.__device.count_state_write(suppressed=True)
+            return
+        self._attr_available = available
         self.async_write_ha_state()
 
+    @callback
+    def async_write_ha_state(self) -> None:
+        # Любая публикация передает текущее значение, отметка об изменении больше не нужна
+        self._clear_changed()
+        self.__published = self._state_value()
+        self.__published_at = time.monotonic()
+        self.__device.count_state_write()
+        super().async_write_ha_state()
+
     @property
     def device_info(self) -> DeviceInfo:
         """Return device info."""
-        identifiers = {
-            (DOMAIN, f"{self.__device.name}_{self.__device.serial_number}")
-        }
-        _LOGGER.debug(f"DeviceInfo(identifiers={identifiers}, name = {self.__device.name}, model = {self.__device.model}, "
-                     f"sw_version = {self.__device.firmware}, manufacturer = {self.__device.manufacturer}")
-
-        return DeviceInfo(
-            identifiers=identifiers,
-            name = self.__device.name,
-            model = self.__device.model,
-            model_id = self.__device.device_id,
-            serial_number = self.__device.serial_number,
-            sw_version = self.__device.firmware,
-            manufacturer = self.__device.manufacturer
-        )
+        return wb_device_info(self.__device)
+
+
+def wb_device_info(device) -> DeviceInfo:
+    """Описание устройства Home Assistant, общее для всех сущностей модуля"""
+    identifiers = {
+        (DOMAIN, f"{device.name}_{device.serial_number}")
+    }
+    _LOGGER.debug(f"DeviceInfo(identifiers={identifiers}, name = {device.name}, model = {device.model}, "
+                 f"sw_version = {device.firmware}, manufacturer = {device.manufacturer}")
+
+    return DeviceInfo(
+        identifiers=identifiers,
+        name = device.name,
+        model = device.model,
+        model_id = device.device_id,
+        serial_number = device.serial_number,
+        sw_version = device.firmware,
+        manufacturer = device.manufacturer
+    )
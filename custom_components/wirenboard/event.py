@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.event import EventDeviceClass, EventEntity
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .coordinator import WBCoordinator
+from .entity import WbEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    objects = []
+    coordinator: WBCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    for device in coordinator.devices:
+        for obj in device.objects:
+            if obj.spec.event is None:
+                continue
+            for i in range(obj.count):
+                objects.append(WbButtonEvent(hass, coordinator, obj, i))
+
+    _LOGGER.info(f"📊 СОЗДАНО {len(objects)} СОБЫТИЙ КНОПОК")
+    async_add_entities(objects, update_before_add=False)
+
+
+class WbButtonEvent(WbEntity, CoordinatorEntity, EventEntity):
+    """Нажатия кнопки входа одного типа. Приращение счетчика группы за одно чтение - одно событие
+    с количеством нажатий в атрибуте presses"""
+
+    _attr_device_class = EventDeviceClass.BUTTON
+
+    def __init__(self, hass: HomeAssistant, coordinator: WBCoordinator, obj, idx: int) -> None:
+        super().__init__(hass, obj, idx)
+        CoordinatorEntity.__init__(self, coordinator)
+        self.entity_id = f"event.{self.entity_id.split('.', 1)[1]}"
+        if obj.spec.event_name:
+            channel = obj.get_channel(idx)
+            self._attr_name = f"{obj.spec.event_name} {'' if channel is None else channel}".strip()
+        self._attr_event_types = [obj.spec.event]
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Нажатия, накопленные до добавления сущности (например, пока она была отключена), не передаются
+        self.object.take_presses(self.id)
+
+    def _clear_changed(self):
+        # Отметки об изменении регистров принадлежат сенсору счетчика
+        pass
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        available = self.object.device.is_connected and self.object.is_available(self.id)
+        presses = self.object.take_presses(self.id)
+        if not presses and available == self._attr_available:
+            return
+        self._attr_available = available
+        if presses:
+            self._trigger_event(self.object.spec.event, {"presses": presses})
+        self.async_write_ha_state()
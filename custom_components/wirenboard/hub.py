@@ -1,138 +1,493 @@
 from __future__ import annotations
-from pymodbus import pymodbus_apply_logging_config
-import datetime
-from pymodbus import ModbusException
+from pymodbus.exceptions import ModbusIOException
 from pymodbus.client import AsyncModbusTcpClient
 from pymodbus.framer import FramerType
 from homeassistant.core import HomeAssistant
 import logging
 import asyncio
+import time
+
+from .breaker import CircuitBreaker
+from .capture import CaptureOutcome, CaptureWriter
+from .codec import UINT32, decode_string
+from .pipeline import ModbusPipelineClient
+from .rtu import ModbusRtuClient, ModbusSerialClient
+from .timing import BusTiming, SerialSettings
+from .request_queue import RequestQueue, PRIORITY_INTERACTIVE, PRIORITY_POLL
+from .metrics import HubMetrics
+from .protocol import (
+    FAST_MODBUS,
+    FAST_MODBUS_BROADCAST,
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_COILS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+    ModbusDeviceError,
+)
+from .const import (
+    CAPTURE_FLUSH_INTERVAL,
+    FAST_MODBUS_EVENT_INTERVAL,
+    FAST_MODBUS_MAX_EVENTS_LENGTH,
+    FAST_MODBUS_MAX_FAILURES,
+    GATEWAY_BREAKER_BASE_DELAY,
+    GATEWAY_BREAKER_THRESHOLD,
+)
 
 _LOGGER = logging.getLogger(__name__)
 # pymodbus_apply_logging_config("DEBUG")
 
+# Общий для процесса реестр подключений к шлюзам.
+# Ключ - (host, port, framer), значение - подключение, разделяемое всеми устройствами шлюза
+_HUBS: dict[tuple, async_modbus_hub] = {}
+
+
+def acquire_hub(hass: HomeAssistant, host, port, framer: FramerType = FramerType.SOCKET,
+                pipeline_depth: int = 1, serial: SerialSettings | None = None, client=None) -> async_modbus_hub:
+    """Возвращает общее подключение к шлюзу и увеличивает счетчик его пользователей.
+    serial - шина на последовательном порту: host и port заменяются портом и скоростью.
+    client - готовый клиент вместо подключения к шлюзу (например, воспроизведение записи обмена)"""
+    if serial is not None:
+        host, port, framer = serial.port, serial.baudrate, FramerType.RTU
+    key = (host, int(port), framer)
+    hub = _HUBS.get(key)
+    if hub is None:
+        hub = async_modbus_hub(hass=hass, host=host, port=port, framer=framer, pipeline_depth=pipeline_depth,
+                               serial=serial, client=client)
+        _HUBS[key] = hub
+        _LOGGER.debug(f"Создано подключение к шлюзу {host}:{port} ({framer})")
+    elif hub.pipeline_depth != pipeline_depth:
+        _LOGGER.debug(f"Подключение к шлюзу {host}:{port} уже создано с глубиной конвейера "
+                      f"{hub.pipeline_depth}, запрошенная глубина {pipeline_depth} не применяется")
+    hub.attach()
+    return hub
+
+
+def release_hub(hub: async_modbus_hub) -> None:
+    """Уменьшает счетчик пользователей подключения. Последний пользователь закрывает подключение"""
+    if hub.detach() > 0:
+        return
+    if _HUBS.get(hub.key) is hub:
+        _HUBS.pop(hub.key)
+    hub.disconnect()
+    hub.stop_capture()
+    _LOGGER.debug(f"Подключение к шлюзу {hub.host}:{hub.port} закрыто")
+
+
 class async_modbus_hub:
-    def __init__(self, hass: HomeAssistant, host, port) -> None:
+    def __init__(self, hass: HomeAssistant, host, port, framer: FramerType = FramerType.SOCKET,
+                 pipeline_depth: int = 1, serial: SerialSettings | None = None, client=None) -> None:
+        if serial is not None:
+            host, port, framer = serial.port, serial.baudrate, FramerType.RTU
         self._host = host
         self._port = port
+        self._framer = framer
         self._hass = hass
-        self._client = AsyncModbusTcpClient(
-            host=host,
-            port=port,
-            framer=FramerType.SOCKET,
-            retries=5,
-            timeout=10,
-            reconnect_delay=2,
-        )
+        self.__pipeline_depth = pipeline_depth if framer == FramerType.SOCKET else 1
+        # Время передачи кадров известно только для шины на последовательном порту
+        self.__bus_timing: BusTiming | None = None
+        if client is not None:
+            self._client = client
+        elif serial is not None:
+            # Modbus RTU через адаптер RS-485 на хосте, паузы между кадрами по скорости порта
+            self._client = ModbusSerialClient(serial)
+            self.__bus_timing = self._client.timing
+        elif self.__pipeline_depth > 1:
+            # Конвейерный режим: несколько запросов в полете, ответы сопоставляются по transaction id
+            self._client = ModbusPipelineClient(host=host, port=port, depth=self.__pipeline_depth)
+        elif framer == FramerType.RTU:
+            # RTU over TCP. Собственный клиент нужен для событий Быстрого Modbus в том же подключении
+            self._client = ModbusRtuClient(host=host, port=port)
+        else:
+            self._client = AsyncModbusTcpClient(
+                host=host,
+                port=port,
+                framer=framer,
+                # Короткий тайм-аут: пока запрос к неотвечающему устройству ждет ответа,
+                # остальные устройства шлюза ждут в очереди
+                retries=1,
+                timeout=3,
+                reconnect_delay=2,
+            )
         self.__is_connected = False
-        # Семафор для предотвращения параллельных запросов
-        self._request_semaphore = asyncio.Semaphore(1)
+        self.__users = 0
+        # Очередь для предотвращения параллельных запросов.
+        # Общая для всех устройств шлюза, поэтому шина RS-485 занята только одним запросом.
+        # Команды пользователя обслуживаются раньше опроса, опрос - раньше фоновых чтений.
+        # В конвейерном режиме количество запросов в полете дополнительно ограничивает сам клиент
+        self._request_queue = RequestQueue(self.__pipeline_depth)
+        # Защищает от одновременного переподключения несколькими устройствами
+        self._connect_lock = asyncio.Lock()
+        # Обработчики событий Быстрого Modbus по адресам устройств
+        self.__event_handlers = {}
+        self.__event_task: asyncio.Task | None = None
+        self.__metrics = HubMetrics()
+        # Запись обмена. None - не ведется
+        self.__capture: CaptureWriter | None = None
+        self.__capture_task: asyncio.Task | None = None
+        self.__was_connected = False
+        # Шлюз, к которому не удается подключиться, проверяется с нарастающей задержкой
+        self.__breaker = CircuitBreaker(f"Шлюз {host}:{port}", GATEWAY_BREAKER_THRESHOLD, GATEWAY_BREAKER_BASE_DELAY)
+
+    @property
+    def host(self):
+        return self._host
+
+    @property
+    def port(self):
+        return self._port
+
+    @property
+    def key(self) -> tuple:
+        return self._host, int(self._port), self._framer
+
+    @property
+    def pipeline_depth(self) -> int:
+        return self.__pipeline_depth
+
+    @property
+    def bus_timing(self) -> BusTiming | None:
+        return self.__bus_timing
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    @property
+    def connected(self) -> bool:
+        return self._client.connected
+
+    @property
+    def request_queue(self) -> RequestQueue:
+        return self._request_queue
+
+    @property
+    def metrics(self) -> HubMetrics:
+        return self.__metrics
+
+    @property
+    def capture(self) -> CaptureWriter | None:
+        return self.__capture
+
+    def start_capture(self, path: str):
+        """Начинает запись обмена со шлюзом в файл path. Повторный вызов не меняет текущую запись"""
+        if self.__capture is not None:
+            return
+        self.__capture = CaptureWriter(path)
+        self.__capture_task = self._hass.async_create_background_task(
+            self.__flush_capture(), f"Wirenboard capture {self._host}:{self._port}"
+        )
+        _LOGGER.info(f"Запись обмена со шлюзом {self._host}:{self._port} в {path}")
+
+    def stop_capture(self) -> asyncio.Future | None:
+        """Останавливает запись. Возвращает задачу дозаписи остатка буфера вне цикла событий"""
+        if self.__capture is None:
+            return None
+        if self.__capture_task is not None:
+            self.__capture_task.cancel()
+            self.__capture_task = None
+        capture, self.__capture = self.__capture, None
+        return self._hass.async_add_executor_job(capture.close)
+
+    async def __flush_capture(self):
+        capture = self.__capture
+        while True:
+            await asyncio.sleep(CAPTURE_FLUSH_INTERVAL)
+            try:
+                await self._hass.async_add_executor_job(capture.flush)
+            except OSError as e:
+                _LOGGER.error(f"Не удалось записать обмен со шлюзом {self._host}:{self._port} в {capture.path}: {e}")
+
+    @property
+    def users(self) -> int:
+        """Количество устройств, использующих подключение"""
+        return self.__users
+
+    def attach(self) -> int:
+        self.__users += 1
+        return self.__users
+
+    def detach(self) -> int:
+        self.__users = max(self.__users - 1, 0)
+        return self.__users
 
     async def connect(self):
+        async with self._connect_lock:
+            if self._client.connected:
+                self.__is_connected = True
+                return
+            # Шлюз недоступен: не ждем тайм-аут подключения до следующей пробы.
+            # Ожидавшие подключения другими устройствами отклоняются после неудачи без повторной попытки
+            if not self.__breaker.allow():
+                raise ValueError(f"Шлюз {self._host}:{self._port} недоступен")
+            await self.__connect()
+
+    async def __connect(self):
         try:
-            if not self._client.connected:
-                await self._client.connect()
+            # Клиент pymodbus сообщает о неудаче результатом, собственные клиенты - исключением
+            if not await self._client.connect():
+                raise ConnectionError("подключение не установлено")
+            if self.__was_connected:
+                self.__metrics.reconnects += 1
+            self.__was_connected = True
             self.__is_connected = True
+            self.__breaker.record_success()
         except asyncio.CancelledError:
             _LOGGER.debug(f"Подключение к Modbus {self._host}:{self._port} было отменено")
             self.__is_connected = False
+            if not self.__breaker.is_closed:
+                # Прерванная проба не должна оставить автомат в ожидании ее результата
+                self.__breaker.record_failure()
             raise
         except Exception as e:
             _LOGGER.error(f"Ошибка подключения к Modbus {self._host}:{self._port}: {e}")
             self.__is_connected = False
+            self.__breaker.record_failure()
             raise ValueError(f"Не удалось подключиться к устройству: {e}")
 
     def disconnect(self):
+        if self.__event_task is not None:
+            self.__event_task.cancel()
+            self.__event_task = None
         if self._client.connected:
             self._client.close()
         self.__is_connected = False
 
-    async def async_read_holding_register_string(self, address, count, device_id: int):
-        async with self._request_semaphore:
+    @property
+    def supports_events(self) -> bool:
+        """Можно ли запрашивать события Быстрого Modbus через это подключение"""
+        return isinstance(self._client, ModbusRtuClient)
+
+    async def async_setup_events(self, device_id: int, ranges: list[tuple[int, int, int]]) -> list[bool] | None:
+        """Включает события Быстрого Modbus на устройстве. None - устройство события не поддерживает"""
+        if not self.supports_events:
+            return None
+        async with self._request_queue.slot(PRIORITY_POLL):
+            try:
+                if not self._client.connected:
+                    await self.connect()
+                count = sum(count for _, _, count in ranges)
+                return await self.__request(FAST_MODBUS, device_id, 3 + 5 * len(ranges) + count, 3 + (count + 7) // 8,
+                                            self._client.setup_events, device_id, ranges)
+            except Exception as e:
+                _LOGGER.debug(f"Устройство {device_id} не поддерживает события Быстрого Modbus: {e}")
+                return None
+
+    def subscribe_events(self, device_id: int, handler) -> None:
+        """Подписывает устройство на события. handler(events) получает список событий устройства
+        или None, если события на шине перестали поступать и нужно вернуться к опросу"""
+        self.__event_handlers[device_id] = handler
+        if self.__event_task is None:
+            self.__event_task = self._hass.async_create_background_task(
+                self.__event_loop(), f"Wirenboard events {self._host}:{self._port}"
+            )
+
+    def unsubscribe_events(self, device_id: int) -> None:
+        self.__event_handlers.pop(device_id, None)
+        if not self.__event_handlers and self.__event_task is not None:
+            self.__event_task.cancel()
+            self.__event_task = None
+
+    async def __event_loop(self):
+        """Запрашивает события у всех устройств шлюза и раздает их подписчикам"""
+        confirm_device_id = confirm_flag = 0
+        min_device_id = 1
+        failures = 0
+        while self.__event_handlers:
+            try:
+                async with self._request_queue.slot(PRIORITY_POLL):
+                    if not self._client.connected:
+                        await self.connect()
+                    # Размер ответа с событиями заранее неизвестен, учитывается ответ "событий нет"
+                    reply = await self.__request(
+                        FAST_MODBUS, FAST_MODBUS_BROADCAST, 6, 2, self._client.request_events,
+                        min_device_id, FAST_MODBUS_MAX_EVENTS_LENGTH, confirm_device_id, confirm_flag
+                    )
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                _LOGGER.debug(f"Ошибка запроса событий на шлюзе {self._host}:{self._port}: {e}")
+                if failures >= FAST_MODBUS_MAX_FAILURES:
+                    _LOGGER.warning(f"Шлюз {self._host}:{self._port} не отвечает на запросы событий. "
+                                    f"Устройства переходят на опрос")
+                    break
+                await asyncio.sleep(FAST_MODBUS_EVENT_INTERVAL)
+                continue
+
+            if reply is None:
+                confirm_device_id = confirm_flag = 0
+                await asyncio.sleep(FAST_MODBUS_EVENT_INTERVAL)
+                continue
+
+            # Подтверждаем события следующим запросом и даем очередь устройствам со следующими адресами
+            confirm_device_id, confirm_flag = reply.dev_id, reply.flag
+            min_device_id = reply.dev_id + 1 if reply.dev_id < 247 else 1
+            handler = self.__event_handlers.get(reply.dev_id)
+            if handler is not None:
+                handler(reply.events)
+
+        self.__event_task = None
+        for handler in list(self.__event_handlers.values()):
+            handler(None)
+        self.__event_handlers.clear()
+
+    async def __request(self, function_code: int, device_id: int, request_bytes: int, response_bytes: int,
+                        method, /, *args, timeout: float | None = None, **kwargs):
+        """Выполняет запрос клиента и учитывает его в метриках. Размеры - длина PDU запроса и ответа.
+        timeout - срок запроса: его истечение учитывается как тайм-аут и поднимает TimeoutError"""
+        started = time.monotonic()
+        try:
+            async with asyncio.timeout(timeout):
+                result = await method(*args, **kwargs)
+        except (ModbusIOException, TimeoutError):
+            self.__metrics.add_timeout(device_id, function_code, request_bytes)
+            if self.__capture is not None:
+                self.__capture.record(started, time.monotonic() - started, device_id, function_code,
+                                      CaptureOutcome.timeout, args, kwargs)
+            raise
+        except asyncio.CancelledError:
+            if self.__capture is not None:
+                self.__capture.record(started, time.monotonic() - started, device_id, function_code,
+                                      CaptureOutcome.cancelled, args, kwargs)
+            raise
+        except Exception:
+            self.__metrics.add_error(device_id, function_code, request_bytes)
+            if self.__capture is not None:
+                self.__capture.record(started, time.monotonic() - started, device_id, function_code,
+                                      CaptureOutcome.error, args, kwargs)
+            raise
+        latency = time.monotonic() - started
+        exception = hasattr(result, "isError") and result.isError()
+        self.__metrics.add(device_id, function_code, latency, request_bytes,
+                           2 if exception else response_bytes, exception)
+        if self.__capture is not None:
+            self.__capture.record(started, latency, device_id, function_code,
+                                  CaptureOutcome.exception if exception else CaptureOutcome.ok, args, kwargs, result)
+        return result
+
+    async def async_read_holding_register_string(self, address, count, device_id: int, priority: int = PRIORITY_POLL):
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
 
-                result = await self._client.read_holding_registers(address, count=count, device_id=device_id)
+                result = await self.__request(READ_HOLDING_REGISTERS, device_id, 5, 2 + 2 * count,
+                                              self._client.read_holding_registers,
+                                              address, count=count, device_id=device_id)
                 if result.isError():
                     _LOGGER.debug(f"Ошибка Modbus при чтении регистра {address}: {result}")
                     return None
 
-                if result.registers:
-                    while result.registers and result.registers[-1] == 0:
-                        result.registers.pop()
-                    return "".join(map(chr, result.registers)).lower()
-                return None
+                return decode_string(result.registers).lower() or None
             except Exception as e:
                 _LOGGER.debug(f"Ошибка при чтении регистра {address}: {e}")
                 return None
 
-    async def async_read_holding_register(self, address, count, device_id:int):
-        async with self._request_semaphore:
+    async def async_read_holding_register(self, address, count, device_id:int, priority: int = PRIORITY_POLL,
+                                          exceptions: bool = False, timeout: float | None = None):
+        """Читает holding регистры. None - чтение не удалось.
+        exceptions - ответ исключением Modbus поднимает ModbusDeviceError, а не возвращает None.
+        timeout - срок чтения, отсчитываемый после ожидания в очереди шлюза"""
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
                 
-                result = await self._client.read_holding_registers(address, count=count, device_id=device_id)
+                result = await self.__request(READ_HOLDING_REGISTERS, device_id, 5, 2 + 2 * count,
+                                              self._client.read_holding_registers,
+                                              address, count=count, device_id=device_id, timeout=timeout)
                 if result.isError():
                     _LOGGER.debug(f"Ошибка Modbus при чтении регистра {address}: {result}")
+                    if exceptions:
+                        raise ModbusDeviceError(READ_HOLDING_REGISTERS, getattr(result, "exception_code", 0))
                     return None
                 
                 if result.registers:
                     return result.registers
                 return None
+            except ModbusDeviceError:
+                raise
             except Exception as e:
                 _LOGGER.debug(f"Ошибка при чтении регистра {address}: {e}")
                 return None
 
-    async def async_read_holding_register_uint32(self, address, count, device_id: int):
-        async with self._request_semaphore:
+    async def async_read_holding_register_uint32(self, address, count, device_id: int, priority: int = PRIORITY_POLL):
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
 
-                result = await self._client.read_holding_registers(address, count=count, device_id=device_id)
+                result = await self.__request(READ_HOLDING_REGISTERS, device_id, 5, 2 + 2 * count,
+                                              self._client.read_holding_registers,
+                                              address, count=count, device_id=device_id)
                 if result.isError():
                     _LOGGER.debug(f"Ошибка Modbus при чтении регистра {address}: {result}")
                     return None
 
-                if result.registers:
-                    return self._client.convert_from_registers(result.registers, self._client.DATATYPE.UINT32)
+                if len(result.registers) >= UINT32.width:
+                    return UINT32.decode(result.registers[:UINT32.width])[0]
                 return None
             except Exception as e:
                 _LOGGER.debug(f"Ошибка при чтении регистра {address}: {e}")
                 return None
 
-    async def async_write_holding_register(self, address, value, device_id:int) -> None:
-        async with self._request_semaphore:
+    async def async_write_holding_register(self, address, value, device_id:int, priority: int = PRIORITY_INTERACTIVE) -> None:
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
                 
                 # Используем device_id для pymodbus 3.11.1
-                result = await self._client.write_register(address, value, device_id=device_id)
+                result = await self.__request(WRITE_SINGLE_REGISTER, device_id, 5, 5,
+                                              self._client.write_register, address, value, device_id=device_id)
                 if result.isError():
                     _LOGGER.error(f"Ошибка Modbus при записи значения {value} в регистр {address}: {result}")
-                    raise Exception(f"Modbus write error: {result}")
+                    raise ModbusDeviceError(WRITE_SINGLE_REGISTER, getattr(result, "exception_code", 0))
             except Exception as e:
                 _LOGGER.error(f"Ошибка при записи значения {value} в регистр {address}: {e}")
                 raise
 
-    async def async_read_coils(self, address, count, device_id:int):
-        async with self._request_semaphore:
+    async def async_write_holding_registers(self, address, values: list, device_id:int, priority: int = PRIORITY_INTERACTIVE) -> None:
+        async with self._request_queue.slot(priority):
+            try:
+                # Проверяем подключение и переподключаемся при необходимости
+                if not self._client.connected:
+                    await self.connect()
+
+                result = await self.__request(WRITE_MULTIPLE_REGISTERS, device_id, 6 + 2 * len(values), 5,
+                                              self._client.write_registers, address, values, device_id=device_id)
+                if result.isError():
+                    _LOGGER.error(f"Ошибка Modbus при записи значений {values} в регистры {address}: {result}")
+                    raise ModbusDeviceError(WRITE_MULTIPLE_REGISTERS, getattr(result, "exception_code", 0))
+            except Exception as e:
+                _LOGGER.error(f"Ошибка при записи значений {values} в регистры {address}: {e}")
+                raise
+
+    async def async_read_coils(self, address, count, device_id:int, priority: int = PRIORITY_POLL,
+                               exceptions: bool = False, timeout: float | None = None):
+        """Читает coil регистры. None - чтение не удалось.
+        exceptions - ответ исключением Modbus поднимает ModbusDeviceError, а не возвращает None.
+        timeout - срок чтения, отсчитываемый после ожидания в очереди шлюза"""
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
 
                 # Используем device_id для pymodbus 3.11.1
-                result = await self._client.read_coils(address, count=count, device_id=device_id)
+                result = await self.__request(READ_COILS, device_id, 5, 2 + (count + 7) // 8,
+                                              self._client.read_coils, address, count=count, device_id=device_id,
+                                              timeout=timeout)
                 if result.isError():
                     _LOGGER.debug(f"Ошибка Modbus при чтении битов регистра {address}: {result}")
+                    if exceptions:
+                        raise ModbusDeviceError(READ_COILS, getattr(result, "exception_code", 0))
                     return None
 
                 if result.bits:
@@ -140,6 +495,8 @@ class async_modbus_hub:
                     del bits[count:len(bits)]
                     return bits
                 return None
+            except ModbusDeviceError:
+                raise
             except Exception as e:
                 # Не логируем ошибки подключения как предупреждения, только как отладочные сообщения
                 if "Not connected" in str(e) or "Connection" in str(e):
@@ -148,18 +505,19 @@ class async_modbus_hub:
                     _LOGGER.debug(f"Ошибка при чтении битов регистра {address}: {e}")
                 return None
 
-    async def async_write_coils(self, address, value:list, device_id:int) -> None:
-        async with self._request_semaphore:
+    async def async_write_coils(self, address, value:list, device_id:int, priority: int = PRIORITY_INTERACTIVE) -> None:
+        async with self._request_queue.slot(priority):
             try:
                 # Проверяем подключение и переподключаемся при необходимости
                 if not self._client.connected:
                     await self.connect()
 
-                # Используем device_id для pymodbus 3.11.1
-                result = await self._client.write_coils(address, value, device_id=device_id)
+                # pymodbus дополняет переданный список до целого байта, передаем копию
+                result = await self.__request(WRITE_MULTIPLE_COILS, device_id, 6 + (len(value) + 7) // 8, 5,
+                                              self._client.write_coils, address, list(value), device_id=device_id)
                 if result.isError():
                     _LOGGER.debug(f"Ошибка Modbus при записи значения {value} в регистр {address}: {result}")
-                    raise Exception(f"Modbus write error: {result}")
+                    raise ModbusDeviceError(WRITE_MULTIPLE_COILS, getattr(result, "exception_code", 0))
             except Exception as e:
                 _LOGGER.debug(f"Ошибка при записи значения {value} в регистр {address}: {e}")
                 raise
\ No newline at end of file
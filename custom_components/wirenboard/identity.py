@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import logging
+
+from .request_queue import PRIORITY_POLL
+
+_LOGGER = logging.getLogger(__name__)
+
+# Регистры идентификации модулей Wiren Board: (адрес, количество)
+MODEL_REGISTERS = (200, 20)
+FIRMWARE_REGISTERS = (250, 16)
+SERIAL_REGISTERS = (270, 2)
+BOOTLOADER_REGISTERS = (330, 7)
+
+
+class DeviceIdentity:
+    """Модель, версии прошивки, серийный номер и поддерживаемые регистры устройства.
+
+    features - для необязательных регистров карты (например, регистров входа 0),
+    отвечает ли на них устройство. Сохраняется в записи конфигурации, чтобы при
+    перезапуске не читать идентификацию и не проверять регистры заново.
+    """
+
+    def __init__(self, model: str | None, firmware: str | None, bootloader: str | None,
+                 serial_number: int | None, features: dict[int, bool] | None = None,
+                 model_map: str | None = None):
+        self.model = model
+        self.firmware = firmware
+        self.bootloader = bootloader
+        self.serial_number = serial_number
+        self.features = features or {}
+        # Имя карты регистров в models/, подобранной по модели
+        self.model_map = model_map
+
+    @property
+    def unsupported(self) -> frozenset[int]:
+        """Адреса необязательных регистров, на которые устройство не отвечает"""
+        return frozenset(address for address, supported in self.features.items() if not supported)
+
+    def as_dict(self) -> dict:
+        return {
+            "model": self.model,
+            "firmware": self.firmware,
+            "bootloader": self.bootloader,
+            "serial_number": self.serial_number,
+            # Ключи JSON - строки
+            "features": {str(address): supported for address, supported in self.features.items()},
+            "model_map": self.model_map,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> DeviceIdentity:
+        return cls(
+            data.get("model"),
+            data.get("firmware"),
+            data.get("bootloader"),
+            data.get("serial_number"),
+            {int(address): supported for address, supported in data.get("features", {}).items()},
+            data.get("model_map"),
+        )
+
+
+async def async_read_firmware(hub, device_id: int, priority: int = PRIORITY_POLL) -> str | None:
+    return await hub.async_read_holding_register_string(*FIRMWARE_REGISTERS, device_id, priority)
+
+
+async def async_read_identity(hub, device_id: int, priority: int = PRIORITY_POLL) -> DeviceIdentity:
+    """Читает регистры идентификации. Непрочитанные значения - None.
+    Если устройство не ответило на чтение модели, остальные регистры не читаются"""
+    model = await hub.async_read_holding_register_string(*MODEL_REGISTERS, device_id, priority)
+    if model is None:
+        return DeviceIdentity(None, None, None, None)
+    identity = DeviceIdentity(
+        model,
+        await async_read_firmware(hub, device_id, priority),
+        await hub.async_read_holding_register_string(*BOOTLOADER_REGISTERS, device_id, priority),
+        await hub.async_read_holding_register_uint32(*SERIAL_REGISTERS, device_id, priority),
+    )
+    _LOGGER.info(f"model={identity.model}; bootloader={identity.bootloader}; firmware={identity.firmware}; "
+                 f"S/N={identity.serial_number}")
+    return identity
+
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from array import array
+
+
+class RegisterImage:
+    """Значения всех регистров одного типа устройства в одном компактном массиве.
+
+    Регистры каждой группы занимают непрерывный участок массива в порядке индексов
+    сущностей, поэтому ответ на чтение ложится в массив одним присваиванием среза.
+    Для каждого регистра хранятся отметки "значение прочитано" и "значение изменилось
+    и еще не опубликовано".
+    """
+
+    __slots__ = ("__values", "__valid", "__dirty")
+
+    # uint16 для holding регистров
+    typecode = "H"
+
+    def __init__(self, size: int):
+        self.__values = array(self.typecode, bytes(size * array(self.typecode).itemsize))
+        self.__valid = bytearray(size)
+        self.__dirty = bytearray(size)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+    def pack(self, values) -> array:
+        """Преобразует ответ устройства в массив того же типа, что и образ"""
+        if isinstance(values, array) and values.typecode == self.typecode:
+            return values
+        return array(self.typecode, values)
+
+    def _value(self, raw):
+        return raw
+
+    def get(self, slot: int):
+        """Значение регистра или None, если оно еще не прочитано"""
+        if not self.__valid[slot]:
+            return None
+        return self._value(self.__values[slot])
+
+    def values(self, offset: int, count: int) -> tuple:
+        return tuple(self.get(slot) for slot in range(offset, offset + count))
+
+    def raw(self, offset: int, count: int) -> array:
+        """Копия участка образа без отметок о прочитанных значениях"""
+        return self.__values[offset:offset + count]
+
+    def is_valid(self, offset: int, count: int = 1) -> bool:
+        """Прочитаны ли все регистры участка"""
+        return self.__valid.find(0, offset, offset + count) < 0
+
+    def set(self, slot: int, value) -> bool:
+        """Записывает значение одного регистра. None - значение неизвестно. Возвращает, изменилось ли значение"""
+        if value is None:
+            if not self.__valid[slot]:
+                return False
+            self.__valid[slot] = 0
+        else:
+            if self.__valid[slot] and self.__values[slot] == value:
+                return False
+            self.__values[slot] = value
+            self.__valid[slot] = 1
+        self.__dirty[slot] = 1
+        return True
+
+    def write(self, offset: int, values) -> bool:
+        """Записывает прочитанные значения участка образа. Возвращает, изменилось ли хотя бы одно значение"""
+        values = self.pack(values)
+        end = offset + len(values)
+        current = self.__values[offset:end]
+        if current == values and self.__valid.find(0, offset, end) < 0:
+            # Обычный цикл опроса: значения не изменились
+            return False
+        for position, (old, new) in enumerate(zip(current, values)):
+            if old != new or not self.__valid[offset + position]:
+                self.__dirty[offset + position] = 1
+        self.__values[offset:end] = values
+        self.__valid[offset:end] = b"\x01" * len(values)
+        return True
+
+    def is_dirty(self, slot: int, count: int = 1) -> bool:
+        return self.__dirty.find(1, slot, slot + count) >= 0
+
+    def clear_dirty(self, slot: int, count: int = 1) -> bool:
+        """Снимает отметки об изменении регистров участка. Возвращает, была ли хотя бы одна отметка"""
+        dirty = self.is_dirty(slot, count)
+        self.__dirty[slot:slot + count] = bytes(count)
+        return dirty
+
+    def mark_dirty(self, offset: int, count: int):
+        self.__dirty[offset:offset + count] = b"\x01" * count
+
+
+class CoilImage(RegisterImage):
+    """Образ coil регистров: по байту на бит, чтобы ответ также ложился одним присваиванием среза"""
+
+    __slots__ = ()
+
+    typecode = "B"
+
+    def _value(self, raw):
+        return bool(raw)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+
+from .protocol import (
+    FAST_MODBUS,
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_COILS,
+    WRITE_MULTIPLE_REGISTERS,
+    WRITE_SINGLE_REGISTER,
+)
+
+# Верхние границы корзин гистограммы задержек, с: от 0.5 мс до 33 с с шагом корень из 2.
+# Последняя корзина гистограммы - все, что больше последней границы
+LATENCY_BUCKETS = tuple(0.0005 * 2 ** (i / 2) for i in range(33))
+# Функции Modbus, которыми подключение обращается к устройствам
+FUNCTION_CODES = (READ_COILS, READ_HOLDING_REGISTERS, WRITE_SINGLE_REGISTER, WRITE_MULTIPLE_COILS,
+                  WRITE_MULTIPLE_REGISTERS, FAST_MODBUS)
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с заранее выделенными корзинами. Добавление значения не выделяет память"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: LatencyHistogram):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def average(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Оценка перцентиля сверху: граница корзины, в которую он попадает"""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "average": self.average,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class TransactionStats:
+    """Статистика запросов одной функции Modbus к одному устройству"""
+
+    __slots__ = ("requests", "request_bytes", "response_bytes", "timeouts", "exceptions", "errors", "latency")
+
+    def __init__(self):
+        self.requests = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        # Нет ответа
+        self.timeouts = 0
+        # Ответ устройства с кодом исключения
+        self.exceptions = 0
+        # Прочие ошибки: нет подключения, ошибка разбора ответа
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def merge(self, other: TransactionStats):
+        self.requests += other.requests
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.timeouts += other.timeouts
+        self.exceptions += other.exceptions
+        self.errors += other.errors
+        self.latency.merge(other.latency)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "timeouts": self.timeouts,
+            "exceptions": self.exceptions,
+            "errors": self.errors,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class HubMetrics:
+    """Метрики запросов через подключение к шлюзу по устройствам и функциям Modbus.
+
+    Статистика функций устройства выделяется при регистрации устройства: учет запроса
+    не создает ключей и объектов.
+    """
+
+    def __init__(self):
+        # Адрес устройства -> код функции -> TransactionStats
+        self.__devices: dict[int, dict[int, TransactionStats]] = {}
+        self.reconnects = 0
+
+    def register_device(self, device_id: int) -> dict[int, TransactionStats]:
+        """Выделяет статистику функций, которыми интеграция обращается к устройству"""
+        functions = self.__devices.get(device_id)
+        if functions is None:
+            functions = self.__devices[device_id] = {function_code: TransactionStats()
+                                                     for function_code in FUNCTION_CODES}
+        return functions
+
+    def transaction(self, device_id: int, function_code: int) -> TransactionStats:
+        functions = self.__devices.get(device_id)
+        if functions is None:
+            # Запрос до создания устройства (определение модели, поиск устройств)
+            functions = self.register_device(device_id)
+        stats = functions.get(function_code)
+        if stats is None:
+            stats = functions[function_code] = TransactionStats()
+        return stats
+
+    def add(self, device_id: int, function_code: int, latency: float, request_bytes: int,
+            response_bytes: int, exception: bool = False):
+        stats = self.transaction(device_id, function_code)
+        stats.requests += 1
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+        stats.latency.add(latency)
+        if exception:
+            stats.exceptions += 1
+
+    def add_timeout(self, device_id: int, function_code: int, request_bytes: int):
+        stats = self.transaction(device_id, function_code)
+        stats.requests += 1
+        stats.request_bytes += request_bytes
+        stats.timeouts += 1
+
+    def add_error(self, device_id: int, function_code: int, request_bytes: int):
+        stats = self.transaction(device_id, function_code)
+        stats.requests += 1
+        stats.request_bytes += request_bytes
+        stats.errors += 1
+
+    def device(self, device_id: int) -> dict[int, TransactionStats]:
+        """Статистика устройства по кодам функций, которыми были запросы"""
+        return {function_code: stats for function_code, stats in self.__devices.get(device_id, {}).items()
+                if stats.requests}
+
+    def device_total(self, device_id: int) -> TransactionStats:
+        """Статистика устройства по всем функциям"""
+        total = TransactionStats()
+        for stats in self.device(device_id).values():
+            total.merge(stats)
+        return total
+
+    def as_dict(self, device_id: int | None = None) -> dict:
+        return {
+            "reconnects": self.reconnects,
+            "transactions": {
+                f"{dev_id}/{function_code:#04x}": stats.as_dict()
+                for dev_id in sorted(self.__devices) if device_id is None or dev_id == device_id
+                for function_code, stats in sorted(self.device(dev_id).items())
+            },
+        }
+
+
+class PollStats:
+    """Длительность циклов опроса устройства и опоздание их начала относительно расписания"""
+
+    __slots__ = ("cycles", "last_duration", "last_lag", "duration", "lag")
+
+    def __init__(self):
+        self.cycles = 0
+        self.last_duration: float | None = None
+        self.last_lag: float | None = None
+        self.duration = LatencyHistogram()
+        self.lag = LatencyHistogram()
+
+    def add(self, duration: float, lag: float | None):
+        self.cycles += 1
+        self.last_duration = duration
+        self.duration.add(duration)
+        if lag is not None:
+            self.last_lag = lag
+            self.lag.add(lag)
+
+    def as_dict(self) -> dict:
+        return {
+            "cycles": self.cycles,
+            "last_duration": self.last_duration,
+            "last_lag": self.last_lag,
+            "duration": self.duration.as_dict(),
+            "lag": self.lag.as_dict(),
+        }
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import functools
+import json
+import logging
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import EntityCategory
+
+from .codec import RegisterCodec, compile_codec
+from .const import MAX_READ_COILS, MAX_READ_REGISTERS
+from .device import GroupAddresses, Platform, RegisterType
+from .planner import ReadPlanner
+from .publish import PublishPolicy, compile_policy
+from .request_queue import PRIORITY_POLL
+
+_LOGGER = logging.getLogger(__name__)
+
+# Карты регистров моделей: models/<модель>.json
+MODELS_PATH = Path(__file__).parent / "models"
+
+# Скомпилированные модели. Общие для всех устройств одной модели
+_MODELS: dict[str, DeviceModel] = {}
+
+
+class GroupSpec(NamedTuple):
+    """Неизменяемое описание группы регистров и создаваемых по ней сущностей"""
+
+    index: int
+    name: str
+    name_id: str
+    platform: Platform
+    register_type: RegisterType
+    # Диапазоны регистров в порядке индексов сущностей: регистр входа 0 идет первым
+    group_addresses: tuple[GroupAddresses, ...]
+    addresses: tuple[int, ...]
+    # Регистры, которых может не быть в некоторых прошивках (например, регистр входа 0)
+    optional_addresses: tuple[int, ...]
+    start_id: int
+    update_interval: float
+    entity_category: EntityCategory | None
+    data_type: str
+    scale: float
+    unit: str | None
+    options: MappingProxyType | None
+    options0: MappingProxyType | None
+    min_val: float | None
+    max_val: float | None
+    mode: str | None
+    step: float | None
+    # Разбор регистров группы в значения сущностей
+    codec: RegisterCodec
+    # Когда сущности группы публикуют новое состояние. None - при каждом изменении значения
+    publish: PublishPolicy | None = None
+    # Окно расчета скорости счетчиков группы (событий в минуту), с. 0 - скорость не считается
+    rate_window: float = 0
+    # Тип события кнопки (short_press, long_press...), которое создает приращение счетчиков группы,
+    # и название сущностей событий. None - группа событий не создает
+    event: str | None = None
+    event_name: str | None = None
+    # Первый регистр группы в образе регистров устройства этого типа
+    offset: int = 0
+
+    @property
+    def register_count(self) -> int:
+        """Количество регистров группы: по codec.width на значение"""
+        return sum(group_addr.count for group_addr in self.group_addresses)
+
+
+class DeviceModel:
+    """Скомпилированная карта регистров модели с готовыми планами чтения"""
+
+    def __init__(self, name: str, title: str, groups: tuple[GroupSpec, ...]):
+        self.__name = name
+        self.__title = title
+        self.__groups = _layout(groups)
+        self.__image_sizes = {}
+        for spec in self.__groups:
+            self.__image_sizes[spec.register_type] = spec.offset + spec.register_count
+        self.__planners: dict[int, ReadPlanner] = {}
+        self.__variants: dict[frozenset, DeviceModel] = {}
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def title(self) -> str:
+        return self.__title
+
+    @property
+    def groups(self) -> tuple[GroupSpec, ...]:
+        return self.__groups
+
+    @property
+    def image_sizes(self) -> dict[RegisterType, int]:
+        """Количество регистров каждого типа в образе регистров устройства"""
+        return self.__image_sizes
+
+    def variant(self, unsupported: frozenset[int]) -> DeviceModel:
+        """Карта без необязательных регистров, на которые устройство не отвечает.
+        Общая для всех устройств модели с тем же набором регистров"""
+        unsupported = frozenset(unsupported) & frozenset(
+            address for spec in self.__groups for address in spec.optional_addresses
+        )
+        if not unsupported:
+            return self
+        variant = self.__variants.get(unsupported)
+        if variant is None:
+            variant = DeviceModel(self.__name, self.__title,
+                                  tuple(_without(spec, unsupported) for spec in self.__groups))
+            self.__variants[unsupported] = variant
+        return variant
+
+    def planner(self, max_gap: int) -> ReadPlanner:
+        """Планировщик чтения, общий для всех устройств модели с одинаковым max_gap"""
+        planner = self.__planners.get(max_gap)
+        if planner is None:
+            planner = ReadPlanner(
+                {RegisterType.coil: MAX_READ_COILS, RegisterType.holding: MAX_READ_REGISTERS},
+                max_gap,
+            )
+            # Заранее строим планы для первого чтения всех групп и для групп с одинаковым интервалом опроса
+            planner.plan(list(self.__groups))
+            for interval in sorted({spec.update_interval for spec in self.__groups}):
+                planner.plan([spec for spec in self.__groups if spec.update_interval == interval])
+            self.__planners[max_gap] = planner
+        return planner
+
+
+def _layout(groups: tuple[GroupSpec, ...]) -> tuple[GroupSpec, ...]:
+    # Группы одного типа регистров лежат в образе подряд в порядке карты
+    sizes = {}
+    specs = []
+    for spec in groups:
+        offset = sizes.get(spec.register_type, 0)
+        specs.append(spec._replace(offset=offset))
+        sizes[spec.register_type] = offset + spec.register_count
+    return tuple(specs)
+
+
+def _options(tables: dict, name: str | None) -> MappingProxyType | None:
+    if name is None:
+        return None
+    return MappingProxyType({int(key): value for key, value in tables[name].items()})
+
+
+def _without(spec: GroupSpec, unsupported: frozenset[int]) -> GroupSpec:
+    return spec._replace(
+        group_addresses=tuple(group_addr for group_addr in spec.group_addresses
+                              if not (group_addr.count == spec.codec.width and group_addr.start_address in unsupported)),
+        addresses=tuple(address for address in spec.addresses
+                        if address not in unsupported or address not in spec.optional_addresses),
+        optional_addresses=tuple(address for address in spec.optional_addresses if address not in unsupported),
+    )
+
+
+def _compile_group(index: int, data: dict, tables: dict) -> GroupSpec:
+    address = data["address"]
+    # count - количество значений (сущностей); значение занимает codec.width регистров
+    count = data["count"]
+    register_type = RegisterType[data["register_type"]]
+    codec = compile_codec(data, count + ("address0" in data), register_type == RegisterType.coil)
+    width = codec.width
+    group_addresses = [GroupAddresses(address, count * width)]
+    addresses = list(range(address, address + count * width, width))
+    if "address0" in data:
+        group_addresses.insert(0, GroupAddresses(data["address0"], width))
+        addresses.insert(0, data["address0"])
+    category = data.get("category")
+    return GroupSpec(
+        index=index,
+        name=data["name"],
+        name_id=data.get("name_id", ""),
+        platform=Platform[data["platform"]],
+        register_type=register_type,
+        group_addresses=tuple(group_addresses),
+        addresses=tuple(addresses),
+        optional_addresses=(data["address0"],) if "address0" in data else (),
+        start_id=data.get("start_id", 0),
+        update_interval=data.get("interval", 0),
+        entity_category=EntityCategory(category) if category else None,
+        data_type=data.get("data_type", "u16"),
+        scale=data.get("scale", 1),
+        unit=data.get("unit"),
+        options=_options(tables, data.get("options")),
+        options0=_options(tables, data.get("options0", data.get("options"))),
+        min_val=data.get("min"),
+        max_val=data.get("max"),
+        mode=data.get("mode"),
+        step=data.get("step"),
+        codec=codec,
+        publish=compile_policy(data.get("publish")),
+        rate_window=data.get("rate_window", 0),
+        event=data.get("event"),
+        event_name=data.get("event_name"),
+    )
+
+
+def compile_model(data: dict) -> DeviceModel:
+    tables = data.get("options", {})
+    groups = tuple(_compile_group(index, group, tables) for index, group in enumerate(data["groups"]))
+    return DeviceModel(data["model"], data.get("title", data["model"]), groups)
+
+
+@functools.cache
+def available_models() -> tuple[str, ...]:
+    # Набор файлов моделей не меняется во время работы: каталог читается один раз
+    return tuple(sorted(path.stem for path in MODELS_PATH.glob("*.json")))
+
+
+def find_model(model: str | None) -> str | None:
+    """Подбирает карту регистров по строке модели из регистра 200.
+    Точное совпадение имени файла, иначе самое длинное имя, с которого начинается модель (wbmr6cv2 -> wbmr6c)"""
+    if not model:
+        return None
+    model = "".join(char for char in model.lower() if char.isalnum())
+    names = available_models()
+    if model in names:
+        return model
+    candidates = [name for name in names if model.startswith(name)]
+    return max(candidates, key=len) if candidates else None
+
+
+async def async_probe_features(hub, device_id: int, model: DeviceModel,
+                               priority: int = PRIORITY_POLL) -> dict[int, bool]:
+    """Проверяет, отвечает ли устройство на необязательные регистры карты модели"""
+    features = {}
+    for spec in model.groups:
+        for address in spec.optional_addresses:
+            if spec.register_type == RegisterType.coil:
+                result = await hub.async_read_coils(address, 1, device_id, priority)
+            else:
+                result = await hub.async_read_holding_register(address, 1, device_id, priority)
+            features[address] = result is not None
+    _LOGGER.debug(f"Необязательные регистры устройства {device_id}: {features}")
+    return features
+
+
+def get_model(name: str) -> DeviceModel:
+    """Загружает и компилирует карту регистров модели при первом обращении. Читает файл - не вызывать в цикле событий"""
+    name = name.lower()
+    model = _MODELS.get(name)
+    if model is None:
+        path = MODELS_PATH / f"{name}.json"
+        if not path.is_file():
+            raise ValueError(f"Неизвестная модель устройства: {name}")
+        with path.open(encoding="utf-8") as file:
+            model = compile_model(json.load(file))
+        _MODELS[name] = model
+        _LOGGER.debug(f"Загружена карта регистров модели {name}: {len(model.groups)} групп")
+    return model
+
+
+async def async_get_model(hass: HomeAssistant, name: str) -> DeviceModel:
+    """Возвращает скомпилированную модель, загружая файл вне цикла событий"""
+    model = _MODELS.get(name.lower())
+    if model is None:
+        model = await hass.async_add_executor_job(get_model, name)
+    return model
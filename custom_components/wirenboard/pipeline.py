@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from .protocol import (
+    MBAP_HEADER,
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    decode_response,
+    encode_mbap,
+    encode_read,
+    encode_write_coils,
+    encode_write_register,
+    encode_write_registers,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ModbusPipelineClient:
+    """Клиент Modbus TCP, держащий в полете до depth запросов одновременно.
+
+    Ответы сопоставляются с запросами по transaction id. Если шлюз не справляется с очередью
+    запросов (теряет ответы, путает transaction id или рвет соединение), клиент переходит
+    на строго последовательный обмен. Интерфейс повторяет используемую часть AsyncModbusTcpClient.
+    """
+
+    def __init__(self, host: str, port: int, depth: int = 4, timeout: float = 3, retries: int = 1,
+                 adaptive: bool = True):
+        self._host = host
+        self._port = port
+        self.__depth = max(depth, 1)
+        # Переходить на последовательный обмен при потере ответов. Отключается при сканировании,
+        # где запросы к отсутствующим адресам остаются без ответа
+        self.__adaptive = adaptive
+        self.__timeout = timeout
+        self.__retries = retries
+        self.__reader: asyncio.StreamReader | None = None
+        self.__writer: asyncio.StreamWriter | None = None
+        self.__receive_task: asyncio.Task | None = None
+        self.__next_tid = 0
+        # transaction id -> (future, количество запрошенных битов)
+        self.__pending: dict[int, tuple[asyncio.Future, int | None]] = {}
+        # transaction id запросов, ответ на которые уже не ждем (истек таймаут)
+        self.__abandoned: set[int] = set()
+        self.__in_flight = 0
+        self.__window = asyncio.Condition()
+
+    @property
+    def connected(self) -> bool:
+        return self.__writer is not None and not self.__writer.is_closing()
+
+    @property
+    def depth(self) -> int:
+        """Текущее допустимое количество запросов в полете"""
+        return self.__depth
+
+    @property
+    def in_flight(self) -> int:
+        return self.__in_flight
+
+    async def connect(self) -> bool:
+        if self.connected:
+            return True
+        self.__reader, self.__writer = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port), self.__timeout
+        )
+        self.__receive_task = asyncio.get_running_loop().create_task(self.__receive_loop())
+        return True
+
+    def close(self):
+        if self.__receive_task is not None:
+            self.__receive_task.cancel()
+            self.__receive_task = None
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__writer = None
+        self.__fail_pending(ConnectionException("Connection closed"))
+
+    def serialize(self, reason: str):
+        """Переводит клиент на последовательный обмен"""
+        if self.__depth > 1:
+            _LOGGER.warning(f"Шлюз {self._host}:{self._port} не поддерживает конвейерные запросы ({reason}). "
+                            f"Переходим на последовательный обмен")
+            self.__depth = 1
+
+    async def read_coils(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__execute(device_id, encode_read(READ_COILS, address, count), count)
+
+    async def read_holding_registers(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__execute(device_id, encode_read(READ_HOLDING_REGISTERS, address, count))
+
+    async def write_register(self, address: int, value: int, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_register(address, value))
+
+    async def write_registers(self, address: int, values: list, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_registers(address, values))
+
+    async def write_coils(self, address: int, values: list, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_coils(address, values))
+
+    async def __execute(self, device_id: int, pdu: bytes, count: int | None = None):
+        if not self.connected:
+            raise ConnectionException(f"Not connected to {self._host}:{self._port}")
+
+        async with self.__window:
+            await self.__window.wait_for(lambda: self.__in_flight < self.__depth)
+            self.__in_flight += 1
+        try:
+            for attempt in range(self.__retries + 1):
+                tid = self.__next_tid = (self.__next_tid + 1) & 0xFFFF
+                future = asyncio.get_running_loop().create_future()
+                self.__pending[tid] = (future, count)
+                try:
+                    self.__writer.write(encode_mbap(tid, device_id, pdu))
+                    await self.__writer.drain()
+                    return await asyncio.wait_for(future, self.__timeout)
+                except asyncio.TimeoutError:
+                    if len(self.__abandoned) > 256:
+                        self.__abandoned.clear()
+                    self.__abandoned.add(tid)
+                    # Потерянный ответ при нескольких запросах в полете - признак шлюза без очереди
+                    if self.__in_flight > 1 and self.__adaptive:
+                        self.serialize("нет ответа на один из параллельных запросов")
+                finally:
+                    self.__pending.pop(tid, None)
+            raise ModbusIOException(f"No response received after {self.__retries} retries")
+        finally:
+            async with self.__window:
+                self.__in_flight -= 1
+                self.__window.notify_all()
+
+    async def __receive_loop(self):
+        try:
+            while True:
+                header = await self.__reader.readexactly(MBAP_HEADER.size)
+                tid, _, length, dev_id = MBAP_HEADER.unpack(header)
+                pdu = await self.__reader.readexactly(length - 1)
+                if tid in self.__abandoned:
+                    # Опоздавший ответ на запрос с истекшим таймаутом
+                    self.__abandoned.discard(tid)
+                    continue
+                entry = self.__pending.get(tid)
+                if entry is None and len(self.__pending) == 1:
+                    # Некоторые шлюзы не повторяют transaction id. Единственный ожидающий запрос однозначен
+                    self.serialize(f"получен неизвестный transaction id {tid}")
+                    entry = next(iter(self.__pending.values()))
+                if entry is None:
+                    self.serialize(f"получен неизвестный transaction id {tid}")
+                    continue
+                future, count = entry
+                if not future.done():
+                    future.set_result(decode_response(pdu, dev_id, tid, count))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _LOGGER.debug(f"Соединение с {self._host}:{self._port} прервано: {e}")
+            if len(self.__pending) > 1:
+                self.serialize("соединение разорвано при нескольких запросах в полете")
+            if self.__writer is not None:
+                self.__writer.close()
+                self.__writer = None
+            self.__fail_pending(ConnectionException(f"Connection lost: {e}"))
+
+    def __fail_pending(self, exc: Exception):
+        for future, _ in self.__pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self.__pending.clear()
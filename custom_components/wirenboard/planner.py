@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+
+from .const import READ_PLAN_CACHE_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ReadBlock:
+    """Непрерывный диапазон регистров одного типа, читаемый одним запросом"""
+
+    def __init__(self, register_type, start_address: int, count: int):
+        self.register_type = register_type
+        self.start_address = start_address
+        self.count = count
+        # Пары (объект, GroupAddresses), данные которых попадают в диапазон
+        self.segments = []
+
+    @property
+    def end_address(self) -> int:
+        return self.start_address + self.count
+
+    @property
+    def has_gaps(self) -> bool:
+        """Читаются ли регистры, не принадлежащие ни одной группе"""
+        covered = set()
+        for _, group_addr in self.segments:
+            covered.update(range(group_addr.start_address, group_addr.start_address + group_addr.count))
+        return len(covered) < self.count
+
+    def add(self, obj, group_addr):
+        end_address = max(self.end_address, group_addr.start_address + group_addr.count)
+        self.count = end_address - self.start_address
+        self.segments.append((obj, group_addr))
+
+    def split(self, values: list):
+        """Разбирает ответ на части для update_statuses"""
+        for obj, group_addr in self.segments:
+            offset = group_addr.start_address - self.start_address
+            yield obj, group_addr, values[offset:offset + group_addr.count]
+
+
+class ReadPlanner:
+    """Объединяет группы регистров, которые нужно прочитать в одном цикле, в минимум запросов.
+
+    limits - максимальное количество регистров в одном запросе для каждого типа регистров.
+    max_gap - сколько лишних регистров допустимо прочитать между группами, чтобы объединить их.
+    """
+
+    def __init__(self, limits: dict, max_gap: int = 0):
+        self.__limits = limits
+        self.__max_gap = max_gap
+        # Планы по наборам групп, последние использованные - в конце
+        self.__plans = OrderedDict()
+
+    @property
+    def max_gap(self) -> int:
+        return self.__max_gap
+
+    @max_gap.setter
+    def max_gap(self, value: int):
+        self.__max_gap = value
+        self.invalidate()
+
+    def invalidate(self):
+        self.__plans.clear()
+
+    def plan(self, objects: list) -> list[ReadBlock]:
+        # План зависит только от набора групп, но не от их порядка, поэтому строится один раз на каждый набор.
+        # Наборы зависят от расписания опроса; давно не встречавшиеся вытесняются
+        key = frozenset(spec.index for spec in objects)
+        plan = self.__plans.get(key)
+        if plan is not None:
+            self.__plans.move_to_end(key)
+            return plan
+        plan = self.__build(objects)
+        self.__plans[key] = plan
+        if len(self.__plans) > READ_PLAN_CACHE_SIZE:
+            self.__plans.popitem(last=False)
+        _LOGGER.debug(f"Построен план чтения: "
+                      f"{[(b.register_type, b.start_address, b.count) for b in plan]}")
+        return plan
+
+    def __build(self, objects: list) -> list[ReadBlock]:
+        plan = []
+        for register_type, limit in self.__limits.items():
+            ranges = sorted(
+                ((part.start_address, obj, part)
+                 for obj in objects if obj.register_type == register_type
+                 for group_addr in obj.group_addresses
+                 for part in _split(group_addr, limit)),
+                key=lambda item: item[0],
+            )
+            block = None
+            for start_address, obj, group_addr in ranges:
+                end_address = start_address + group_addr.count
+                if (block is not None
+                        and start_address - block.end_address <= self.__max_gap
+                        and max(end_address, block.end_address) - block.start_address <= limit):
+                    block.add(obj, group_addr)
+                    continue
+                block = ReadBlock(register_type, start_address, 0)
+                block.add(obj, group_addr)
+                plan.append(block)
+        return plan
+
+
+def _split(group_addr, limit: int):
+    """Диапазон группы длиннее ограничения запроса делится на части того же типа"""
+    if group_addr.count <= limit:
+        yield group_addr
+        return
+    for address in range(group_addr.start_address, group_addr.start_address + group_addr.count, limit):
+        yield type(group_addr)(address, min(limit, group_addr.start_address + group_addr.count - address))
+
+
+class WriteRun:
+    """Запись подряд идущих регистров одного типа одним запросом"""
+
+    def __init__(self, register_type, start_address: int):
+        self.register_type = register_type
+        self.start_address = start_address
+        self.values = []
+        # Ожидающие результата записи
+        self.futures = []
+
+    @property
+    def end_address(self) -> int:
+        return self.start_address + len(self.values)
+
+
+def merge_ranges(ranges, max_gap: int, limit: int) -> list[tuple[int, int]]:
+    """Объединяет диапазоны (адрес, количество) в минимум диапазонов чтения.
+
+    Пересекающиеся и соседние диапазоны, а также разделенные промежутком не больше max_gap,
+    читаются одним запросом не длиннее limit регистров.
+    """
+    merged = []
+    for address, count in sorted(ranges):
+        end = address + count
+        if merged:
+            start, last_end = merged[-1]
+            if address - last_end <= max_gap and max(end, last_end) - start <= limit:
+                merged[-1] = (start, max(end, last_end))
+                continue
+        # Диапазон длиннее ограничения запроса делится на части
+        while end - address > limit:
+            merged.append((address, address + limit))
+            address += limit
+        merged.append((address, end))
+    return [(start, end - start) for start, end in merged]
+
+
+def coalesce_writes(writes: list, limits: dict) -> list[WriteRun]:
+    """Объединяет записи (тип регистра, адрес, значение, future) в записи соседних регистров.
+
+    При повторной записи в тот же регистр остается последнее значение.
+    limits - максимальное количество регистров в одном запросе записи для каждого типа.
+    """
+    latest = {}
+    futures = {}
+    for register_type, address, value, future in writes:
+        latest[(register_type, address)] = value
+        futures.setdefault((register_type, address), []).append(future)
+
+    runs = []
+    run = None
+    for register_type, address in sorted(latest, key=lambda key: (key[0].value, key[1])):
+        if (run is None or run.register_type != register_type or run.end_address != address
+                or len(run.values) >= limits[register_type]):
+            run = WriteRun(register_type, address)
+            runs.append(run)
+        run.values.append(latest[(register_type, address)])
+        run.futures.extend(futures[(register_type, address)])
+    return runs
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import struct
+
+# Коды функций Modbus
+READ_COILS = 0x01
+READ_DISCRETE_INPUTS = 0x02
+READ_HOLDING_REGISTERS = 0x03
+READ_INPUT_REGISTERS = 0x04
+WRITE_SINGLE_COIL = 0x05
+WRITE_SINGLE_REGISTER = 0x06
+WRITE_MULTIPLE_COILS = 0x0F
+WRITE_MULTIPLE_REGISTERS = 0x10
+
+# Заголовок MBAP: transaction id, protocol id, длина, адрес устройства
+MBAP_HEADER = struct.Struct(">HHHB")
+
+_READ_REQUEST = struct.Struct(">BHH")
+_WRITE_SINGLE = struct.Struct(">BHH")
+_WRITE_MULTIPLE = struct.Struct(">BHHB")
+
+
+class ModbusResponse:
+    """Ответ устройства. Повторяет используемую часть интерфейса ответов pymodbus"""
+
+    def __init__(self, function_code: int, dev_id: int = 0, transaction_id: int = 0,
+                 registers: list | None = None, bits: list | None = None, exception_code: int = 0):
+        self.function_code = function_code
+        self.dev_id = dev_id
+        self.transaction_id = transaction_id
+        self.registers = registers or []
+        self.bits = bits or []
+        self.exception_code = exception_code
+
+    def isError(self) -> bool:
+        return self.function_code > 0x80
+
+    def __repr__(self):
+        if self.isError():
+            return f"ModbusResponse(fc={self.function_code:#x}, exception={self.exception_code})"
+        return f"ModbusResponse(fc={self.function_code}, registers={self.registers}, bits={self.bits})"
+
+
+class ModbusDeviceError(Exception):
+    """Устройство ответило исключением Modbus: запрос получен, но не выполнен
+    (например, недопустимый адрес). В отличие от отсутствия ответа, устройство на связи"""
+
+    def __init__(self, function_code: int, exception_code: int):
+        super().__init__(f"функция {function_code:#04x}, исключение {exception_code}")
+        self.function_code = function_code
+        self.exception_code = exception_code
+
+
+def pack_bits(values: list) -> bytes:
+    data = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value:
+            data[i // 8] |= 1 << (i % 8)
+    return bytes(data)
+
+
+def unpack_bits(data: bytes, count: int | None = None) -> list[bool]:
+    bits = [bool(byte >> i & 1) for byte in data for i in range(8)]
+    if count is not None:
+        del bits[count:]
+    return bits
+
+
+def encode_read(function_code: int, address: int, count: int) -> bytes:
+    return _READ_REQUEST.pack(function_code, address, count)
+
+
+def encode_write_register(address: int, value: int) -> bytes:
+    return _WRITE_SINGLE.pack(WRITE_SINGLE_REGISTER, address, value & 0xFFFF)
+
+
+def encode_write_coil(address: int, value: bool) -> bytes:
+    return _WRITE_SINGLE.pack(WRITE_SINGLE_COIL, address, 0xFF00 if value else 0x0000)
+
+
+def encode_write_registers(address: int, values: list) -> bytes:
+    data = struct.pack(f">{len(values)}H", *(value & 0xFFFF for value in values))
+    return _WRITE_MULTIPLE.pack(WRITE_MULTIPLE_REGISTERS, address, len(values), len(data)) + data
+
+
+def encode_write_coils(address: int, values: list) -> bytes:
+    data = pack_bits(values)
+    return _WRITE_MULTIPLE.pack(WRITE_MULTIPLE_COILS, address, len(values), len(data)) + data
+
+
+def decode_response(pdu: bytes, dev_id: int = 0, transaction_id: int = 0, count: int | None = None) -> ModbusResponse:
+    """Разбирает PDU ответа. count - запрошенное количество битов для обрезки дополнения"""
+    function_code = pdu[0]
+    response = ModbusResponse(function_code, dev_id, transaction_id)
+    if function_code > 0x80:
+        response.exception_code = pdu[1] if len(pdu) > 1 else 0
+    elif function_code in (READ_COILS, READ_DISCRETE_INPUTS):
+        response.bits = unpack_bits(pdu[2:2 + pdu[1]], count)
+    elif function_code in (READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+        size = pdu[1]
+        response.registers = list(struct.unpack(f">{size // 2}H", pdu[2:2 + size]))
+    return response
+
+
+def encode_mbap(transaction_id: int, dev_id: int, pdu: bytes) -> bytes:
+    return MBAP_HEADER.pack(transaction_id, 0, len(pdu) + 1, dev_id) + pdu
+
+
+def _crc16_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16(data: bytes) -> int:
+    """CRC16 Modbus RTU"""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC16_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def encode_rtu(dev_id: int, pdu: bytes) -> bytes:
+    frame = bytes((dev_id,)) + pdu
+    return frame + struct.pack("<H", crc16(frame))
+
+
+def check_rtu(frame: bytes) -> bool:
+    return len(frame) > 3 and crc16(frame[:-2]) == struct.unpack("<H", frame[-2:])[0]
+
+
+# Быстрый Modbus (расширение Wiren Board, функция 0x46)
+FAST_MODBUS = 0x46
+FAST_MODBUS_BROADCAST = 0xFD
+FAST_SCAN_START = 0x01
+FAST_SCAN_CONTINUE = 0x02
+FAST_SCAN_DEVICE = 0x03
+FAST_SCAN_END = 0x04
+FAST_EVENTS_REQUEST = 0x10
+FAST_EVENTS_RESPONSE = 0x11
+FAST_EVENTS_NONE = 0x12
+FAST_EVENTS_SETUP = 0x18
+
+# Типы событий совпадают с типами регистров
+EVENT_COIL = 1
+EVENT_DISCRETE = 2
+EVENT_HOLDING = 3
+EVENT_INPUT = 4
+EVENT_SYSTEM = 0x0F
+
+_EVENT_HEADER = struct.Struct(">BBH")
+# Ответ устройства на сканирование: серийный номер и адрес
+_SCAN_DEVICE = struct.Struct(">IB")
+
+
+class FastModbusEvent:
+    def __init__(self, event_type: int, address: int, value: int):
+        self.event_type = event_type
+        self.address = address
+        self.value = value
+
+    def __repr__(self):
+        return f"FastModbusEvent(type={self.event_type}, address={self.address}, value={self.value})"
+
+
+class FastModbusEvents:
+    """Пакет событий одного устройства. flag нужно вернуть в следующем запросе для подтверждения"""
+
+    def __init__(self, dev_id: int, flag: int, events: list[FastModbusEvent]):
+        self.dev_id = dev_id
+        self.flag = flag
+        self.events = events
+
+
+def encode_events_request(min_dev_id: int, max_length: int, confirm_dev_id: int, confirm_flag: int) -> bytes:
+    return bytes((FAST_MODBUS, FAST_EVENTS_REQUEST, min_dev_id, max_length, confirm_dev_id, confirm_flag))
+
+
+def encode_events(flag: int, events: list[FastModbusEvent]) -> bytes:
+    """PDU ответа с событиями. Данные событий передаются в little-endian"""
+    data = bytearray()
+    for event in events:
+        size = 1 if event.event_type in (EVENT_COIL, EVENT_DISCRETE) else 2
+        data += _EVENT_HEADER.pack(size, event.event_type, event.address)
+        data += event.value.to_bytes(size, "little")
+    return bytes((FAST_MODBUS, FAST_EVENTS_RESPONSE, flag, len(events), len(data))) + bytes(data)
+
+
+def decode_events(dev_id: int, pdu: bytes) -> FastModbusEvents | None:
+    """Разбирает ответ на запрос событий. None - событий нет"""
+    if pdu[1] != FAST_EVENTS_RESPONSE:
+        return None
+    flag, count, size = pdu[2], pdu[3], pdu[4]
+    data = pdu[5:5 + size]
+    events = []
+    offset = 0
+    for _ in range(count):
+        length, event_type, address = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        events.append(FastModbusEvent(event_type, address, int.from_bytes(data[offset:offset + length], "little")))
+        offset += length
+    return FastModbusEvents(dev_id, flag, events)
+
+
+def encode_scan_request(start: bool) -> bytes:
+    """PDU широковещательного сканирования. Начало сканирования сбрасывает отметки ответивших устройств"""
+    return bytes((FAST_MODBUS, FAST_SCAN_START if start else FAST_SCAN_CONTINUE))
+
+
+def encode_scan_device(serial_number: int, dev_id: int) -> bytes:
+    return bytes((FAST_MODBUS, FAST_SCAN_DEVICE)) + _SCAN_DEVICE.pack(serial_number, dev_id)
+
+
+def encode_scan_end() -> bytes:
+    return bytes((FAST_MODBUS, FAST_SCAN_END))
+
+
+def decode_scan(pdu: bytes) -> tuple[int, int] | None:
+    """Разбирает ответ на сканирование: (серийный номер, адрес) или None в конце сканирования"""
+    if pdu[1] != FAST_SCAN_DEVICE:
+        return None
+    return _SCAN_DEVICE.unpack_from(pdu, 2)
+
+
+def encode_events_setup(ranges: list[tuple[int, int, int]], priority: int = 1) -> bytes:
+    """PDU включения событий. ranges - (тип события, начальный адрес, количество)"""
+    data = bytearray()
+    for event_type, address, count in ranges:
+        data += struct.pack(">BHB", event_type, address, count) + bytes((priority,)) * count
+    return bytes((FAST_MODBUS, FAST_EVENTS_SETUP, len(data))) + bytes(data)
+
+
+def decode_events_setup_request(pdu: bytes) -> list[tuple[int, int, int, bytes]]:
+    """Разбирает запрос включения событий: (тип события, начальный адрес, количество, приоритеты)"""
+    data = pdu[3:3 + pdu[2]]
+    ranges = []
+    offset = 0
+    while offset < len(data):
+        event_type, address, count = struct.unpack_from(">BHB", data, offset)
+        offset += 4
+        ranges.append((event_type, address, count, data[offset:offset + count]))
+        offset += count
+    return ranges
+
+
+def encode_events_setup_response(enabled: list) -> bytes:
+    data = pack_bits(enabled)
+    return bytes((FAST_MODBUS, FAST_EVENTS_SETUP, len(data))) + data
+
+
+def decode_events_setup(pdu: bytes, count: int) -> list[bool]:
+    """Возвращает, для каких из count запрошенных регистров события включены"""
+    return unpack_bits(pdu[3:3 + pdu[2]], count)
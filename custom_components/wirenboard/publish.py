@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import NamedTuple
+
+
+class PublishPolicy(NamedTuple):
+    """Когда сущность группы публикует новое состояние.
+
+    Изменение значения публикуется, если оно выходит за все заданные зоны нечувствительности:
+    deadband - абсолютную, deadband_relative - долю от опубликованного значения, и с прошлой
+    публикации прошло не меньше min_interval секунд. Неопубликованное изменение не теряется:
+    оно проверяется снова при каждом следующем чтении группы. heartbeat - наибольший интервал
+    между публикациями, с: по его истечении состояние публикуется и без изменений. 0 - не задано.
+    """
+
+    deadband: float = 0
+    deadband_relative: float = 0
+    min_interval: float = 0
+    heartbeat: float = 0
+
+    def should_publish(self, published, value, elapsed: float, changed: bool) -> bool:
+        """published - опубликованное значение, elapsed - время с его публикации, changed - изменился ли регистр"""
+        if self.heartbeat and elapsed >= self.heartbeat:
+            return True
+        if not changed or value == published:
+            return False
+        if elapsed < self.min_interval:
+            return False
+        if published is None or value is None or isinstance(value, (bool, str)) \
+                or not isinstance(published, (int, float)):
+            # Появление и пропажа значения, а также нечисловые состояния публикуются без зон
+            return True
+        delta = abs(value - published)
+        if delta <= self.deadband:
+            return False
+        if self.deadband_relative and delta <= abs(published) * self.deadband_relative:
+            return False
+        return True
+
+
+def compile_policy(data: dict | None) -> PublishPolicy | None:
+    """Политика публикации из описания группы в карте регистров. None - публиковать каждое изменение"""
+    if not data:
+        return None
+    unknown = set(data) - set(PublishPolicy._fields)
+    if unknown:
+        raise ValueError(f"Неизвестные параметры публикации: {sorted(unknown)}")
+    return PublishPolicy(**data)
+
+
+def counter_delta(previous: int | None, value: int | None, bits: int = 16) -> int:
+    """Приращение счетчика событий устройства, переполняющегося через 2 ** bits.
+
+    Приращение больше половины диапазона - сброс счетчика (перезагрузка устройства):
+    приращением считается новое значение, если оно само меньше половины диапазона.
+    """
+    if previous is None or value is None:
+        return 0
+    half = 1 << (bits - 1)
+    delta = (value - previous) % (half << 1)
+    if delta > half:
+        delta = value if value < half else 0
+    return delta
+
+
+class CounterRate:
+    """Скорость счетчика событий (например, нажатий) в событиях в минуту за окно window секунд.
+
+    Приращения считаются по модулю 2 ** bits (см. counter_delta).
+    """
+
+    __slots__ = ("__window", "__bits", "__last", "__deltas")
+
+    def __init__(self, window: float, bits: int = 16):
+        self.__window = window
+        self.__bits = bits
+        self.__last = None
+        # (время, приращение) ненулевых приращений за окно
+        self.__deltas = deque()
+
+    def update(self, value: int | None, now: float):
+        if value is None:
+            return
+        delta = counter_delta(self.__last, value, self.__bits)
+        if delta:
+            self.__deltas.append((now, delta))
+        self.__last = value
+
+    def rate(self, now: float) -> float | None:
+        """Событий в минуту за последнее окно. None - значение счетчика еще не прочитано"""
+        if self.__last is None:
+            return None
+        deltas = self.__deltas
+        while deltas and deltas[0][0] <= now - self.__window:
+            deltas.popleft()
+        return round(sum(delta for _, delta in deltas) * 60 / self.__window, 1)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Полосы приоритета запросов к шине. Меньше - важнее
+PRIORITY_INTERACTIVE = 0
+PRIORITY_POLL = 1
+PRIORITY_BACKGROUND = 2
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_POLL, PRIORITY_BACKGROUND)
+
+
+class LaneStats:
+    """Статистика ожидания доступа к шине в полосе приоритета"""
+
+    def __init__(self):
+        self.grants = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def add(self, wait: float):
+        self.grants += 1
+        self.total_wait += wait
+        self.last_wait = wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.grants if self.grants else 0.0
+
+
+class RequestQueue:
+    """Очередь доступа к шине с полосами приоритета.
+
+    Замена семафора: одновременно выполняется не больше capacity запросов, а освободившееся
+    место получает самый приоритетный ожидающий запрос. Чтобы нижние полосы не голодали,
+    запрос, прождавший дольше starvation_timeout, обслуживается вне очереди.
+    """
+
+    def __init__(self, capacity: int = 1, starvation_timeout: float = 2):
+        self.__capacity = capacity
+        self.__starvation_timeout = starvation_timeout
+        self.__active = 0
+        self.__lanes = [deque() for _ in PRIORITIES]
+        self.__stats = [LaneStats() for _ in PRIORITIES]
+
+    @property
+    def active(self) -> int:
+        return self.__active
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(lane) for lane in self.__lanes)
+
+    def stats(self, priority: int) -> LaneStats:
+        return self.__stats[priority]
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_POLL):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: int = PRIORITY_POLL):
+        started = time.monotonic()
+        if self.__active < self.__capacity and not self.waiting:
+            self.__active += 1
+            self.__stats[priority].add(0.0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (started, future)
+        self.__lanes[priority].append(entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Место уже выделено, но запрос отменен - отдаем место следующему
+                self.release()
+            elif entry in self.__lanes[priority]:
+                self.__lanes[priority].remove(entry)
+            raise
+        self.__stats[priority].add(time.monotonic() - started)
+
+    def release(self):
+        self.__active -= 1
+        while self.__active < self.__capacity:
+            entry = self.__next()
+            if entry is None:
+                break
+            _, future = entry
+            if future.done():
+                continue
+            self.__active += 1
+            future.set_result(None)
+
+    def __next(self):
+        now = time.monotonic()
+        # Сначала запрос, прождавший дольше всех сверх допустимого, из любой полосы
+        starving = None
+        for lane in self.__lanes:
+            if lane and now - lane[0][0] > self.__starvation_timeout:
+                if starving is None or lane[0][0] < starving[0][0]:
+                    starving = lane
+        if starving is not None:
+            return starving.popleft()
+        for lane in self.__lanes:
+            if lane:
+                return lane.popleft()
+        return None
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from .const import MAX_READ_REGISTERS, SERIAL_TIMEOUT
+from .protocol import (
+    FAST_EVENTS_RESPONSE,
+    FAST_EVENTS_SETUP,
+    FAST_MODBUS,
+    FAST_MODBUS_BROADCAST,
+    FAST_SCAN_DEVICE,
+    READ_COILS,
+    READ_DISCRETE_INPUTS,
+    READ_HOLDING_REGISTERS,
+    READ_INPUT_REGISTERS,
+    FastModbusEvents,
+    check_rtu,
+    decode_events,
+    decode_events_setup,
+    decode_response,
+    decode_scan,
+    encode_events_request,
+    encode_events_setup,
+    encode_read,
+    encode_rtu,
+    encode_scan_request,
+    encode_write_coils,
+    encode_write_register,
+    encode_write_registers,
+)
+from .timing import BusTiming, SerialSettings
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ModbusRtuClient:
+    """Клиент Modbus RTU поверх TCP (шлюз в режиме RTU over TCP).
+
+    Обмен строго последовательный. Помимо стандартных функций поддерживает
+    запросы Быстрого Modbus Wiren Board (0x46), которые не умеет pymodbus.
+    Интерфейс чтения и записи повторяет используемую часть AsyncModbusTcpClient.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 1, retries: int = 1):
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self.__retries = retries
+        self.__reader: asyncio.StreamReader | None = None
+        self.__writer: asyncio.StreamWriter | None = None
+        self.__lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.__writer is not None and not self.__writer.is_closing()
+
+    async def _open_connection(self):
+        return await asyncio.open_connection(self._host, self._port)
+
+    async def connect(self) -> bool:
+        if self.connected:
+            return True
+        self.__reader, self.__writer = await asyncio.wait_for(self._open_connection(), self._timeout)
+        return True
+
+    def close(self):
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__writer = None
+
+    async def read_coils(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__execute(device_id, encode_read(READ_COILS, address, count), count)
+
+    async def read_holding_registers(self, address: int, count: int = 1, device_id: int = 1):
+        return await self.__execute(device_id, encode_read(READ_HOLDING_REGISTERS, address, count))
+
+    async def write_register(self, address: int, value: int, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_register(address, value))
+
+    async def write_registers(self, address: int, values: list, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_registers(address, values))
+
+    async def write_coils(self, address: int, values: list, device_id: int = 1):
+        return await self.__execute(device_id, encode_write_coils(address, values))
+
+    async def request_events(self, min_device_id: int, max_length: int,
+                             confirm_device_id: int = 0, confirm_flag: int = 0) -> FastModbusEvents | None:
+        """Широковещательный запрос событий Быстрого Modbus. None - событий нет ни у одного устройства"""
+        dev_id, pdu = await self.__exchange(
+            FAST_MODBUS_BROADCAST,
+            encode_events_request(min_device_id, max_length, confirm_device_id, confirm_flag),
+        )
+        return decode_events(dev_id, pdu)
+
+    async def setup_events(self, device_id: int, ranges: list[tuple[int, int, int]]) -> list[bool]:
+        """Включает события для диапазонов (тип, адрес, количество). Возвращает маску включенных регистров"""
+        dev_id, pdu = await self.__exchange(device_id, encode_events_setup(ranges))
+        if pdu[0] != FAST_MODBUS:
+            raise ModbusIOException(f"Device {device_id} does not support Fast Modbus events: {pdu[0]:#x}")
+        return decode_events_setup(pdu, sum(count for _, _, count in ranges))
+
+    async def scan(self) -> list[tuple[int, int]]:
+        """Сканирование шины Быстрым Modbus: устройства отвечают по одному, арбитраж - по серийному номеру.
+        Возвращает пары (серийный номер, адрес). Пустой список - ни одно устройство не поддерживает сканирование"""
+        found = []
+        start = True
+        while True:
+            try:
+                _, pdu = await self.__exchange(FAST_MODBUS_BROADCAST, encode_scan_request(start))
+            except ModbusIOException:
+                # Ответа нет: все устройства уже ответили или сканирование не поддерживается
+                break
+            start = False
+            if pdu[0] != FAST_MODBUS:
+                break
+            device = decode_scan(pdu)
+            if device is None:
+                break
+            found.append(device)
+        return found
+
+    async def __execute(self, device_id: int, pdu: bytes, count: int | None = None):
+        dev_id, response = await self.__exchange(device_id, pdu)
+        return decode_response(response, dev_id, 0, count)
+
+    async def __exchange(self, device_id: int, pdu: bytes) -> tuple[int, bytes]:
+        if not self.connected:
+            raise ConnectionException(f"Not connected to {self._host}:{self._port}")
+        async with self.__lock:
+            for attempt in range(self.__retries + 1):
+                await self._before_send()
+                self.__writer.write(encode_rtu(device_id, pdu))
+                await self.__writer.drain()
+                try:
+                    frame = await asyncio.wait_for(self.__read_frame(), self._timeout)
+                except asyncio.TimeoutError:
+                    await self.__discard_input()
+                    continue
+                except asyncio.IncompleteReadError as e:
+                    self.close()
+                    raise ConnectionException(f"Connection lost: {e}") from e
+                finally:
+                    self._after_receive()
+                if not check_rtu(frame):
+                    _LOGGER.debug(f"Ошибка CRC в ответе {frame.hex()}")
+                    await self.__discard_input()
+                    continue
+                return frame[0], frame[1:-2]
+            raise ModbusIOException(f"No response received after {self.__retries} retries")
+
+    async def _before_send(self):
+        """Точка расширения для соблюдения пауз между кадрами на шине"""
+
+    def _after_receive(self):
+        """Точка расширения: отмечает конец обмена"""
+
+    async def __read_frame(self) -> bytes:
+        # Длина ответа RTU определяется по коду функции и полям длины
+        read = self.__reader.readexactly
+        head = await read(2)
+        function_code = head[1]
+        if function_code & 0x80:
+            return head + await read(3)
+        if function_code in (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS, READ_INPUT_REGISTERS):
+            size = await read(1)
+            return head + size + await read(size[0] + 2)
+        if function_code != FAST_MODBUS:
+            # Ответы на запись повторяют адрес и значение/количество
+            return head + await read(6)
+        subcommand = await read(1)
+        if subcommand[0] == FAST_EVENTS_RESPONSE:
+            # Флаг, количество событий и длина данных событий
+            header = await read(3)
+            return head + subcommand + header + await read(header[2] + 2)
+        if subcommand[0] == FAST_EVENTS_SETUP:
+            size = await read(1)
+            return head + subcommand + size + await read(size[0] + 2)
+        if subcommand[0] == FAST_SCAN_DEVICE:
+            # Серийный номер и адрес устройства
+            return head + subcommand + await read(5 + 2)
+        return head + subcommand + await read(2)
+
+    async def __discard_input(self):
+        # Отбрасываем опоздавшие ответы, чтобы не принять их за ответ на следующий запрос
+        try:
+            while await asyncio.wait_for(self.__reader.read(256), 0.05):
+                pass
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+
+
+class ModbusSerialClient(ModbusRtuClient):
+    """Клиент Modbus RTU через последовательный порт хоста (адаптер RS-485).
+
+    Перед каждым запросом выдерживается пауза 3.5 символа после предыдущего кадра,
+    рассчитанная по скорости и формату порта. Тайм-аут ответа включает время
+    передачи самого длинного кадра на этой скорости.
+    """
+
+    def __init__(self, settings: SerialSettings, timeout: float = SERIAL_TIMEOUT, retries: int = 1):
+        self.__settings = settings
+        self.__timing = BusTiming.from_settings(settings)
+        # Самый длинный обмен: чтение MAX_READ_REGISTERS регистров
+        timeout += self.__timing.read_time(READ_HOLDING_REGISTERS, MAX_READ_REGISTERS)
+        super().__init__(host=settings.port, port=settings.baudrate, timeout=timeout, retries=retries)
+        self.__idle_since = 0.0
+
+    @property
+    def timing(self) -> BusTiming:
+        return self.__timing
+
+    async def _open_connection(self):
+        # Необязательная зависимость: нужна только для шины на последовательном порту
+        import serial_asyncio_fast
+
+        return await serial_asyncio_fast.open_serial_connection(
+            url=self.__settings.port,
+            baudrate=self.__settings.baudrate,
+            bytesize=self.__settings.bytesize,
+            parity=self.__settings.parity,
+            stopbits=self.__settings.stopbits,
+        )
+
+    async def _before_send(self):
+        delay = self.__idle_since + self.__timing.frame_gap - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _after_receive(self):
+        self.__idle_since = time.monotonic()
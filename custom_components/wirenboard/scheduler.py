@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+
+
+class PollScheduler:
+    """Очередь групп регистров по времени следующего опроса (min-heap).
+
+    Время следующего опроса отсчитывается от запланированного, а не от фактического,
+    поэтому интервал группы не округляется до циклов опроса и не накапливает задержку.
+    Группы с интервалом 0 опрашиваются один раз.
+    """
+
+    def __init__(self, retry_interval: float = 1):
+        self.__retry_interval = retry_interval
+        self.__heap = []
+        self.__counter = itertools.count()
+        # Актуальное время опроса каждой группы. Записи кучи с другим временем устарели
+        self.__due = {}
+        # Интервалы, заменяющие update_interval группы (например, для групп, получаемых событиями)
+        self.__intervals = {}
+        # Множитель интервалов, когда опрос с заданными интервалами не помещается на шину
+        self.__interval_scale = 1.0
+
+    def __len__(self):
+        return len(self.__due)
+
+    def schedule(self, obj, due: float):
+        self.__due[obj] = due
+        heapq.heappush(self.__heap, (due, next(self.__counter), obj))
+
+    def unschedule(self, obj):
+        self.__due.pop(obj, None)
+
+    def set_interval(self, obj, interval: float | None):
+        """Заменяет интервал опроса группы. None - вернуть update_interval группы"""
+        if interval is None:
+            self.__intervals.pop(obj, None)
+        else:
+            self.__intervals[obj] = interval
+
+    def interval(self, obj) -> float:
+        """Действующий интервал опроса группы без учета множителя"""
+        return self.__intervals.get(obj, obj.update_interval)
+
+    @property
+    def interval_scale(self) -> float:
+        return self.__interval_scale
+
+    @interval_scale.setter
+    def interval_scale(self, value: float):
+        self.__interval_scale = max(value, 1.0)
+
+    def due_time(self, obj) -> float | None:
+        return self.__due.get(obj)
+
+    def next_due(self) -> float | None:
+        """Время ближайшего опроса или None, если опрашивать нечего"""
+        while self.__heap:
+            due, _, obj = self.__heap[0]
+            if self.__due.get(obj) == due:
+                return due
+            heapq.heappop(self.__heap)
+        return None
+
+    def pop_due(self, now: float) -> list[tuple]:
+        """Извлекает группы, время опроса которых наступило. Возвращает пары (группа, время опроса)"""
+        result = []
+        while self.__heap and self.__heap[0][0] <= now:
+            due, _, obj = heapq.heappop(self.__heap)
+            if self.__due.get(obj) == due:
+                del self.__due[obj]
+                result.append((obj, due))
+        return result
+
+    def reschedule(self, obj, due: float, now: float, succeeded: bool):
+        """Планирует следующий опрос группы после попытки чтения"""
+        if not succeeded:
+            self.schedule(obj, now + self.__retry_interval)
+            return
+        interval = self.interval(obj) * self.__interval_scale
+        if not interval:
+            return
+        next_due = due + interval
+        if next_due <= now:
+            # Пропускаем опоздавшие опросы, сохраняя фазу
+            next_due += interval * (math.floor((now - next_due) / interval) + 1)
+        self.schedule(obj, next_due)
@@ -4,7 +4,7 @@ from homeassistant.components.select import SelectEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.core import HomeAssistant
 
-from .device import WBMr
+from .device import WBSmart
 from .const import DOMAIN
 from .coordinator import WBCoordinator
 from .entity import WbEntity
@@ -14,17 +14,16 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     objects = []
     coordinator: WBCoordinator = hass.data[DOMAIN][config_entry.entry_id]
-    device: WBMr = coordinator.device
-    for obj in device.selects:
-        for i in range(obj.count):
-            objects.append(WbSelect(hass, coordinator, obj, i))
+    for device in coordinator.devices:
+        for obj in device.selects:
+            for i in range(obj.count):
+                objects.append(WbSelect(hass, coordinator, obj, i))
 
     _LOGGER.info(f"📊 СОЗДАНО {len(objects)} ПОЛЕЙ ВЫБОРА")
     async_add_entities(objects, update_before_add=False)
 
 
 class WbSelect(WbEntity, CoordinatorEntity, SelectEntity):
-    _attr_current_option: str | None = None
     _attr_entity_registry_enabled_default = True
     _attr_icon = "mdi:list-status"
     def __init__(
@@ -41,14 +40,12 @@ class WbSelect(WbEntity, CoordinatorEntity, SelectEntity):
         # self._attr_available = True # Этого реквизита нет в классе WbEntity
 
         self._attr_options = obj.get_attr_options(self.id)
-        self.current_option = self.get_current_option()
+
+    @property
+    def current_option(self) -> str | None:
+        """Значение из образа регистров: обновляется каждым чтением группы"""
+        return self.object.get_state(self.id)
 
     async def async_select_option(self, option: str) -> None:
         await self.object.set_value(self.id, option)
-        self.current_option = self.get_current_option()
-        # print(self.dict)
-        _LOGGER.info(f"{vars(self)}")
         self.async_write_ha_state()
-
-    def get_current_option(self):
-        return self.object.get_state(self.id)
@@ -1,26 +1,77 @@
 from __future__ import annotations
 
 import logging
+from homeassistant.const import UnitOfTime
 from homeassistant.helpers.entity import EntityCategory
-from homeassistant.components.sensor import  SensorEntity
+from homeassistant.components.sensor import  SensorEntity, SensorStateClass
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
-from .device import WBMr
+from .device import WBSmart
 from .const import DOMAIN
 from .coordinator import WBCoordinator
-from .entity import WbEntity
+from .entity import WbEntity, wb_device_info
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _ms(value: float | None) -> float | None:
+    return None if value is None else round(value * 1000, 2)
+
+
+# Диагностика обмена: ключ -> (название, единица измерения, класс состояния, значение, атрибуты)
+DIAGNOSTIC_SENSORS = {
+    "poll_cycle": (
+        "Длительность цикла опроса", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+        lambda device: _ms(device.poll_stats.last_duration),
+        lambda device: {f"p{p}": _ms(device.poll_stats.duration.percentile(p)) for p in (50, 95, 99)},
+    ),
+    "poll_lag": (
+        "Опоздание опроса", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+        lambda device: _ms(device.poll_stats.last_lag),
+        lambda device: {f"p{p}": _ms(device.poll_stats.lag.percentile(p)) for p in (50, 95, 99)},
+    ),
+    "request_latency": (
+        "Время ответа p95", UnitOfTime.MILLISECONDS, SensorStateClass.MEASUREMENT,
+        lambda device: _ms(device.request_totals.latency.percentile(95)),
+        lambda device: {f"{function_code:#04x}": {f"p{p}": _ms(stats.latency.percentile(p)) for p in (50, 95, 99)}
+                        for function_code, stats in device.transaction_stats.items()},
+    ),
+    "requests": (
+        "Запросов", None, SensorStateClass.TOTAL_INCREASING,
+        lambda device: device.request_totals.requests,
+        lambda device: {"request_bytes": device.request_totals.request_bytes,
+                        "response_bytes": device.request_totals.response_bytes},
+    ),
+    "timeouts": (
+        "Запросов без ответа", None, SensorStateClass.TOTAL_INCREASING,
+        lambda device: device.request_totals.timeouts,
+        None,
+    ),
+    "exceptions": (
+        "Ответов с ошибкой", None, SensorStateClass.TOTAL_INCREASING,
+        lambda device: device.request_totals.exceptions,
+        None,
+    ),
+    "reconnects": (
+        "Переподключений к шлюзу", None, SensorStateClass.TOTAL_INCREASING,
+        lambda device: device.reconnects,
+        None,
+    ),
+}
+
+
 async def async_setup_entry(hass, config_entry, async_add_entities):
     objects = []
     coordinator: WBCoordinator = hass.data[DOMAIN][config_entry.entry_id]
-    device: WBMr = coordinator.device
-    for obj in device.sensors:
-        for i in range(obj.count):
-            objects.append(EntryTriggerCounter(hass, coordinator, obj, i))
+    for device in coordinator.devices:
+        for obj in device.sensors:
+            for i in range(obj.count):
+                objects.append(EntryTriggerCounter(hass, coordinator, obj, i))
+                if obj.has_rate:
+                    objects.append(CounterRateSensor(hass, coordinator, obj, i))
+        for key in DIAGNOSTIC_SENSORS:
+            objects.append(WbDiagnosticSensor(device, key))
 
     _LOGGER.info(f"📊 СОЗДАНО {len(objects)} СЕНСОРОВ")
     async_add_entities(objects, update_before_add=False)
@@ -34,22 +85,75 @@ class EntryTriggerCounter(WbEntity, CoordinatorEntity, SensorEntity):
             obj,
             idx: int
     ) -> None:
-        _LOGGER.debug(f"select.py. ШАГ 1")
         super().__init__(hass, obj, idx)
         CoordinatorEntity.__init__(self, coordinator)
 
         #self._attr_device_class = SensorDeviceClass.BATTERY
-        #self._attr_native_unit_of_measurement = PERCENTAGE
+        self._attr_native_unit_of_measurement = obj.unit
         # self._attr_entity_category = EntityCategory.DIAGNOSTIC
-        # self._attr_native_value = self._device.get_entry_trigger_count(self._channel)
-
-    async def async_update(self) -> None:
-        self._attr_native_value = self._device.get_entry_trigger_count(self._channel)
 
     @property
     def native_value(self):
+        # Значение уже разобрано кодеком группы с учетом типа и множителя
         return self.object.get_state(self.id)
 
     @property
     def icon(self):
         return "mdi:counter"
+
+
+class CounterRateSensor(WbEntity, CoordinatorEntity, SensorEntity):
+    """Скорость счетчика, событий в минуту. Считается устройством при чтении группы счетчиков"""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = "1/min"
+    _attr_icon = "mdi:speedometer"
+
+    def __init__(self, hass: HomeAssistant, coordinator: WBCoordinator, obj, idx: int) -> None:
+        super().__init__(hass, obj, idx)
+        CoordinatorEntity.__init__(self, coordinator)
+        self._attr_unique_id = f"{self._attr_unique_id}_rate"
+        self.entity_id = f"{self.entity_id}_rate"
+        self._attr_name = f"{self._attr_name} в минуту"
+
+    def _state_value(self):
+        return self.object.get_rate(self.id)
+
+    def _is_changed(self) -> bool:
+        return self._state_value() != self._attr_native_value
+
+    def _clear_changed(self):
+        # Отметки об изменении регистров принадлежат сенсору самого счетчика
+        pass
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._attr_native_value = self._state_value()
+        super().async_write_ha_state()
+
+
+class WbDiagnosticSensor(SensorEntity):
+    """Показатель обмена с устройством. По умолчанию отключен.
+
+    Метрики меняются с каждым запросом, поэтому сенсор не подписан на координатор,
+    а опрашивается Home Assistant с интервалом платформы.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
+
+    def __init__(self, device: WBSmart, key: str) -> None:
+        name, unit, state_class, self.__value, self.__attributes = DIAGNOSTIC_SENSORS[key]
+        self.__device = device
+        self._attr_unique_id = f"{device.name}_{device.serial_number}_diagnostic_{key}"
+        self.entity_id = f"sensor.{DOMAIN.lower()}_{self._attr_unique_id}"
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+        self._attr_device_info = wb_device_info(device)
+
+    async def async_update(self) -> None:
+        self._attr_native_value = self.__value(self.__device)
+        if self.__attributes is not None:
+            self._attr_extra_state_attributes = self.__attributes(self.__device)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import logging
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import device_registry as dr
+
+from .const import DOMAIN
+from .device import RegisterType, WBSmart
+from .entity import wb_device_info
+from .protocol import ModbusDeviceError
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_READ_REGISTERS = "read_registers"
+SERVICE_WRITE_REGISTERS = "write_registers"
+
+ATTR_DEVICE_ID = "device_id"
+ATTR_REGISTER_TYPE = "register_type"
+ATTR_ADDRESS = "address"
+ATTR_COUNT = "count"
+ATTR_RANGES = "ranges"
+ATTR_BLOCK = "block"
+ATTR_VALUES = "values"
+ATTR_VERIFY = "verify"
+
+
+def _range(value) -> tuple[int, int]:
+    """Диапазон "9-14" или адрес одного регистра -> (адрес, количество)"""
+    if isinstance(value, int):
+        return value, 1
+    start, _, end = str(value).partition("-")
+    try:
+        start = int(start)
+        end = int(end) if end else start
+    except ValueError as ex:
+        raise vol.Invalid(f"Неверный диапазон регистров: {value}") from ex
+    if end < start:
+        raise vol.Invalid(f"Неверный диапазон регистров: {value}")
+    return start, end - start + 1
+
+
+REGISTER_TYPES = [register_type.name for register_type in (RegisterType.holding, RegisterType.coil)]
+
+READ_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_REGISTER_TYPE, default=RegisterType.holding.name): vol.In(REGISTER_TYPES),
+        vol.Exclusive(ATTR_ADDRESS, "registers"): cv.positive_int,
+        vol.Optional(ATTR_COUNT, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Exclusive(ATTR_RANGES, "registers"): vol.All(cv.ensure_list, [_range]),
+        vol.Exclusive(ATTR_BLOCK, "registers"): cv.string,
+    }),
+    cv.has_at_least_one_key(ATTR_ADDRESS, ATTR_RANGES, ATTR_BLOCK),
+)
+
+WRITE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_REGISTER_TYPE, default=RegisterType.holding.name): vol.In(REGISTER_TYPES),
+        vol.Exclusive(ATTR_ADDRESS, "registers"): cv.positive_int,
+        vol.Exclusive(ATTR_BLOCK, "registers"): cv.string,
+        vol.Required(ATTR_VALUES): vol.All(cv.ensure_list, vol.Length(min=1)),
+        vol.Optional(ATTR_VERIFY, default=True): cv.boolean,
+    }),
+    cv.has_at_least_one_key(ATTR_ADDRESS, ATTR_BLOCK),
+)
+
+
+def _find_device(hass: HomeAssistant, device_id: str) -> WBSmart:
+    """Устройство интеграции по идентификатору устройства Home Assistant"""
+    device_entry = dr.async_get(hass).async_get(device_id)
+    if device_entry is None:
+        raise ServiceValidationError(f"Устройство {device_id} не найдено")
+    for coordinator in hass.data.get(DOMAIN, {}).values():
+        for device in coordinator.devices:
+            if wb_device_info(device)["identifiers"] & device_entry.identifiers:
+                return device
+    raise ServiceValidationError(f"Устройство {device_entry.name} не подключено")
+
+
+def _find_group(device: WBSmart, name_id: str, register_type: RegisterType):
+    obj = device.find_group(name_id)
+    if obj is None:
+        raise ServiceValidationError(f"В карте регистров {device.device_model.name} нет группы {name_id}")
+    if obj.register_type != register_type:
+        raise ServiceValidationError(f"Группа {name_id} содержит {obj.register_type.name} регистры")
+    return obj
+
+
+async def _async_read_registers(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    device = _find_device(hass, call.data[ATTR_DEVICE_ID])
+    register_type = RegisterType[call.data[ATTR_REGISTER_TYPE]]
+    obj = None
+    if ATTR_BLOCK in call.data:
+        obj = _find_group(device, call.data[ATTR_BLOCK], register_type)
+        ranges = [(group_addr.start_address, group_addr.count) for group_addr in obj.group_addresses]
+    elif ATTR_RANGES in call.data:
+        ranges = call.data[ATTR_RANGES]
+    else:
+        ranges = [(call.data[ATTR_ADDRESS], call.data[ATTR_COUNT])]
+
+    try:
+        values = await device.async_read_ranges(register_type, ranges)
+    except ModbusDeviceError as ex:
+        raise HomeAssistantError(f"Устройство {device.name} отказало в чтении регистров: {ex}") from ex
+    if values is None:
+        raise HomeAssistantError(f"Устройство {device.name} не ответило на чтение регистров")
+    response = {"registers": {str(address): value for address, value in values.items()}}
+    if obj is not None:
+        # Значения сущностей группы, разобранные с учетом типа данных и множителя
+        response["values"] = list(obj.statuses)
+    return response
+
+
+async def _async_write_registers(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    device = _find_device(hass, call.data[ATTR_DEVICE_ID])
+    register_type = RegisterType[call.data[ATTR_REGISTER_TYPE]]
+    values = call.data[ATTR_VALUES]
+    try:
+        if ATTR_BLOCK in call.data:
+            registers = _find_group(device, call.data[ATTR_BLOCK], register_type).encode_values(values)
+        elif register_type == RegisterType.coil:
+            registers = {call.data[ATTR_ADDRESS] + index: bool(value) for index, value in enumerate(values)}
+        else:
+            registers = {call.data[ATTR_ADDRESS] + index: int(value) & 0xFFFF for index, value in enumerate(values)}
+    except (TypeError, ValueError) as ex:
+        raise ServiceValidationError(str(ex)) from ex
+
+    result = await device.async_write_many(register_type, registers, call.data[ATTR_VERIFY])
+    if result is None:
+        raise HomeAssistantError(f"Устройство {device.name} не отвечает, регистры {sorted(registers)} не записаны")
+    if len(result.unwritten) == len(registers):
+        raise HomeAssistantError(f"Устройство {device.name} не записало регистры {result.unwritten}")
+    if result.unwritten:
+        _LOGGER.warning(f"Устройство {device.name}: регистры {result.unwritten} не записаны")
+    if result.unconfirmed:
+        _LOGGER.warning(f"Устройство {device.name}: запись регистров {result.unconfirmed} не подтверждена чтением")
+    return {
+        "verified": call.data[ATTR_VERIFY] and not result.unwritten and not result.unconfirmed,
+        "unwritten": result.unwritten,
+        "unconfirmed": result.unconfirmed,
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Регистрирует службы чтения и записи произвольных регистров устройств"""
+
+    async def read_registers(call: ServiceCall) -> ServiceResponse:
+        return await _async_read_registers(hass, call)
+
+    async def write_registers(call: ServiceCall) -> ServiceResponse:
+        return await _async_write_registers(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_READ_REGISTERS, read_registers, schema=READ_SCHEMA,
+                                 supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(DOMAIN, SERVICE_WRITE_REGISTERS, write_registers, schema=WRITE_SCHEMA,
+                                 supports_response=SupportsResponse.OPTIONAL)
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+SNAPSHOT_STORAGE_VERSION = 1
+
+
+class SnapshotStore:
+    """Последние известные значения регистров устройства в хранилище Home Assistant.
+
+    Сохранение откладывается: пока данные меняются, запись на диск выполняется не чаще
+    раза в SNAPSHOT_SAVE_DELAY секунд и обязательно при остановке Home Assistant.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, data_func):
+        self.__store = Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshot.{entry_id}")
+        self.__data_func = data_func
+        self.__scheduled = False
+
+    async def async_load(self) -> dict | None:
+        try:
+            return await self.__store.async_load()
+        except Exception as e:
+            _LOGGER.warning(f"Не удалось прочитать сохраненные значения регистров: {e}")
+            return None
+
+    def async_schedule_save(self):
+        if self.__scheduled:
+            return
+        self.__scheduled = True
+        self.__store.async_delay_save(self.__data, SNAPSHOT_SAVE_DELAY)
+
+    def __data(self) -> dict:
+        self.__scheduled = False
+        return self.__data_func()
+
+    async def async_remove(self):
+        await self.__store.async_remove()
@@ -7,7 +7,7 @@ from homeassistant.components.switch import SwitchEntity
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .device import WBMr
+from .device import WBSmart
 from .const import DOMAIN
 from .coordinator import WBCoordinator
 from .entity import WbEntity
@@ -18,10 +18,10 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     objects = []
     coordinator: WBCoordinator = hass.data[DOMAIN][config_entry.entry_id]
-    device: WBMr = coordinator.device
-    for obj in device.switches:
-        for i in range(obj.count):
-            objects.append(WbSwitch(hass, coordinator, obj, i))
+    for device in coordinator.devices:
+        for obj in device.switches:
+            for i in range(obj.count):
+                objects.append(WbSwitch(hass, coordinator, obj, i))
 
     _LOGGER.info(f"📊 СОЗДАНО {len(objects)} ПЕРЕКЛЮЧАТЕЛЕЙ")
     async_add_entities(objects, update_before_add=False)
@@ -34,10 +34,8 @@ class WbSwitch(WbEntity, CoordinatorEntity, SwitchEntity):
             obj,
             idx: int
     ) -> None:
-        _LOGGER.debug(f"switch.py. ШАГ 1")
         super().__init__(hass, obj, idx)
         CoordinatorEntity.__init__(self, coordinator)
-        _LOGGER.debug(f"switch.py. ШАГ 2")
 
     @property
     def is_on(self) -> bool:
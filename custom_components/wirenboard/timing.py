@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import math
+from typing import NamedTuple
+
+from .const import (
+    DEFAULT_BAUDRATE,
+    DEFAULT_BYTESIZE,
+    DEFAULT_PARITY,
+    DEFAULT_READ_GAP,
+    DEFAULT_STOPBITS,
+    SERIAL_TURNAROUND,
+)
+from .protocol import READ_COILS, READ_HOLDING_REGISTERS
+
+# Адрес устройства и CRC, добавляемые к PDU в кадре RTU
+RTU_FRAME_OVERHEAD = 3
+
+
+class SerialSettings(NamedTuple):
+    """Параметры последовательного порта шины RS-485"""
+
+    port: str
+    baudrate: int = DEFAULT_BAUDRATE
+    bytesize: int = DEFAULT_BYTESIZE
+    parity: str = DEFAULT_PARITY
+    stopbits: int = DEFAULT_STOPBITS
+
+
+class BusTiming:
+    """Время занятия шины RS-485 кадрами Modbus RTU при заданных параметрах порта.
+
+    Символ - стартовый бит, биты данных, бит четности и стоповые биты.
+    Кадры разделяются паузой не меньше 3.5 символа; на скоростях выше 19200 бод
+    спецификация Modbus RTU фиксирует паузу в 1.75 мс.
+    """
+
+    def __init__(self, baudrate: int = DEFAULT_BAUDRATE, bytesize: int = DEFAULT_BYTESIZE,
+                 parity: str = DEFAULT_PARITY, stopbits: int = DEFAULT_STOPBITS,
+                 turnaround: float = SERIAL_TURNAROUND):
+        self.__baudrate = baudrate
+        self.__char_time = (1 + bytesize + (parity != "N") + stopbits) / baudrate
+        self.__frame_gap = 3.5 * self.__char_time if baudrate <= 19200 else 0.00175
+        self.__turnaround = turnaround
+
+    @classmethod
+    def from_settings(cls, settings: SerialSettings) -> BusTiming:
+        return cls(settings.baudrate, settings.bytesize, settings.parity, settings.stopbits)
+
+    @property
+    def baudrate(self) -> int:
+        return self.__baudrate
+
+    @property
+    def char_time(self) -> float:
+        return self.__char_time
+
+    @property
+    def frame_gap(self) -> float:
+        """Минимальная пауза между кадрами, с"""
+        return self.__frame_gap
+
+    def frame_time(self, pdu_size: int) -> float:
+        """Время передачи кадра RTU с PDU заданного размера"""
+        return (pdu_size + RTU_FRAME_OVERHEAD) * self.__char_time
+
+    def transaction_time(self, request_pdu: int, response_pdu: int) -> float:
+        """Время занятия шины запросом и ответом, включая паузы и время реакции устройства"""
+        return (self.frame_time(request_pdu) + self.frame_time(response_pdu)
+                + 2 * self.__frame_gap + self.__turnaround)
+
+    def read_time(self, function_code: int, count: int) -> float:
+        """Время чтения count регистров (READ_HOLDING_REGISTERS) или битов (READ_COILS)"""
+        if function_code == READ_COILS:
+            return self.transaction_time(5, 2 + (count + 7) // 8)
+        return self.transaction_time(5, 2 + 2 * count)
+
+    def break_even_gap(self) -> int:
+        """Сколько лишних регистров выгоднее прочитать, чем разделить чтение на два запроса"""
+        overhead = self.read_time(READ_HOLDING_REGISTERS, 0)
+        return math.floor(overhead / (2 * self.__char_time))
+
+
+def default_read_gap(serial: SerialSettings | None) -> int:
+    """Промежуток объединения чтений, если он не задан в параметрах записи.
+    Для шины на последовательном порту выгодный промежуток зависит от скорости"""
+    if serial is None:
+        return DEFAULT_READ_GAP
+    return BusTiming.from_settings(serial).break_even_gap()
@@ -0,0 +1,6 @@
+"""Тесты чистых модулей интеграции. Импорт пакета интеграции требует установленного Home Assistant."""
+import sys
+from pathlib import Path
+
+# custom_components импортируется из корня репозитория
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
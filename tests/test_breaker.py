@@ -0,0 +1,64 @@
+from custom_components.wirenboard.breaker import BreakerState, CircuitBreaker
+
+
+def breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", threshold=3, base_delay=10, max_delay=40, jitter=0)
+
+
+def test_opens_after_threshold_failures():
+    cb = breaker()
+    cb.record_failure(0)
+    cb.record_failure(0)
+    assert cb.is_closed and cb.retry_at is None
+    cb.record_failure(0)
+    assert cb.state == BreakerState.open
+    assert cb.retry_at == 10
+    assert cb.trips == 1
+    assert not cb.allow(5)
+
+
+def test_success_resets_failure_count():
+    cb = breaker()
+    cb.record_failure(0)
+    cb.record_failure(0)
+    cb.record_success()
+    cb.record_failure(0)
+    assert cb.is_closed
+
+
+def test_half_open_allows_single_probe():
+    cb = breaker()
+    for _ in range(3):
+        cb.record_failure(0)
+    assert cb.allow(10)
+    assert cb.state == BreakerState.half_open
+    # Пока проба не завершилась, остальные обращения отклоняются
+    assert not cb.allow(11)
+    cb.record_success()
+    assert cb.is_closed
+    assert cb.failures == 0
+
+
+def test_failed_probe_doubles_delay_up_to_max():
+    cb = breaker()
+    for _ in range(3):
+        cb.record_failure(0)
+    delays = []
+    now = 0
+    for _ in range(4):
+        now = cb.retry_at
+        assert cb.allow(now)
+        cb.record_failure(now)
+        delays.append(cb.retry_at - now)
+    assert delays == [20, 40, 40, 40]
+    assert cb.trips == 1
+    cb.record_success()
+    for _ in range(3):
+        cb.record_failure(now)
+    assert cb.retry_at - now == 10
+
+
+def test_jitter_spreads_delay():
+    cb = CircuitBreaker("test", threshold=1, base_delay=10, jitter=0.2)
+    cb.record_failure(0)
+    assert 8 <= cb.retry_at <= 12
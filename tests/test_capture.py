@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from pymodbus.exceptions import ModbusIOException
+
+from custom_components.wirenboard.capture import (
+    CaptureOutcome,
+    CaptureWriter,
+    ModbusReplayClient,
+    read_capture,
+)
+from custom_components.wirenboard.protocol import (
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    WRITE_MULTIPLE_REGISTERS,
+    ModbusResponse,
+)
+
+
+def write_capture(path) -> None:
+    writer = CaptureWriter(str(path))
+    writer.record(1.0, 0.01, 1, READ_HOLDING_REGISTERS, CaptureOutcome.ok, (20,), {"count": 2},
+                  ModbusResponse(READ_HOLDING_REGISTERS, 1, registers=[50, 60]))
+    writer.record(2.0, 0.01, 1, READ_COILS, CaptureOutcome.ok, (0,), {"count": 3},
+                  ModbusResponse(READ_COILS, 1, bits=[True, False, True, False, False, False, False, False]))
+    writer.record(3.0, 0.5, 1, READ_HOLDING_REGISTERS, CaptureOutcome.timeout, (20,), {"count": 2})
+    writer.record(4.0, 0.01, 1, READ_HOLDING_REGISTERS, CaptureOutcome.exception, (600,), {"count": 1},
+                  ModbusResponse(READ_HOLDING_REGISTERS | 0x80, 1, exception_code=2))
+    writer.record(5.0, 0.01, 1, WRITE_MULTIPLE_REGISTERS, CaptureOutcome.ok, (20, [1, 2]), {})
+    writer.close()
+
+
+def test_capture_round_trip(tmp_path):
+    path = tmp_path / "capture.bin"
+    write_capture(path)
+    records = read_capture(str(path))
+    assert [(record.function_code, record.outcome, record.address, record.count, record.values)
+            for record in records] == [
+        (READ_HOLDING_REGISTERS, CaptureOutcome.ok, 20, 2, [50, 60]),
+        (READ_COILS, CaptureOutcome.ok, 0, 3, [True, False, True]),
+        (READ_HOLDING_REGISTERS, CaptureOutcome.timeout, 20, 2, None),
+        (READ_HOLDING_REGISTERS, CaptureOutcome.exception, 600, 1, 2),
+        (WRITE_MULTIPLE_REGISTERS, CaptureOutcome.ok, 20, 2, [1, 2]),
+    ]
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    path = tmp_path / "capture.bin"
+    write_capture(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    assert len(read_capture(str(path))) == 4
+
+
+def test_capture_rotates_at_half_of_max_bytes(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = CaptureWriter(str(path), max_bytes=200)
+    for started in range(10):
+        writer.record(started, 0.01, 1, READ_HOLDING_REGISTERS, CaptureOutcome.ok, (20,), {"count": 1},
+                      ModbusResponse(READ_HOLDING_REGISTERS, 1, registers=[started]))
+        writer.flush()
+    writer.close()
+    assert (tmp_path / "capture.bin.1").exists()
+    values = [record.values[0] for record in read_capture(str(path))]
+    # Старые записи удаляются вместе с прежним path.1, последние сохраняются по порядку
+    assert values == sorted(values) and values[-1] == 9 and len(values) < 10
+
+
+def test_buffer_overflow_drops_oldest(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = CaptureWriter(str(path), buffer_records=2)
+    for started in range(3):
+        writer.record(started, 0.01, 1, READ_HOLDING_REGISTERS, CaptureOutcome.ok, (20,), {"count": 1},
+                      ModbusResponse(READ_HOLDING_REGISTERS, 1, registers=[started]))
+    writer.close()
+    assert (writer.records, writer.dropped) == (3, 1)
+    assert [record.values for record in read_capture(str(path))] == [[1], [2]]
+
+
+def test_replay_client(tmp_path):
+    path = tmp_path / "capture.bin"
+    write_capture(path)
+    client = ModbusReplayClient(read_capture(str(path)), time_scale=0)
+
+    async def scenario():
+        assert (await client.read_holding_registers(20, count=2, device_id=1)).registers == [50, 60]
+        # Ответы одного запроса выдаются по кругу в порядке записи
+        with pytest.raises(ModbusIOException):
+            await client.read_holding_registers(20, count=2, device_id=1)
+        assert (await client.read_holding_registers(20, count=2, device_id=1)).registers == [50, 60]
+        assert (await client.read_coils(0, count=3, device_id=1)).bits == [True, False, True]
+        error = await client.read_holding_registers(600, count=1, device_id=1)
+        assert error.isError() and error.exception_code == 2
+        assert not (await client.write_registers(20, [1, 2], device_id=1)).isError()
+        with pytest.raises(ModbusIOException):
+            await client.read_holding_registers(30, count=1, device_id=1)
+
+    asyncio.run(scenario())
+    assert client.device_ids == [1]
+    assert client.misses == 1
@@ -0,0 +1,60 @@
+import pytest
+
+from custom_components.wirenboard.codec import RegisterCodec, compile_codec, decode_string
+
+
+def test_u16_and_s16():
+    assert RegisterCodec("u16", 2).decode([1, 0xFFFF]) == (1, 0xFFFF)
+    codec = RegisterCodec("s16", 2)
+    assert codec.decode([1, 0xFFFF]) == (1, -1)
+    assert codec.encode(-1) == [0xFFFF]
+
+
+@pytest.mark.parametrize(("word_order", "registers"), [("big", [0x0001, 0x0002]), ("little", [0x0002, 0x0001])])
+def test_u32_word_order(word_order, registers):
+    codec = RegisterCodec("u32", 2, word_order)
+    assert codec.width == 2
+    assert codec.decode(registers + registers) == (0x00010002, 0x00010002)
+    assert codec.encode(0x00010002) == registers
+
+
+def test_s32_and_float32():
+    assert RegisterCodec("s32").decode([0xFFFF, 0xFFFE]) == (-2,)
+    codec = RegisterCodec("float32", word_order="little")
+    registers = codec.encode(1.5)
+    assert registers == [0x0000, 0x3FC0]
+    assert codec.decode(registers) == (1.5,)
+    assert not codec.is_integer
+
+
+def test_scale_rounds_to_scale_digits():
+    codec = RegisterCodec("u16", 2, scale=0.1)
+    assert codec.decode([2305, 7]) == (230.5, 0.7)
+    assert codec.encode(230.5) == [2305]
+    assert not codec.is_integer
+    assert RegisterCodec("u32", scale=0.01).decode([0x0001, 0x0000]) == (655.36,)
+
+
+def test_string():
+    codec = RegisterCodec("string", 2, length=4)
+    assert codec.width == 4
+    assert codec.decode([ord("W"), ord("B"), 0, 0, ord("M"), ord("R"), ord("6"), ord("C")]) == ("WB", "MR6C")
+    assert codec.encode("WBMR6C") == [ord("W"), ord("B"), ord("M"), ord("R")]
+    assert codec.encode("WB") == [ord("W"), ord("B"), 0, 0]
+    assert decode_string([ord("1"), ord("."), ord("7"), 0]) == "1.7"
+
+
+def test_bitfield_keeps_other_bits():
+    codec = RegisterCodec("bitfield", bit_offset=4, bit_count=2)
+    assert codec.decode([0b110101]) == (0b11,)
+    assert codec.encode(0b01, current=0b110101) == [0b010101]
+
+
+def test_bool_and_compile():
+    assert RegisterCodec("bool", 3).decode([1, 0, 1]) == (True, False, True)
+    codec = compile_codec({"data_type": "s32", "word_order": "little", "scale": 0.001}, 2)
+    assert (codec.data_type, codec.width) == ("s32", 2)
+    with pytest.raises(ValueError):
+        RegisterCodec("u24")
+    with pytest.raises(ValueError):
+        RegisterCodec("u32", word_order="middle")
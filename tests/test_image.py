@@ -0,0 +1,35 @@
+from custom_components.wirenboard.image import CoilImage, RegisterImage
+
+
+def test_unread_registers_are_none():
+    image = RegisterImage(4)
+    assert len(image) == 4
+    assert image.values(0, 4) == (None, None, None, None)
+    assert not image.is_valid(0, 4)
+
+
+def test_write_marks_only_changed_registers_dirty():
+    image = RegisterImage(4)
+    assert image.write(0, [1, 2, 3, 4])
+    assert image.is_valid(0, 4)
+    assert image.clear_dirty(0, 4)
+    assert not image.write(0, [1, 2, 3, 4])
+    assert image.write(1, [2, 5])
+    assert [image.is_dirty(slot) for slot in range(4)] == [False, False, True, False]
+    assert image.values(0, 4) == (1, 2, 5, 4)
+
+
+def test_set_single_register():
+    image = RegisterImage(2)
+    assert image.set(0, 7)
+    assert not image.set(0, 7)
+    assert image.set(0, None)
+    assert image.get(0) is None
+    assert not image.set(1, None)
+
+
+def test_coil_image_returns_bools():
+    image = CoilImage(3)
+    image.write(0, [True, False, True])
+    assert image.values(0, 3) == (True, False, True)
+    assert image.raw(0, 3).tolist() == [1, 0, 1]
@@ -0,0 +1,39 @@
+import pytest
+
+from custom_components.wirenboard.metrics import LATENCY_BUCKETS, HubMetrics, LatencyHistogram
+from custom_components.wirenboard.protocol import READ_COILS, READ_HOLDING_REGISTERS
+
+
+def test_histogram_percentiles_are_bucket_bounds():
+    histogram = LatencyHistogram()
+    for value in (0.001, 0.002, 0.003, 0.1):
+        histogram.add(value)
+    assert histogram.count == 4
+    assert histogram.average == pytest.approx(0.0265)
+    assert histogram.percentile(50) in LATENCY_BUCKETS
+    assert 0.002 <= histogram.percentile(50) < 0.003
+    assert histogram.percentile(99) == 0.1
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_registered_device_reuses_preallocated_stats():
+    metrics = HubMetrics()
+    functions = metrics.register_device(1)
+    stats = functions[READ_HOLDING_REGISTERS]
+    metrics.add(1, READ_HOLDING_REGISTERS, 0.01, 5, 10)
+    metrics.add_timeout(1, READ_HOLDING_REGISTERS, 5)
+    assert metrics.transaction(1, READ_HOLDING_REGISTERS) is stats
+    assert (stats.requests, stats.timeouts, stats.request_bytes, stats.response_bytes) == (2, 1, 10, 10)
+    # Функции без запросов в статистике устройства не показываются
+    assert list(metrics.device(1)) == [READ_HOLDING_REGISTERS]
+
+
+def test_totals_and_unregistered_devices():
+    metrics = HubMetrics()
+    metrics.add(2, READ_COILS, 0.01, 5, 3)
+    metrics.add(2, READ_HOLDING_REGISTERS, 0.02, 5, 10, exception=True)
+    metrics.add_error(2, READ_HOLDING_REGISTERS, 5)
+    total = metrics.device_total(2)
+    assert (total.requests, total.exceptions, total.errors) == (3, 1, 1)
+    assert list(metrics.as_dict(2)["transactions"]) == ["2/0x01", "2/0x03"]
+    assert metrics.as_dict(3)["transactions"] == {}
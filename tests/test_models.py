@@ -0,0 +1,52 @@
+import pytest
+
+from custom_components.wirenboard.device import Platform, RegisterType
+from custom_components.wirenboard.models import available_models, compile_model, find_model, get_model
+
+
+@pytest.mark.parametrize(("model", "model_map"), [
+    ("WBMR6C", "wbmr6c"),
+    ("wbmr6cv2", "wbmr6c"),
+    ("WBMR6", "wbmr6"),
+    ("WBMR6LV", "wbmr6"),
+    ("WB-MR3", "wbmr3"),
+    ("WBMSW", None),
+    ("", None),
+    (None, None),
+])
+def test_find_model(model, model_map):
+    assert find_model(model) == model_map
+
+
+@pytest.mark.parametrize("name", available_models())
+def test_shipped_maps_compile(name):
+    model = get_model(name)
+    assert model.name == name
+    assert model.groups
+    assert [spec.index for spec in model.groups] == list(range(len(model.groups)))
+
+
+def test_groups_are_laid_out_by_register_type():
+    model = compile_model({
+        "model": "test",
+        "groups": [
+            {"name": "Реле", "platform": "switch", "register_type": "coil", "address": 0, "count": 3},
+            {"name": "Режим", "name_id": "mode", "platform": "number", "register_type": "holding",
+             "address": 9, "count": 3, "address0": 16},
+            {"name": "Энергия", "name_id": "energy", "platform": "sensor", "register_type": "holding",
+             "address": 100, "count": 2, "data_type": "u32"},
+        ],
+    })
+    relays, mode, energy = model.groups
+    assert relays.platform == Platform.switch and relays.offset == 0
+    # Регистр входа 0 идет первым и может отсутствовать в прошивке
+    assert mode.addresses == (16, 9, 10, 11)
+    assert mode.optional_addresses == (16,)
+    assert (mode.offset, energy.offset) == (0, 4)
+    assert energy.addresses == (100, 102)
+    assert model.image_sizes == {RegisterType.coil: 3, RegisterType.holding: 8}
+
+    variant = model.variant(frozenset({16}))
+    assert variant.groups[1].addresses == (9, 10, 11)
+    assert model.variant(frozenset({16})) is variant
+    assert model.variant(frozenset({9})) is model
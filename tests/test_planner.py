@@ -0,0 +1,121 @@
+from typing import NamedTuple
+
+from custom_components.wirenboard.device import GroupAddresses, RegisterType
+from custom_components.wirenboard import planner as planner_module
+from custom_components.wirenboard.planner import ReadPlanner, coalesce_writes, merge_ranges
+
+LIMITS = {RegisterType.coil: 2000, RegisterType.holding: 125}
+
+
+class Spec(NamedTuple):
+    index: int
+    register_type: RegisterType
+    group_addresses: tuple
+
+
+def spec(index: int, *ranges, register_type: RegisterType = RegisterType.holding) -> Spec:
+    return Spec(index, register_type, tuple(GroupAddresses(address, count) for address, count in ranges))
+
+
+def blocks(plan) -> list[tuple]:
+    return [(block.register_type, block.start_address, block.count) for block in plan]
+
+
+def test_groups_within_gap_are_read_together():
+    planner = ReadPlanner(LIMITS, max_gap=4)
+    plan = planner.plan([spec(0, (9, 6)), spec(1, (19, 6))])
+    assert blocks(plan) == [(RegisterType.holding, 9, 16)]
+    assert plan[0].has_gaps
+
+
+def test_groups_beyond_gap_are_read_separately():
+    planner = ReadPlanner(LIMITS, max_gap=4)
+    plan = planner.plan([spec(0, (9, 6)), spec(1, (20, 6))])
+    assert blocks(plan) == [(RegisterType.holding, 9, 6), (RegisterType.holding, 20, 6)]
+
+
+def test_register_types_are_planned_separately():
+    planner = ReadPlanner(LIMITS, max_gap=8)
+    plan = planner.plan([spec(0, (0, 6), register_type=RegisterType.coil), spec(1, (6, 1))])
+    assert blocks(plan) == [(RegisterType.coil, 0, 6), (RegisterType.holding, 6, 1)]
+
+
+def test_block_does_not_exceed_limit():
+    planner = ReadPlanner({RegisterType.holding: 10}, max_gap=4)
+    plan = planner.plan([spec(0, (0, 6)), spec(1, (8, 6))])
+    assert blocks(plan) == [(RegisterType.holding, 0, 6), (RegisterType.holding, 8, 6)]
+
+
+def test_group_longer_than_limit_is_split():
+    planner = ReadPlanner({RegisterType.holding: 10}, max_gap=0)
+    plan = planner.plan([spec(0, (100, 25))])
+    assert blocks(plan) == [(RegisterType.holding, 100, 10), (RegisterType.holding, 110, 10),
+                            (RegisterType.holding, 120, 5)]
+    assert all(isinstance(group_addr, GroupAddresses) for block in plan for _, group_addr in block.segments)
+
+
+def test_split_returns_values_of_each_segment():
+    planner = ReadPlanner(LIMITS, max_gap=4)
+    first, second = spec(0, (9, 2)), spec(1, (13, 2))
+    block, = planner.plan([first, second])
+    parts = [(obj, values) for obj, _, values in block.split([1, 2, 0, 0, 3, 4])]
+    assert parts == [(first, [1, 2]), (second, [3, 4])]
+
+
+def test_plan_is_cached_by_group_set():
+    planner = ReadPlanner(LIMITS, max_gap=4)
+    first, second = spec(0, (9, 6)), spec(1, (20, 6))
+    plan = planner.plan([first, second])
+    assert planner.plan([second, first]) is plan
+    assert planner.plan([first]) is not plan
+
+
+def test_least_recently_used_plan_is_evicted(monkeypatch):
+    monkeypatch.setattr(planner_module, "READ_PLAN_CACHE_SIZE", 2)
+    planner = ReadPlanner(LIMITS)
+    first, second, third = [spec(index, (index * 10, 1)) for index in range(3)]
+    first_plan = planner.plan([first])
+    second_plan = planner.plan([second])
+    assert planner.plan([first]) is first_plan
+    planner.plan([third])
+    assert planner.plan([first]) is first_plan
+    assert planner.plan([second]) is not second_plan
+
+
+def test_gap_change_invalidates_plans():
+    planner = ReadPlanner(LIMITS, max_gap=4)
+    objects = [spec(0, (9, 6)), spec(1, (19, 6))]
+    assert blocks(planner.plan(objects)) == [(RegisterType.holding, 9, 16)]
+    planner.max_gap = 0
+    assert blocks(planner.plan(objects)) == [(RegisterType.holding, 9, 6), (RegisterType.holding, 19, 6)]
+
+
+def test_merge_ranges():
+    assert merge_ranges([(20, 2), (9, 6), (16, 1)], max_gap=2, limit=125) == [(9, 8), (20, 2)]
+    assert merge_ranges([(0, 30)], max_gap=0, limit=10) == [(0, 10), (10, 10), (20, 10)]
+
+
+def runs(writes, limits=None) -> list[tuple]:
+    limits = limits or {RegisterType.coil: 1968, RegisterType.holding: 123}
+    return [(run.register_type, run.start_address, run.values, run.futures) for run in coalesce_writes(writes, limits)]
+
+
+def test_adjacent_writes_are_coalesced():
+    writes = [(RegisterType.holding, 21, 2, "b"), (RegisterType.holding, 20, 1, "a"),
+              (RegisterType.holding, 23, 3, "c"), (RegisterType.coil, 0, True, "d")]
+    assert runs(writes) == [
+        (RegisterType.coil, 0, [True], ["d"]),
+        (RegisterType.holding, 20, [1, 2], ["a", "b"]),
+        (RegisterType.holding, 23, [3], ["c"]),
+    ]
+
+
+def test_repeated_write_keeps_last_value():
+    writes = [(RegisterType.holding, 20, 1, "a"), (RegisterType.holding, 20, 5, "b")]
+    assert runs(writes) == [(RegisterType.holding, 20, [5], ["a", "b"])]
+
+
+def test_run_does_not_exceed_limit():
+    writes = [(RegisterType.holding, address, address, address) for address in range(5)]
+    result = runs(writes, {RegisterType.holding: 2})
+    assert [(start, values) for _, start, values, _ in result] == [(0, [0, 1]), (2, [2, 3]), (4, [4])]
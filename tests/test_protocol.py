@@ -0,0 +1,62 @@
+from custom_components.wirenboard.protocol import (
+    EVENT_COIL,
+    EVENT_HOLDING,
+    READ_COILS,
+    READ_HOLDING_REGISTERS,
+    FastModbusEvent,
+    check_rtu,
+    decode_events,
+    decode_response,
+    decode_scan,
+    encode_events,
+    encode_mbap,
+    encode_read,
+    encode_rtu,
+    encode_scan_device,
+    encode_write_coils,
+    encode_write_registers,
+)
+
+
+def test_read_request_frames():
+    assert encode_read(READ_HOLDING_REGISTERS, 200, 20) == bytes.fromhex("0300c80014")
+    assert encode_mbap(7, 1, encode_read(READ_COILS, 0, 6)) == bytes.fromhex("000700000006010100000006")
+
+
+def test_rtu_frame_crc():
+    # Пример из спецификации Modbus over serial line: чтение регистров 0x6B-0x6D устройства 0x11
+    frame = encode_rtu(0x11, encode_read(READ_HOLDING_REGISTERS, 0x6B, 3))
+    assert frame == bytes.fromhex("1103006b00037687")
+    assert check_rtu(frame)
+    assert not check_rtu(frame[:-1] + bytes((frame[-1] ^ 1,)))
+
+
+def test_write_frames():
+    assert encode_write_registers(20, [1, -1]) == bytes.fromhex("1000140002040001ffff")
+    assert encode_write_coils(0, [True, False, True]) == bytes.fromhex("0f000000030105")
+
+
+def test_decode_registers_and_bits():
+    response = decode_response(bytes.fromhex("030400010002"), dev_id=5)
+    assert not response.isError()
+    assert (response.dev_id, response.registers) == (5, [1, 2])
+    # Биты дополнены до байта: лишние отбрасываются по запрошенному количеству
+    assert decode_response(bytes.fromhex("010105"), count=3).bits == [True, False, True]
+
+
+def test_decode_exception():
+    response = decode_response(bytes.fromhex("8302"))
+    assert response.isError()
+    assert response.exception_code == 2
+
+
+def test_fast_modbus_events_round_trip():
+    events = [FastModbusEvent(EVENT_COIL, 3, 1), FastModbusEvent(EVENT_HOLDING, 465, 0x1234)]
+    decoded = decode_events(7, encode_events(0x21, events))
+    assert (decoded.dev_id, decoded.flag) == (7, 0x21)
+    assert [(event.event_type, event.address, event.value) for event in decoded.events] == [
+        (EVENT_COIL, 3, 1), (EVENT_HOLDING, 465, 0x1234)]
+
+
+def test_fast_modbus_scan_device():
+    assert decode_scan(encode_scan_device(0x00A00074, 116)) == (0x00A00074, 116)
@@ -0,0 +1,91 @@
+import pytest
+
+from custom_components.wirenboard.publish import CounterRate, PublishPolicy, compile_policy, counter_delta
+
+
+def test_counter_delta_counts_forward():
+    assert counter_delta(10, 13) == 3
+    assert counter_delta(10, 10) == 0
+
+
+def test_counter_delta_wraps_across_0xffff():
+    assert counter_delta(0xFFFF, 1) == 2
+    assert counter_delta(0xFFFE, 0) == 2
+
+
+def test_counter_delta_reset_counts_new_value():
+    # Устройство перезагрузилось: счетчик начался с нуля
+    assert counter_delta(1000, 5) == 5
+    # Скачок больше половины диапазона на большое значение не считается
+    assert counter_delta(1000, 40000) == 0
+
+
+def test_counter_delta_unknown_values():
+    assert counter_delta(None, 5) == 0
+    assert counter_delta(5, None) == 0
+
+
+def test_counter_delta_bits():
+    assert counter_delta(0xFF, 2, bits=8) == 3
+
+
+def test_policy_deadband():
+    policy = PublishPolicy(deadband=0.5)
+    assert not policy.should_publish(20.0, 20.4, 1, True)
+    assert policy.should_publish(20.0, 20.6, 1, True)
+
+
+def test_policy_relative_deadband():
+    policy = PublishPolicy(deadband_relative=0.1)
+    assert not policy.should_publish(100, 109, 1, True)
+    assert policy.should_publish(100, 111, 1, True)
+
+
+def test_policy_min_interval():
+    policy = PublishPolicy(min_interval=10)
+    assert not policy.should_publish(1, 2, 5, True)
+    assert policy.should_publish(1, 2, 10, True)
+
+
+def test_policy_heartbeat_publishes_unchanged():
+    policy = PublishPolicy(deadband=5, heartbeat=60)
+    assert not policy.should_publish(1, 1, 30, False)
+    assert policy.should_publish(1, 1, 60, False)
+
+
+def test_policy_publishes_appearance_and_non_numeric():
+    policy = PublishPolicy(deadband=100)
+    assert policy.should_publish(None, 1, 0, True)
+    assert policy.should_publish(1, None, 0, True)
+    assert policy.should_publish(False, True, 0, True)
+    assert policy.should_publish("a", "b", 0, True)
+
+
+def test_policy_ignores_unchanged_register():
+    assert not PublishPolicy().should_publish(1, 2, 0, False)
+
+
+def test_compile_policy():
+    assert compile_policy(None) is None
+    assert compile_policy({}) is None
+    assert compile_policy({"deadband": 1, "heartbeat": 60}) == PublishPolicy(deadband=1, heartbeat=60)
+
+
+def test_compile_policy_rejects_unknown_keys():
+    with pytest.raises(ValueError, match="deadzone"):
+        compile_policy({"deadzone": 1})
+
+
+def test_counter_rate_window():
+    rate = CounterRate(window=60)
+    assert rate.rate(0) is None
+    rate.update(0xFFFE, 0)
+    assert rate.rate(0) == 0
+    rate.update(1, 10)
+    rate.update(None, 20)
+    rate.update(4, 30)
+    # 3 + 3 события за минуту
+    assert rate.rate(30) == 6
+    # Первое приращение вышло из окна
+    assert rate.rate(70) == 3
+    assert rate.rate(100) == 0
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+from custom_components.wirenboard import request_queue
+from custom_components.wirenboard.request_queue import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_POLL,
+    RequestQueue,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _grant_order(queue: RequestQueue, clock: Clock, lanes: list[tuple[int, float]]) -> list[int]:
+    """Занимает единственное место очереди, ставит запросы (полоса, время постановки) и возвращает
+    порядок, в котором они получили место"""
+    order = []
+
+    async def request(priority: int):
+        async with queue.slot(priority):
+            order.append(priority)
+
+    await queue.acquire(PRIORITY_POLL)
+    tasks = []
+    for priority, queued_at in lanes:
+        clock.now = queued_at
+        tasks.append(asyncio.create_task(request(priority)))
+        await asyncio.sleep(0)
+    clock.now = 110.0
+    queue.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_higher_priority_is_served_first(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_queue, "time", SimpleNamespace(monotonic=clock))
+    queue = RequestQueue(starvation_timeout=30)
+    order = asyncio.run(_grant_order(queue, clock, [(PRIORITY_BACKGROUND, 100), (PRIORITY_POLL, 101),
+                                                     (PRIORITY_INTERACTIVE, 102)]))
+    assert order == [PRIORITY_INTERACTIVE, PRIORITY_POLL, PRIORITY_BACKGROUND]
+
+
+def test_starving_request_is_promoted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(request_queue, "time", SimpleNamespace(monotonic=clock))
+    queue = RequestQueue(starvation_timeout=2)
+    # Фоновый запрос ждет 10 с - дольше starvation_timeout, интерактивный - только 1 с
+    order = asyncio.run(_grant_order(queue, clock, [(PRIORITY_BACKGROUND, 100), (PRIORITY_INTERACTIVE, 109)]))
+    assert order == [PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE]
+    assert queue.stats(PRIORITY_BACKGROUND).max_wait == 10
+
+
+def test_cancelled_waiter_does_not_hold_slot():
+    async def scenario():
+        queue = RequestQueue()
+        await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire(PRIORITY_BACKGROUND))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        queue.release()
+        assert (queue.active, queue.waiting) == (0, 0)
+        async with queue.slot(PRIORITY_INTERACTIVE):
+            assert queue.active == 1
+
+    asyncio.run(scenario())
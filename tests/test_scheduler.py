@@ -0,0 +1,74 @@
+from typing import NamedTuple
+
+from custom_components.wirenboard.scheduler import PollScheduler
+
+
+class Group(NamedTuple):
+    name: str
+    update_interval: float
+
+
+def test_groups_are_popped_in_due_order():
+    scheduler = PollScheduler()
+    fast, slow = Group("fast", 1), Group("slow", 10)
+    scheduler.schedule(slow, 10)
+    scheduler.schedule(fast, 1)
+    assert scheduler.next_due() == 1
+    assert scheduler.pop_due(5) == [(fast, 1)]
+    assert scheduler.pop_due(10) == [(slow, 10)]
+    assert len(scheduler) == 0
+
+
+def test_next_poll_keeps_phase_of_schedule():
+    scheduler = PollScheduler()
+    group = Group("group", 1)
+    scheduler.schedule(group, 1)
+    scheduler.pop_due(1.3)
+    # Время следующего опроса отсчитывается от запланированного, а не от фактического
+    scheduler.reschedule(group, 1, 1.3, succeeded=True)
+    assert scheduler.due_time(group) == 2
+
+
+def test_late_polls_are_skipped():
+    scheduler = PollScheduler()
+    group = Group("group", 1)
+    scheduler.reschedule(group, 1, 4.5, succeeded=True)
+    assert scheduler.due_time(group) == 5
+
+
+def test_failed_read_is_retried():
+    scheduler = PollScheduler(retry_interval=0.5)
+    group = Group("group", 10)
+    scheduler.reschedule(group, 1, 3, succeeded=False)
+    assert scheduler.due_time(group) == 3.5
+
+
+def test_zero_interval_group_is_read_once():
+    scheduler = PollScheduler()
+    group = Group("config", 0)
+    scheduler.reschedule(group, 0, 1, succeeded=True)
+    assert scheduler.due_time(group) is None
+
+
+def test_interval_override_and_scale():
+    scheduler = PollScheduler()
+    group = Group("group", 1)
+    scheduler.set_interval(group, 60)
+    scheduler.interval_scale = 2
+    scheduler.reschedule(group, 0, 0, succeeded=True)
+    assert scheduler.due_time(group) == 120
+    scheduler.set_interval(group, None)
+    assert scheduler.interval(group) == 1
+    scheduler.interval_scale = 0.5
+    assert scheduler.interval_scale == 1
+
+
+def test_rescheduled_group_replaces_stale_entry():
+    scheduler = PollScheduler()
+    group = Group("group", 1)
+    scheduler.schedule(group, 1)
+    scheduler.schedule(group, 3)
+    assert scheduler.next_due() == 3
+    assert scheduler.pop_due(2) == []
+    scheduler.unschedule(group)
+    assert scheduler.next_due() is None
@@ -0,0 +1,38 @@
+import pytest
+
+from custom_components.wirenboard.const import DEFAULT_READ_GAP
+from custom_components.wirenboard.protocol import READ_COILS, READ_HOLDING_REGISTERS
+from custom_components.wirenboard.timing import BusTiming, SerialSettings, default_read_gap
+
+
+def test_character_time_and_frame_gap():
+    # 8N2: стартовый бит, 8 бит данных, 2 стоповых
+    timing = BusTiming(9600, 8, "N", 2)
+    assert timing.char_time == pytest.approx(11 / 9600)
+    assert timing.frame_gap == pytest.approx(3.5 * 11 / 9600)
+    assert BusTiming(9600, 8, "E", 1).char_time == pytest.approx(11 / 9600)
+    # Выше 19200 бод пауза между кадрами фиксирована
+    assert BusTiming(115200).frame_gap == 0.00175
+
+
+def test_read_time_grows_with_count():
+    timing = BusTiming(9600, turnaround=0)
+    one = timing.read_time(READ_HOLDING_REGISTERS, 1)
+    assert timing.read_time(READ_HOLDING_REGISTERS, 2) - one == pytest.approx(2 * timing.char_time)
+    assert timing.read_time(READ_COILS, 8) == timing.read_time(READ_COILS, 1)
+
+
+def test_break_even_gap():
+    timing = BusTiming(9600)
+    gap = timing.break_even_gap()
+    # Лишние gap регистров читаются не дольше, чем обходится отдельный запрос
+    assert 2 * gap * timing.char_time <= timing.read_time(READ_HOLDING_REGISTERS, 0)
+    assert 2 * (gap + 1) * timing.char_time > timing.read_time(READ_HOLDING_REGISTERS, 0)
+
+
+def test_default_read_gap():
+    assert default_read_gap(None) == DEFAULT_READ_GAP
+    slow = default_read_gap(SerialSettings("/dev/ttyUSB0", 9600))
+    fast = default_read_gap(SerialSettings("/dev/ttyUSB0", 115200))
+    # Время реакции устройства не зависит от скорости: на быстрой шине оно стоит больше регистров
+    assert fast > slow